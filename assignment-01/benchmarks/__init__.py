@@ -0,0 +1,9 @@
+"""
+Benchmark suites of this project.
+
+The runner (benchmarks.harness) is shared by both assignments and lives in the
+repository's top-level benchmarks directory, which is added to this package.
+"""
+import os
+
+__path__.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "benchmarks"))
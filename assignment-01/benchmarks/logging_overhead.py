@@ -0,0 +1,85 @@
+"""
+Per-row cost of find_best_threshold before and after lazy logging.
+
+Run from the assignment-01 directory:
+
+    python -m benchmarks.logging_overhead [rows]
+"""
+from src.optimizer import ThresholdOptimizer
+from utils.data_types import InputDataType, MetricType
+
+import logging
+import sys
+import time
+
+logger = logging.getLogger("benchmarks.legacy")
+
+def make_rows(count: int):
+    """Synthetic sweep with recall decreasing as the threshold grows."""
+    return [
+        InputDataType(
+            threshold=i / count,
+            true_positives=count - i,
+            true_negatives=i,
+            false_positives=count - i,
+            false_negatives=i
+        )
+        for i in range(count)
+    ]
+
+def legacy_scan(data, metric_type, min_threshold):
+    """The original loop: eager f-strings and an INFO line per row."""
+    valid_thresholds = []
+    for metrics in data:
+        logger.info(f"Calculating {metric_type} metric")
+        logger.debug(
+            f"Confusion matrix values - TP: {metrics.true_positives}, TN: {metrics.true_negatives}, "
+            f"FP: {metrics.false_positives}, FN: {metrics.false_negatives}"
+        )
+        tp, fn = metrics.true_positives, metrics.false_negatives
+        logger.debug(f"Calculating recall with tp={tp}, fn={fn}")
+        calculated_metric = tp / (tp + fn) if (tp + fn) > 0 else 0.0
+        logger.info(f"Calculated recall: {calculated_metric:.4f}")
+        logger.debug(
+            f"Threshold {metrics.threshold:.4f} yielded {metric_type.name}: "
+            f"{calculated_metric:.4f}"
+        )
+        if calculated_metric >= min_threshold:
+            valid_thresholds.append(metrics)
+            logger.debug(f"Threshold {metrics.threshold:.4f} meets minimum requirement")
+    return max(valid_thresholds, key=lambda x: x.threshold).threshold if valid_thresholds else None
+
+def per_row_ns(function, rows: int, repeat: int = 3) -> float:
+    """Best-of-repeat wall time per row in nanoseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best / rows * 1e9
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = make_rows(rows)
+    row_optimizer = ThresholdOptimizer(data, MetricType.RECALL)
+    quiet_optimizer = ThresholdOptimizer(data, MetricType.RECALL, quiet=True)
+    quiet_optimizer.metric_values  # Exclude the one-off column conversion
+
+    # Logs go to a NullHandler so only formatting and dispatch are measured
+    logging.getLogger().handlers[:] = [logging.NullHandler()]
+
+    cases = [
+        ("legacy f-strings", lambda: legacy_scan(data, MetricType.RECALL, 0.5)),
+        ("row scan", lambda: row_optimizer.find_best_threshold(0.5)),
+        ("quiet", lambda: quiet_optimizer.find_best_threshold(0.5)),
+    ]
+
+    print(f"{'mode':<18}{'level':<10}{'ns/row':>10}")
+    for level in (logging.INFO, logging.WARNING):
+        logging.getLogger().setLevel(level)
+        for name, function in cases:
+            cost = per_row_ns(function, rows)
+            print(f"{name:<18}{logging.getLevelName(level):<10}{cost:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Throughput, latency and peak memory of the threshold search hot paths.
+
+Run from the assignment-01 directory:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json --tolerance 0.2
+
+Sizes are numbers of thresholds (or samples for the sweep) and go up to 1e8
+with --sizes; the exit code is 1 when a case regresses past the tolerance.
+"""
+from benchmarks.harness import Case, main
+from benchmarks.logging_overhead import make_rows
+from src.optimizer import ThresholdOptimizer
+from src.parallel import optimize_many
+from src.storage import save_table
+from src.sweep import build_threshold_table
+from utils.data_types import MetricType, ThresholdTable
+
+from typing import Iterator
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# The per-row scan builds an InputDataType per threshold, so it stops here
+ROW_SCAN_MAX_SIZE = 10**5
+
+# Queries per timed call of the index case
+INDEX_QUERIES = 1000
+
+# Jobs per timed call of the optimize_many cases, each a table of the case size
+MANY_JOBS = 16
+
+def make_table(size: int) -> ThresholdTable:
+    """Synthetic sweep with recall decreasing as the threshold grows."""
+    rows = np.arange(size, dtype=np.int64)
+    return ThresholdTable(rows / size, size - rows, rows, size - rows, rows, validate=False)
+
+def cases(size: int) -> Iterator[Case]:
+    """Workloads of the given size."""
+    table = make_table(size)
+    yield "table_scan", size, lambda: ThresholdOptimizer(table, MetricType.RECALL).find_best_threshold(0.5)
+
+    optimizer = ThresholdOptimizer(table, MetricType.RECALL, index=True)
+    queries = np.random.default_rng(size).random(INDEX_QUERIES).tolist()
+    yield "index_query", INDEX_QUERIES, lambda: [optimizer.find_best_threshold(query) for query in queries]
+
+    rng = np.random.default_rng(size)
+    scores, labels = rng.random(size), rng.random(size) < 0.3
+    yield "sweep", size, lambda: build_threshold_table(scores, labels)
+
+    if size <= ROW_SCAN_MAX_SIZE:
+        rows = make_rows(size)
+        yield "row_scan", size, lambda: ThresholdOptimizer(rows, MetricType.RECALL).find_best_threshold(0.5)
+
+    # The same table under every name, so the batch costs no extra memory
+    jobs = {f"job_{i}": table for i in range(MANY_JOBS)}
+    yield "optimize_many_serial", MANY_JOBS * size, lambda: optimize_many(jobs, min_threshold=0.5, workers=1)
+    yield "optimize_many_pool", MANY_JOBS * size, lambda: optimize_many(jobs, min_threshold=0.5)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sweep.bin")
+        save_table(table, path)
+        paths = {f"job_{i}": path for i in range(MANY_JOBS)}
+        yield "optimize_many_files", MANY_JOBS * size, lambda: optimize_many(paths, min_threshold=0.5)
+
+if __name__ == "__main__":
+    sys.exit(main(cases, "Benchmark ThresholdOptimizer hot paths"))
@@ -0,0 +1,160 @@
+from src.evaluator import MetricsCalculator
+from src.sweep import validate_scores
+from utils.data_types import BootstrapResult, MetricType
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the cells (replicates x thresholds) resampled in one batch
+_BATCH_CELLS = 1 << 22
+
+def _select(thresholds, tp, tn, fp, fn, metric_type, min_threshold, beta) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pick the highest qualifying threshold of every replicate (row) at once.
+
+    Returns:
+        Tuple of (threshold, metric value) arrays, NaN where nothing qualifies.
+    """
+    metrics = MetricsCalculator.calculate_metrics(tp, tn, fp, fn, metric_type, beta)
+    valid = metrics >= min_threshold
+
+    # Index of the last qualifying column, found as the first one from the right
+    best = valid.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    found = valid.any(axis=1)
+    rows = np.arange(valid.shape[0])
+
+    return (
+        np.where(found, thresholds[best], np.nan),
+        np.where(found, metrics[rows, best], np.nan)
+    )
+
+def _evaluate(cells: np.ndarray, thresholds, metric_type, min_threshold, beta) -> Tuple[np.ndarray, np.ndarray]:
+    """Build every replicate's confusion matrices from its (label, score bin) cell counts and select."""
+    bins = thresholds.size + 1
+    positives, negatives = cells[:, :bins], cells[:, bins:]
+
+    false_negatives = np.cumsum(positives, axis=1)[:, :-1]
+    true_negatives = np.cumsum(negatives, axis=1)[:, :-1]
+    true_positives = positives.sum(axis=1, keepdims=True) - false_negatives
+    false_positives = negatives.sum(axis=1, keepdims=True) - true_negatives
+
+    return _select(
+        thresholds, true_positives, true_negatives, false_positives, false_negatives,
+        metric_type, min_threshold, beta
+    )
+
+def _resample(task: Tuple) -> Tuple[np.ndarray, np.ndarray]:
+    """Run one batch of replicates; also the process pool entry point."""
+    seed, replicates, cell_counts, thresholds, metric_type, min_threshold, beta = task
+    rng = np.random.default_rng(seed)
+
+    # Resampling every sample with replacement is a multinomial draw over the
+    # (label, score bin) cells, so a replicate is one row of cell counts
+    draws = rng.multinomial(int(cell_counts.sum()), cell_counts / cell_counts.sum(), size=replicates)
+    return _evaluate(draws, thresholds, metric_type, min_threshold, beta)
+
+def bootstrap_threshold(
+    scores,
+    labels,
+    metric_type: MetricType = MetricType.RECALL,
+    min_threshold: float = 0.9,
+    thresholds=None,
+    n_replicates: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    beta: float = 1.0
+) -> BootstrapResult:
+    """
+    Estimate the stability of the chosen threshold by bootstrap resampling.
+
+    Every replicate picks the highest threshold whose metric is >= min_threshold,
+    exactly like ThresholdOptimizer.find_best_threshold. Replicates are drawn as
+    batched multinomial count matrices and evaluated in vectorized form.
+
+    Args:
+        scores: Predicted scores between 0 and 1, one per sample
+        labels: Binary ground truth labels (0/1 or bool), one per sample
+        metric_type: Type of metric to optimize (default: recall)
+        min_threshold: Minimum required metric value (default: 0.9)
+        thresholds: Thresholds to evaluate (default: every distinct score)
+        n_replicates: Number of bootstrap replicates (default: 1000)
+        confidence: Confidence level of the percentile intervals (default: 0.95)
+        seed: Seed for reproducible results, independent of workers (default: None)
+        workers: Number of worker processes (default: 1)
+        beta: Recall weight, only used by MetricType.F_BETA (default: 1.0)
+
+    Returns:
+        BootstrapResult with point estimates and percentile intervals computed
+        over the replicates in which some threshold qualified.
+
+    Raises:
+        ValueError: If the inputs or parameters are invalid
+    """
+    if not 0 <= min_threshold <= 1:
+        logger.error(f"Invalid min_threshold value: {min_threshold}")
+        raise ValueError("min_threshold must be between 0 and 1")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    if n_replicates < 1:
+        raise ValueError("n_replicates must be at least 1")
+
+    scores, positive_weight, negative_weight = validate_scores(scores, labels)
+    if scores.size == 0:
+        raise ValueError("scores cannot be empty")
+
+    thresholds = np.unique(scores if thresholds is None else np.asarray(thresholds, dtype=np.float64))
+    bins = np.searchsorted(thresholds, scores, side="right")
+    cell_counts = np.concatenate((
+        np.bincount(bins[positive_weight > 0], minlength=thresholds.size + 1),
+        np.bincount(bins[negative_weight > 0], minlength=thresholds.size + 1)
+    ))
+    logger.info(f"Bootstrapping {n_replicates} replicates over {thresholds.size} thresholds")
+
+    # Point estimate on the original sample: a single "replicate" equal to the counts
+    point_thresholds, point_metrics = _evaluate(cell_counts[None, :], thresholds, metric_type, min_threshold, beta)
+    point_found = not np.isnan(point_thresholds[0])
+
+    # The batch layout only depends on the problem size, so a given seed gives
+    # the same result for any number of workers
+    batch_size = max(1, min(n_replicates, _BATCH_CELLS // (thresholds.size + 1)))
+    sizes = [min(batch_size, n_replicates - start) for start in range(0, n_replicates, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (batch_seed, size, cell_counts, thresholds, metric_type, min_threshold, beta)
+        for batch_seed, size in zip(seeds, sizes)
+    ]
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = list(executor.map(_resample, tasks))
+    else:
+        batches = [_resample(task) for task in tasks]
+
+    replicate_thresholds = np.concatenate([batch[0] for batch in batches])
+    replicate_metrics = np.concatenate([batch[1] for batch in batches])
+    found = ~np.isnan(replicate_thresholds)
+    n_valid = int(found.sum())
+    logger.debug(f"{n_valid} of {n_replicates} replicates found a qualifying threshold")
+
+    threshold_interval = metric_interval = None
+    if n_valid:
+        quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+        threshold_interval = tuple(float(q) for q in np.quantile(replicate_thresholds[found], quantiles))
+        metric_interval = tuple(float(q) for q in np.quantile(replicate_metrics[found], quantiles))
+
+    return BootstrapResult(
+        metric_type=metric_type,
+        min_threshold=min_threshold,
+        confidence=confidence,
+        n_replicates=n_replicates,
+        n_valid=n_valid,
+        threshold=float(point_thresholds[0]) if point_found else None,
+        metric_value=float(point_metrics[0]) if point_found else None,
+        threshold_interval=threshold_interval,
+        metric_interval=metric_interval
+    )
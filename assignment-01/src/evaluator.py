@@ -1,22 +1,67 @@
-from utils.data_types import InputDataType, MetricType
-# from torchmetrics.classification import BinaryPrecision, BinaryF1Score, BinaryAccuracy
+from utils.data_types import InputDataType, MetricType, ThresholdTable
 
+import numpy as np
 import logging
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields 0.0 where the denominator is not positive."""
+    return np.divide(
+        numerator, denominator,
+        out=np.zeros(np.shape(numerator), dtype=np.float64),
+        where=denominator > 0
+    )
+
+def _recall(tp, tn, fp, fn):
+    return _safe_divide(tp, tp + fn)
+
+def _precision(tp, tn, fp, fn):
+    return _safe_divide(tp, tp + fp)
+
+def _specificity(tp, tn, fp, fn):
+    return _safe_divide(tn, tn + fp)
+
+def _accuracy(tp, tn, fp, fn):
+    return _safe_divide(tp + tn, tp + tn + fp + fn)
+
+def _f1(tp, tn, fp, fn):
+    return _safe_divide(2 * tp, 2 * tp + fp + fn)
+
+def _f_beta(tp, tn, fp, fn, beta):
+    beta_squared = beta * beta
+    return _safe_divide((1 + beta_squared) * tp, (1 + beta_squared) * tp + beta_squared * fn + fp)
+
+def _balanced_accuracy(tp, tn, fp, fn):
+    return (_recall(tp, tn, fp, fn) + _specificity(tp, tn, fp, fn)) / 2
+
+def _mcc(tp, tn, fp, fn):
+    denominator = np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+    return _safe_divide(tp * tn - fp * fn, denominator)
+
+_BATCH_METRICS = {
+    MetricType.RECALL: _recall,
+    MetricType.PRECISION: _precision,
+    MetricType.SPECIFICITY: _specificity,
+    MetricType.ACCURACY: _accuracy,
+    MetricType.F1: _f1,
+    MetricType.F_BETA: _f_beta,
+    MetricType.BALANCED_ACCURACY: _balanced_accuracy,
+    MetricType.MCC: _mcc,
+}
+
 class MetricsCalculator:
     """Service class responsible for calculating various classification metrics."""
     
     @staticmethod
     def calculate_recall(tp: int, fn: int) -> float:
         """Calculate recall from confusion matrix values."""
-        logger.debug(f"Calculating recall with tp={tp}, fn={fn}")
+        logger.debug("Calculating recall with tp=%s, fn=%s", tp, fn)
 
         try:
             recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-            logger.info(f"Calculated recall: {recall:.4f}")
+            logger.debug("Calculated recall: %.4f", recall)
             return recall
 
         except ZeroDivisionError:
@@ -24,12 +69,12 @@ class MetricsCalculator:
             return 0.0
 
     @staticmethod
-    def calculate_metric(data: InputDataType, metric_type: MetricType) -> float:
+    def calculate_metric(data: InputDataType, metric_type: MetricType, beta: float = 1.0) -> float:
         """Calculate specified metric directly from confusion matrix values."""
-        logger.info(f"Calculating {metric_type} metric")
+        logger.debug("Calculating %s metric", metric_type)
         logger.debug(
-            f"Confusion matrix values - TP: {data.true_positives}, TN: {data.true_negatives}, "
-            f"FP: {data.false_positives}, FN: {data.false_negatives}"
+            "Confusion matrix values - TP: %s, TN: %s, FP: %s, FN: %s",
+            data.true_positives, data.true_negatives, data.false_positives, data.false_negatives
         )
 
         tp = data.true_positives
@@ -39,12 +84,57 @@ class MetricsCalculator:
         
         if metric_type == MetricType.RECALL:
             return MetricsCalculator.calculate_recall(tp, fn)
-        # elif metric_type == MetricType.PRECISION:
-        #     return BinaryPrecision()(tp, fp)
-        # elif metric_type == MetricType.F1:
-        #     return BinaryF1Score()(tp, fp, fn),
-        # elif metric_type == MetricType.ACCURACY:
-        #     return BinaryF1Score()(tp, fp, fn)
+        elif metric_type in _BATCH_METRICS:
+            # Share the vectorized formulas so single rows and batches always agree
+            return float(MetricsCalculator.calculate_metrics(tp, tn, fp, fn, metric_type, beta))
         else:
             logger.error(f"Invalid metric type requested: {metric_type}")
-            raise ValueError(f"Invalid metric type: {metric_type}")
\ No newline at end of file
+            raise ValueError(f"Invalid metric type: {metric_type}")
+
+    @staticmethod
+    def calculate_metrics(tp, tn, fp, fn, metric_type: MetricType, beta: float = 1.0) -> np.ndarray:
+        """
+        Calculate specified metric for whole confusion matrix columns in one vectorized pass.
+
+        Args:
+            tp: True positive counts (array-like or scalar)
+            tn: True negative counts (array-like or scalar)
+            fp: False positive counts (array-like or scalar)
+            fn: False negative counts (array-like or scalar)
+            metric_type: Type of metric to calculate
+            beta: Recall weight for MetricType.F_BETA (default: 1.0)
+
+        Returns:
+            Array of metric values broadcast over the inputs. Entries whose
+            denominator is zero are 0.0.
+
+        Raises:
+            ValueError: If the metric type is not supported
+        """
+        metric_function = _BATCH_METRICS.get(metric_type)
+        if metric_function is None:
+            logger.error(f"Invalid metric type requested: {metric_type}")
+            raise ValueError(f"Invalid metric type: {metric_type}")
+
+        logger.debug("Calculating %s metric in batch mode", metric_type)
+
+        # Work in float64 so products such as the MCC denominator cannot overflow
+        tp, tn, fp, fn = np.broadcast_arrays(
+            *(np.asarray(column, dtype=np.float64) for column in (tp, tn, fp, fn))
+        )
+        if metric_type == MetricType.F_BETA:
+            return metric_function(tp, tn, fp, fn, beta)
+        return metric_function(tp, tn, fp, fn)
+
+    @staticmethod
+    def calculate_metric_batch(table: ThresholdTable, metric_type: MetricType, beta: float = 1.0) -> np.ndarray:
+        """Calculate specified metric for every row of a ThresholdTable in one pass."""
+        return MetricsCalculator.calculate_metrics(
+            table.true_positives,
+            table.true_negatives,
+            table.false_positives,
+            table.false_negatives,
+            metric_type,
+            beta
+        )
+
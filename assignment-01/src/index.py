@@ -0,0 +1,76 @@
+from utils.data_types import ThresholdTable
+
+from typing import Optional
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ThresholdIndex:
+    """Sorted threshold index answering best-threshold queries by binary search."""
+
+    def __init__(self, thresholds: np.ndarray, metrics: np.ndarray):
+        """
+        Build the index once from per-row thresholds and metric values.
+
+        Args:
+            thresholds: Threshold value of every row
+            metrics: Metric value of every row, aligned with thresholds
+        """
+        order = np.argsort(thresholds, kind="stable")
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)[order]
+        sorted_metrics = np.asarray(metrics, dtype=np.float64)[order]
+
+        # Recall and other monotone metrics never increase with the threshold,
+        # so their suffix maximum is the metric column itself
+        self.monotone = bool(np.all(sorted_metrics[1:] <= sorted_metrics[:-1]))
+        if self.monotone:
+            suffix_max = sorted_metrics
+        else:
+            suffix_max = np.maximum.accumulate(sorted_metrics[::-1])[::-1]
+
+        # suffix_max is non-increasing; negated it is sorted for searchsorted
+        self._negated_suffix_max = -suffix_max
+        logger.debug(f"Built threshold index over {len(self.thresholds)} rows (monotone={self.monotone})")
+
+    @classmethod
+    def from_table(cls, table: ThresholdTable, metrics: np.ndarray) -> "ThresholdIndex":
+        """Build the index for a ThresholdTable and its precomputed metric column."""
+        return cls(table.threshold, metrics)
+
+    def query(self, min_threshold: float) -> Optional[float]:
+        """
+        Return the highest threshold whose metric is >= min_threshold in O(log n).
+
+        Args:
+            min_threshold: Minimum required metric value
+
+        Returns:
+            The highest qualifying threshold, or None if no row qualifies.
+        """
+        # Number of leading rows whose suffix maximum reaches min_threshold; the
+        # last of them is the highest threshold that meets the requirement itself
+        count = int(np.searchsorted(self._negated_suffix_max, -min_threshold, side="right"))
+        if count == 0:
+            return None
+        return float(self.thresholds[count - 1])
+
+    def query_many(self, min_thresholds) -> np.ndarray:
+        """
+        Answer many queries with one vectorized binary search.
+
+        Args:
+            min_thresholds: Minimum required metric values
+
+        Returns:
+            Highest qualifying threshold per query, NaN where no row qualifies.
+        """
+        min_thresholds = np.asarray(min_thresholds, dtype=np.float64)
+        counts = np.searchsorted(self._negated_suffix_max, -min_thresholds, side="right")
+        best = np.full(min_thresholds.shape, np.nan)
+        found = counts > 0
+        best[found] = self.thresholds[counts[found] - 1]
+        return best
+
+    def __len__(self) -> int:
+        return len(self.thresholds)
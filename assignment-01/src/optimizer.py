@@ -1,22 +1,44 @@
 from src.evaluator import MetricsCalculator
-from utils.data_types import InputDataType, MetricType
+from src.index import ThresholdIndex
+from src.sweep import build_threshold_table
+from src.streaming import ConfusionAccumulator
+from src.storage import load_table
+from utils.data_types import InputDataType, MetricType, ParetoPoint, SearchSummary, ThresholdTable
 
-from typing import List, Optional
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import numpy as np
 import logging
+import bisect
+import time
 
 logger = logging.getLogger(__name__)
 
+# Candidate rows compared at once against the Pareto front for four or more metrics
+PARETO_BLOCK_SIZE = 256
+
 class ThresholdOptimizer:
     """Class for finding optimal classification threshold."""
-    
-    def __init__(self, data: List[InputDataType], metric_type: MetricType = MetricType.RECALL):
+
+    def __init__(
+        self,
+        data: Union[List[InputDataType], ThresholdTable],
+        metric_type: MetricType = MetricType.RECALL,
+        beta: float = 1.0,
+        index: bool = False,
+        quiet: bool = False
+    ):
         """
-        Initialize with a list of InputDataType.
-        
+        Initialize with a list of InputDataType or a columnar ThresholdTable.
+
         Args:
-            data: List of InputDataType objects
+            data: List of InputDataType objects, or a ThresholdTable
             metric_type: Type of metric to optimize (default: recall)
-        
+            beta: Recall weight, only used by MetricType.F_BETA (default: 1.0)
+            index: Build a sorted ThresholdIndex up front so that every
+                find_best_threshold call is a binary search (default: False)
+            quiet: Always use the columnar scan, which has no per-row
+                calculator calls or logging, even for list input (default: False)
+
         Raises:
             ValueError: If data is empty
         """
@@ -25,52 +47,341 @@ class ThresholdOptimizer:
         if not data:
             logger.error("Attempted to initialize with empty data")
             raise ValueError("Metrics list cannot be empty")
-            
+
         logger.debug(f"Initialized with {len(data)} data points")
         self.data = data
         self.metric_type = metric_type
+        self.beta = beta
         self.calculator = MetricsCalculator()
+        self._table = data if isinstance(data, ThresholdTable) else None
+        self._metric_columns: Dict[MetricType, np.ndarray] = {}
+        self.index = None
+        self.quiet = quiet
+        self.last_search: Optional[SearchSummary] = None
+
+        if index:
+            self.build_index()
+
+    @classmethod
+    def from_scores(
+        cls,
+        scores,
+        labels,
+        thresholds=None,
+        sample_weight=None,
+        metric_type: MetricType = MetricType.RECALL,
+        **kwargs
+    ) -> "ThresholdOptimizer":
+        """
+        Initialize from raw prediction scores and labels instead of precomputed rows.
+
+        Args:
+            scores: Predicted scores between 0 and 1, one per sample
+            labels: Binary ground truth labels (0/1 or bool), one per sample
+            thresholds: Thresholds to evaluate (default: every distinct score)
+            sample_weight: Optional non-negative weight per sample
+            metric_type: Type of metric to optimize (default: recall)
+            **kwargs: Passed on to ThresholdOptimizer (beta, index, quiet)
+        """
+        table = build_threshold_table(scores, labels, thresholds, sample_weight)
+        return cls(table, metric_type, **kwargs)
+
+    @classmethod
+    def from_stream(
+        cls,
+        chunks: Iterable,
+        thresholds,
+        metric_type: MetricType = MetricType.RECALL,
+        **kwargs
+    ) -> "ThresholdOptimizer":
+        """
+        Initialize from a stream of chunks with memory bounded by the number of thresholds.
+
+        Args:
+            chunks: Iterable of (scores, labels), (scores, labels, sample_weight),
+                ThresholdTable or List[InputDataType] batches
+            thresholds: Thresholds to evaluate, each between 0 and 1
+            metric_type: Type of metric to optimize (default: recall)
+            **kwargs: Passed on to ThresholdOptimizer (beta, index, quiet)
+        """
+        accumulator = ConfusionAccumulator(thresholds).consume(chunks)
+        return cls.from_accumulator(accumulator, metric_type, **kwargs)
+
+    @classmethod
+    def from_accumulator(
+        cls,
+        accumulator: ConfusionAccumulator,
+        metric_type: MetricType = MetricType.RECALL,
+        **kwargs
+    ) -> "ThresholdOptimizer":
+        """Initialize from a (possibly merged) ConfusionAccumulator."""
+        return cls(accumulator.to_table(), metric_type, **kwargs)
+
+    @classmethod
+    def from_file(
+        cls,
+        path,
+        metric_type: MetricType = MetricType.RECALL,
+        verify: bool = False,
+        **kwargs
+    ) -> "ThresholdOptimizer":
+        """
+        Initialize from a binary sweep file through zero-copy memory-mapped columns.
+
+        Args:
+            path: File written by src.storage.save_table
+            metric_type: Type of metric to optimize (default: recall)
+            verify: Check the file checksum before use (default: False)
+            **kwargs: Passed on to ThresholdOptimizer (beta, index, quiet)
+        """
+        return cls(load_table(path, verify=verify), metric_type, **kwargs)
+
+    @property
+    def table(self) -> ThresholdTable:
+        """Columnar view of the data, converted from the list form on first access."""
+        if self._table is None:
+            self._table = ThresholdTable.from_records(self.data)
+        return self._table
+
+    @property
+    def metric_values(self) -> np.ndarray:
+        """Optimized metric of every row of the table, computed once on first access."""
+        return self.metric_column(self.metric_type)
+
+    def metric_column(self, metric_type: MetricType) -> np.ndarray:
+        """Value of the given metric for every row of the table, cached per metric type."""
+        column = self._metric_columns.get(metric_type)
+        if column is None:
+            column = self.calculator.calculate_metric_batch(self.table, metric_type, self.beta)
+            self._metric_columns[metric_type] = column
+        return column
+
+    def build_index(self) -> ThresholdIndex:
+        """Build (or return the already built) sorted index used to answer queries in O(log n)."""
+        if self.index is None:
+            logger.debug(f"Building threshold index over {len(self.data)} rows")
+            self.index = ThresholdIndex.from_table(self.table, self.metric_values)
+        return self.index
 
     def find_best_threshold(self, min_threshold: float = 0.9) -> Optional[float]:
         """
         Find the best threshold that yields metric >= min_threshold.
-        
+
+        A SearchSummary of the call is stored in last_search.
+
         Args:
             min_threshold: Minimum required metric value (default: 0.9)
-            
+
         Returns:
             The highest threshold that meets the minimum requirement,
             or None if no threshold satisfies the condition.
-            
+
         Raises:
             ValueError: If min_threshold is not between 0 and 1
         """
-        logger.info(f"Finding best threshold with minimum requirement: {min_threshold}")
+        logger.info("Finding best threshold with minimum requirement: %s", min_threshold)
 
         if not 0 <= min_threshold <= 1:
-            logger.error(f"Invalid min_threshold value: {min_threshold}")
+            logger.error("Invalid min_threshold value: %s", min_threshold)
             raise ValueError("min_threshold must be between 0 and 1")
 
+        start = time.perf_counter()
+        if self.index is not None:
+            best_threshold, rows_scanned, rows_passing = self.index.query(min_threshold), 0, None
+        elif self.quiet or isinstance(self.data, ThresholdTable):
+            best_threshold, rows_scanned, rows_passing = self._scan_table(min_threshold)
+        else:
+            best_threshold, rows_scanned, rows_passing = self._scan_rows(min_threshold)
+
+        self.last_search = SearchSummary(
+            metric_type=self.metric_type,
+            min_threshold=min_threshold,
+            rows_scanned=rows_scanned,
+            rows_passing=rows_passing,
+            elapsed_seconds=time.perf_counter() - start,
+            best_threshold=best_threshold
+        )
+
+        if best_threshold is None:
+            logger.warning("No thresholds found meeting the minimum requirement")
+        else:
+            logger.info("Found best threshold: %.4f", best_threshold)
+        logger.debug("Search summary: %s", self.last_search)
+
+        return best_threshold
+
+    def _scan_rows(self, min_threshold: float) -> Tuple[Optional[float], int, int]:
+        """Reference row-by-row scan through MetricsCalculator.calculate_metric."""
         valid_thresholds = []
-        logger.debug(f"Processing {len(self.data)} thresholds")
+        logger.debug("Processing %d thresholds", len(self.data))
+        # Checked once so that disabled DEBUG logging costs nothing per row
+        debug = logger.isEnabledFor(logging.DEBUG)
 
         for metrics in self.data:
-            calculated_metric = self.calculator.calculate_metric(metrics, self.metric_type)
-            logger.debug(
-                    f"Threshold {metrics.threshold:.4f} yielded {self.metric_type.name}: "
-                    f"{calculated_metric:.4f}"
+            calculated_metric = self.calculator.calculate_metric(metrics, self.metric_type, self.beta)
+            if debug:
+                logger.debug(
+                    "Threshold %.4f yielded %s: %.4f",
+                    metrics.threshold, self.metric_type.name, calculated_metric
                 )
 
             if calculated_metric >= min_threshold:
                 valid_thresholds.append(metrics)
-                logger.debug(f"Threshold {metrics.threshold:.4f} meets minimum requirement")
-        
+                if debug:
+                    logger.debug("Threshold %.4f meets minimum requirement", metrics.threshold)
+
         if not valid_thresholds:
-            logger.warning("No thresholds found meeting the minimum requirement")
-            return None
-        
+            return None, len(self.data), 0
+
         # Return the highest threshold that meets the requirement
         best_threshold = max(valid_thresholds, key=lambda x: x.threshold).threshold
-        logger.info(f"Found best threshold: {best_threshold:.4f}")
+        return best_threshold, len(self.data), len(valid_thresholds)
+
+    def _scan_table(self, min_threshold: float) -> Tuple[Optional[float], int, int]:
+        """Columnar counterpart of _scan_rows without any per-row work in Python."""
+        table = self.table
+        logger.debug("Processing %d thresholds in columnar mode", len(table))
+
+        valid = self.metric_values >= min_threshold
+        rows_passing = int(np.count_nonzero(valid))
+
+        if rows_passing == 0:
+            return None, len(table), 0
+
+        return float(table.threshold[valid].max()), len(table), rows_passing
+
+    def find_best_threshold_multi(
+        self,
+        constraints: Mapping[MetricType, float],
+        objective: Optional[MetricType] = None
+    ) -> Optional[float]:
+        """
+        Find the best threshold under several metric constraints at once.
+
+        Args:
+            constraints: Minimum required value per metric, e.g.
+                {MetricType.RECALL: 0.9, MetricType.PRECISION: 0.6}
+            objective: Metric to maximize among the qualifying thresholds, ties
+                going to the highest threshold (default: the highest threshold)
+
+        Returns:
+            The best qualifying threshold, or None if no threshold satisfies
+            every constraint.
+
+        Raises:
+            ValueError: If a constraint is not between -1 and 1
+        """
+        logger.info("Finding best threshold with constraints %s, objective %s", dict(constraints), objective)
+
+        table = self.table
+        valid = np.ones(len(table), dtype=bool)
+        for metric_type, minimum in constraints.items():
+            if not -1 <= minimum <= 1:
+                logger.error("Invalid constraint %s >= %s", metric_type, minimum)
+                raise ValueError("Constraint values must be between -1 and 1")
+            valid &= self.metric_column(metric_type) >= minimum
+
+        candidates = np.flatnonzero(valid)
+        if candidates.size == 0:
+            logger.warning("No thresholds found meeting all constraints")
+            return None
+
+        if objective is None:
+            best_threshold = float(table.threshold[candidates].max())
+        else:
+            # lexsort uses the last key as primary: objective first, then threshold
+            scores = self.metric_column(objective)[candidates]
+            best = candidates[np.lexsort((table.threshold[candidates], scores))[-1]]
+            best_threshold = float(table.threshold[best])
 
+        logger.info("Found best threshold: %.4f", best_threshold)
         return best_threshold
+
+    def pareto_front(
+        self,
+        metrics: Sequence[MetricType] = (MetricType.PRECISION, MetricType.RECALL)
+    ) -> List[ParetoPoint]:
+        """
+        Find the thresholds whose metric values no other threshold dominates.
+
+        Rows with identical metric values are reported once, at the highest threshold.
+
+        Args:
+            metrics: Metrics to trade off, all maximized (default: precision, recall)
+
+        Returns:
+            Pareto-optimal points, sorted by threshold in ascending order.
+
+        Raises:
+            ValueError: If fewer than two metrics are given
+        """
+        if len(metrics) < 2:
+            raise ValueError("Pareto front needs at least two metrics")
+
+        table = self.table
+        values = np.column_stack([self.metric_column(metric_type) for metric_type in metrics])
+        logger.debug("Computing Pareto front of %d rows over %s", len(table), list(metrics))
+
+        # Visit rows best-first: a row can only be dominated by rows visited before it
+        order = np.lexsort((-table.threshold,) + tuple(-values[:, i] for i in reversed(range(values.shape[1]))))
+        if values.shape[1] == 2:
+            # Two metrics: a row survives iff it beats every earlier row on the second one
+            second = values[order, 1]
+            best_so_far = np.concatenate(([-np.inf], np.maximum.accumulate(second)[:-1]))
+            front = order[second > best_so_far].tolist()
+        elif values.shape[1] == 3:
+            front = order[_skyline_3d(values[order])].tolist()
+        else:
+            front = order[_block_skyline(values[order])].tolist()
+
+        front.sort(key=lambda row: table.threshold[row])
+        return [
+            ParetoPoint(
+                threshold=float(table.threshold[row]),
+                metrics={metric_type: float(values[row, i]) for i, metric_type in enumerate(metrics)}
+            )
+            for row in front
+        ]
+
+def _skyline_3d(values: np.ndarray) -> np.ndarray:
+    """
+    Mask of the rows no earlier row dominates, for three metrics in best-first order.
+
+    Rows are visited by decreasing first metric, so a row is dominated iff an
+    earlier front row is at least as good on the other two. Those are kept as
+    a staircase (second metric ascending, third descending), where the test
+    and the insertion are binary searches.
+    """
+    second_keys: List[float] = []
+    negated_third: List[float] = []
+    kept = np.zeros(len(values), dtype=bool)
+    for row, (_, second, third) in enumerate(values.tolist()):
+        start = bisect.bisect_left(second_keys, second)
+        if start < len(second_keys) and -negated_third[start] >= third:
+            continue
+        # Drop the staircase points the new row dominates, then insert it
+        stop = bisect.bisect_right(second_keys, second, start)
+        first = bisect.bisect_left(negated_third, -third, 0, start)
+        second_keys[first:stop] = [second]
+        negated_third[first:stop] = [-third]
+        kept[row] = True
+    return kept
+
+def _block_skyline(values: np.ndarray) -> np.ndarray:
+    """
+    Mask of the rows no earlier row dominates, for any number of metrics in best-first order.
+
+    Candidates are filtered PARETO_BLOCK_SIZE at a time, with broadcast
+    comparisons against the front found so far and the earlier rows of their block.
+    """
+    kept = np.zeros(len(values), dtype=bool)
+    front = values[:0]
+    for start in range(0, len(values), PARETO_BLOCK_SIZE):
+        block = values[start:start + PARETO_BLOCK_SIZE]
+        dominated = np.triu(np.all(block[:, None, :] >= block[None, :, :], axis=2), 1).any(axis=0)
+        for front_start in range(0, len(front), PARETO_BLOCK_SIZE * 16):
+            chunk = front[front_start:front_start + PARETO_BLOCK_SIZE * 16]
+            dominated |= np.all(chunk[:, None, :] >= block[None, :, :], axis=2).any(axis=0)
+        kept[start:start + len(block)] = ~dominated
+        front = np.concatenate((front, block[~dominated]))
+    return kept
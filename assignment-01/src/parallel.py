@@ -0,0 +1,132 @@
+from src.evaluator import MetricsCalculator
+from src.storage import load_table
+from utils.data_types import InputDataType, MetricType, OptimizationResult, ThresholdTable
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Mapping, Optional, Tuple, Union
+import numpy as np
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows in total the jobs are solved serially: the vectorized
+# scan costs a few tens of nanoseconds per row, so smaller batches do not
+# pay for starting a process pool
+PARALLEL_MIN_ROWS = 1 << 22
+
+# Tasks per worker; each task solves a contiguous group of jobs
+TASKS_PER_WORKER = 4
+
+# Tables of the current pool, set once per worker process by _init_worker
+_worker_tables: List[ThresholdTable] = []
+
+def _best_threshold(table: ThresholdTable, metric_type: MetricType, min_threshold: float, beta: float):
+    """Return (best threshold, its metric value) for one table, or (None, None)."""
+    metrics = MetricsCalculator.calculate_metric_batch(table, metric_type, beta)
+    valid = np.flatnonzero(metrics >= min_threshold)
+    if valid.size == 0:
+        return None, None
+
+    best = valid[np.argmax(table.threshold[valid])]
+    return float(table.threshold[best]), float(metrics[best])
+
+def _init_worker(sources: List[Union[str, ThresholdTable]]) -> None:
+    """Worker initializer: memory-map the file-backed jobs and keep the in-memory ones."""
+    global _worker_tables
+    _worker_tables = [load_table(source) if isinstance(source, str) else source for source in sources]
+
+def _solve_group(task: Tuple) -> List[Tuple[Optional[float], Optional[float]]]:
+    """Worker entry point: solve the jobs start:stop of the pool's tables."""
+    start, stop, metric_type, min_threshold, beta = task
+    return [_best_threshold(table, metric_type, min_threshold, beta) for table in _worker_tables[start:stop]]
+
+def optimize_many(
+    jobs: Mapping[str, Union[ThresholdTable, List[InputDataType], str, os.PathLike]],
+    metric_type: MetricType = MetricType.RECALL,
+    min_threshold: float = 0.9,
+    workers: Optional[int] = None,
+    beta: float = 1.0
+) -> List[OptimizationResult]:
+    """
+    Find the best threshold of many independent jobs over a process pool.
+
+    Jobs given as sweep file paths (see storage.save_table) are memory-mapped
+    by every worker, so only the path is sent. In-memory tables are handed to
+    the workers once, when the pool starts: with the fork start method they
+    are inherited without a copy, otherwise each worker receives them once.
+    Every task then solves a contiguous group of jobs of about the same row
+    count. Batches under PARALLEL_MIN_ROWS rows are solved serially.
+
+    Args:
+        jobs: Mapping of job name (model, class, ...) to its threshold data,
+            or to the path of a sweep file
+        metric_type: Type of metric to optimize (default: recall)
+        min_threshold: Minimum required metric value (default: 0.9)
+        workers: Number of worker processes (default: os.cpu_count())
+        beta: Recall weight, only used by MetricType.F_BETA (default: 1.0)
+
+    Returns:
+        One OptimizationResult per job, in the order of jobs.
+
+    Raises:
+        ValueError: If min_threshold is not between 0 and 1, a job is empty
+            or a sweep file is invalid
+    """
+    if not 0 <= min_threshold <= 1:
+        logger.error(f"Invalid min_threshold value: {min_threshold}")
+        raise ValueError("min_threshold must be between 0 and 1")
+
+    names = list(jobs)
+    tables = []
+    sources = []
+    for name in names:
+        table = jobs[name]
+        if isinstance(table, (str, os.PathLike)):
+            # Only the header is read here; workers map the file themselves
+            source = os.fspath(table)
+            table = load_table(source)
+        else:
+            if not isinstance(table, ThresholdTable):
+                table = ThresholdTable.from_records(table)
+            source = table
+        if len(table) == 0:
+            logger.error(f"Job {name} has no data")
+            raise ValueError(f"Metrics list cannot be empty (job {name})")
+        tables.append(table)
+        sources.append(source)
+
+    workers = workers or os.cpu_count() or 1
+    rows = [len(table) for table in tables]
+    total_rows = sum(rows)
+
+    if workers == 1 or len(names) <= 1 or total_rows < PARALLEL_MIN_ROWS:
+        logger.info(f"Optimizing {len(names)} jobs ({total_rows} rows) serially")
+        solved = [_best_threshold(table, metric_type, min_threshold, beta) for table in tables]
+        return _to_results(names, tables, solved)
+
+    workers = min(workers, len(names))
+    logger.info(f"Optimizing {len(names)} jobs ({total_rows} rows) with {workers} workers")
+
+    bounds = _group_bounds(rows, workers * TASKS_PER_WORKER)
+    tasks = [(start, stop, metric_type, min_threshold, beta) for start, stop in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(sources,)) as executor:
+        solved = [result for group in executor.map(_solve_group, tasks) for result in group]
+
+    return _to_results(names, tables, solved)
+
+def _to_results(names, tables, solved) -> List[OptimizationResult]:
+    """Wrap raw (threshold, metric) pairs into OptimizationResult rows."""
+    results = [
+        OptimizationResult(job=str(name), rows=len(table), best_threshold=best, metric_value=value)
+        for name, table, (best, value) in zip(names, tables, solved)
+    ]
+    logger.info(f"Optimized {len(results)} jobs")
+    return results
+
+def _group_bounds(rows: List[int], groups: int) -> List[int]:
+    """Split jobs into at most `groups` contiguous, non-empty ranges of about equal row count."""
+    targets = np.arange(1, groups) * (sum(rows) / groups)
+    # Close a group at the first job whose cumulative row count reaches its target
+    cuts = np.searchsorted(np.cumsum(rows), targets) + 1
+    return sorted(set([0, *cuts.tolist(), len(rows)]))
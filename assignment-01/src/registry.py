@@ -0,0 +1,315 @@
+from src.optimizer import ThresholdOptimizer
+from src.streaming import ConfusionAccumulator
+from utils.data_types import InputDataType, MetricType, ThresholdTable
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+import numpy as np
+import threading
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default upper bound on the bytes held by all cached entries
+DEFAULT_MEMORY_BUDGET = 256 * 2**20
+
+Key = Tuple[Hashable, Hashable]
+
+class _Entry:
+    """One cached model version: its optimizer with a built index, and the counts behind it."""
+
+    __slots__ = ("optimizer", "accumulator", "nbytes", "update_lock")
+
+    def __init__(self, optimizer: ThresholdOptimizer, accumulator: Optional[ConfusionAccumulator],
+                 update_lock: Optional[threading.Lock] = None):
+        optimizer.build_index()
+        self.optimizer = optimizer
+        self.accumulator = accumulator
+        self.nbytes = _entry_nbytes(optimizer, accumulator)
+        # Serializes the updates of a model version; passed on to the entry an update produces
+        self.update_lock = update_lock or threading.Lock()
+
+class ThresholdRegistry:
+    """
+    Long-lived, in-memory cache of preprocessed threshold optimizers keyed by (model, version).
+
+    Every entry keeps its sweep table, metric column and ThresholdIndex, so a
+    query is a binary search. The least recently used entries are evicted
+    once the cached bytes exceed the memory budget. Safe to share between
+    threads: updates of one model version are serialized, and queries keep
+    using the previous entry until an update is stored. query_async batches
+    the concurrent queries of each event loop separately.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        metric_type: MetricType = MetricType.RECALL,
+        beta: float = 1.0
+    ):
+        """
+        Args:
+            memory_budget: Upper bound on the bytes of all cached entries
+                (default: DEFAULT_MEMORY_BUDGET)
+            metric_type: Metric the queries constrain (default: recall)
+            beta: Recall weight, only used by MetricType.F_BETA (default: 1.0)
+
+        Raises:
+            ValueError: If memory_budget is not positive
+        """
+        if memory_budget <= 0:
+            raise ValueError("memory_budget must be positive")
+
+        self.memory_budget = memory_budget
+        self.metric_type = metric_type
+        self.beta = beta
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Queries waiting for the next flush, per event loop
+        self._pending: Dict[asyncio.AbstractEventLoop, List[Tuple[Key, float, asyncio.Future]]] = {}
+        self.memory_usage = 0
+
+    def register(
+        self,
+        model: Hashable,
+        version: Hashable,
+        data: Union[ThresholdTable, List[InputDataType], ConfusionAccumulator]
+    ) -> ThresholdOptimizer:
+        """
+        Preprocess and cache one model version, replacing any previous entry.
+
+        Args:
+            model: Model identifier
+            version: Model version identifier
+            data: Sweep as a ThresholdTable or list of InputDataType, or a
+                ConfusionAccumulator whose counts later updates extend
+
+        Returns:
+            The cached optimizer, with its index built.
+        """
+        accumulator = data if isinstance(data, ConfusionAccumulator) else None
+        if accumulator is not None:
+            table = accumulator.to_table()
+        elif isinstance(data, ThresholdTable):
+            table = data
+        else:
+            # Cache the columns only, never the row objects, so the budget sees everything held
+            table = ThresholdTable.from_records(data)
+        optimizer = ThresholdOptimizer(table, self.metric_type, self.beta, index=True)
+        entry = _Entry(optimizer, accumulator)
+        logger.info("Registering model %s version %s (%d bytes)", model, version, entry.nbytes)
+
+        with self._lock:
+            self._store((model, version), entry)
+        return optimizer
+
+    def update(self, model: Hashable, version: Hashable, *batch) -> ThresholdOptimizer:
+        """
+        Fold new labelled data into a cached entry without rebuilding it from all samples.
+
+        The entry's confusion counts are extended, then only the per-threshold
+        table, metric column and index are recomputed, at a cost proportional
+        to the number of thresholds.
+
+        Args:
+            model: Model identifier
+            version: Model version identifier
+            *batch: (scores, labels) or (scores, labels, sample_weight) of the
+                new samples, or a single ThresholdTable / List[InputDataType]
+                evaluated at the entry's thresholds
+
+        Returns:
+            The refreshed optimizer.
+
+        Raises:
+            ValueError: If the entry does not exist, or the batch does not fit it
+        """
+        key = (model, version)
+        while True:
+            with self._lock:
+                entry = self._entry(key)
+            with entry.update_lock:
+                with self._lock:
+                    if self._entries.get(key) is not entry:
+                        # Another update, a register or an evict got there first
+                        continue
+
+                accumulator = entry.accumulator
+                if accumulator is None:
+                    # First update of an entry registered from a table
+                    table = entry.optimizer.table
+                    accumulator = ConfusionAccumulator(table.threshold).update_table(table)
+
+                # Extend a copy, so concurrent queries keep using the current entry
+                updated = ConfusionAccumulator(accumulator.thresholds).merge(accumulator)
+                if len(batch) == 1:
+                    updated.update_table(batch[0])
+                else:
+                    updated.update(*batch)
+                optimizer = ThresholdOptimizer(updated.to_table(), self.metric_type, self.beta, index=True)
+
+                with self._lock:
+                    # Only a register or an evict can have replaced the entry meanwhile
+                    if self._entries.get(key) is entry:
+                        self._store(key, _Entry(optimizer, updated, entry.update_lock))
+                        logger.info("Updated model %s version %s to %d samples", model, version, updated.samples)
+                        return optimizer
+            logger.debug("Model %s version %s changed during an update, retrying", model, version)
+
+    def get(self, model: Hashable, version: Hashable) -> ThresholdOptimizer:
+        """
+        Return the cached optimizer of a model version, marking it as recently used.
+
+        Raises:
+            ValueError: If the entry does not exist
+        """
+        with self._lock:
+            return self._entry((model, version)).optimizer
+
+    def evict(self, model: Hashable, version: Hashable) -> bool:
+        """Drop one entry; returns whether it was cached."""
+        with self._lock:
+            entry = self._entries.pop((model, version), None)
+            if entry is None:
+                return False
+            self.memory_usage -= entry.nbytes
+            return True
+
+    def query(self, model: Hashable, version: Hashable, min_threshold: float) -> Optional[float]:
+        """
+        Return the highest threshold of a model version whose metric is >= min_threshold.
+
+        Raises:
+            ValueError: If the entry does not exist or min_threshold is not between 0 and 1
+        """
+        _check_min_threshold(min_threshold)
+        return self.get(model, version).index.query(min_threshold)
+
+    def query_many(self, queries: Iterable[Tuple[Hashable, Hashable, float]]) -> List[Optional[float]]:
+        """
+        Answer a batch of (model, version, min_threshold) queries.
+
+        Queries are grouped by entry and every group is one vectorized binary
+        search.
+
+        Raises:
+            ValueError: On the first query with an unknown entry or an invalid min_threshold
+            TypeError: On the first query whose min_threshold is not a number
+        """
+        results = self._answer(list(queries))
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    async def query_async(self, model: Hashable, version: Hashable, min_threshold: float) -> Optional[float]:
+        """
+        Answer one query from an asyncio handler, batched with the other queries of the same loop iteration.
+
+        Raises:
+            ValueError: If the entry does not exist or min_threshold is not between 0 and 1
+            TypeError: If min_threshold is not a number
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            pending = self._pending.setdefault(loop, [])
+            pending.append(((model, version), min_threshold, future))
+            first = len(pending) == 1
+        if first:
+            loop.call_soon(self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Answer every pending asynchronous query of one event loop at once, from that loop."""
+        with self._lock:
+            pending = self._pending.pop(loop, [])
+        logger.debug("Answering %d batched queries", len(pending))
+
+        try:
+            results = self._answer([(key[0], key[1], min_threshold) for key, min_threshold, _ in pending])
+        except Exception as error:
+            # A callback's exception would only be logged by the loop; fail the batch instead
+            logger.exception("Answering %d batched queries failed", len(pending))
+            results = [error] * len(pending)
+
+        for (_, _, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _answer(self, queries: List[Tuple[Hashable, Hashable, float]]) -> List:
+        """Result, or the exception to raise, of every query."""
+        results: List = [None] * len(queries)
+        groups: Dict[Key, List[int]] = {}
+        for position, (model, version, min_threshold) in enumerate(queries):
+            try:
+                _check_min_threshold(min_threshold)
+            except Exception as error:
+                results[position] = error
+                continue
+            groups.setdefault((model, version), []).append(position)
+
+        for key, positions in groups.items():
+            try:
+                index = self.get(*key).index
+            except Exception as error:
+                for position in positions:
+                    results[position] = error
+                continue
+            best = index.query_many([queries[position][2] for position in positions])
+            for position, threshold in zip(positions, best.tolist()):
+                results[position] = None if np.isnan(threshold) else threshold
+
+        return results
+
+    def _entry(self, key: Key) -> _Entry:
+        """Look up an entry and mark it as most recently used; the lock must be held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            logger.error("No cached entry for model %s version %s", *key)
+            raise ValueError(f"No cached entry for model {key[0]} version {key[1]}")
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Key, entry: _Entry) -> None:
+        """Insert or replace an entry, then evict least recently used ones; the lock must be held."""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.memory_usage -= previous.nbytes
+        self._entries[key] = entry
+        self.memory_usage += entry.nbytes
+
+        while self.memory_usage > self.memory_budget and len(self._entries) > 1:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.memory_usage -= evicted.nbytes
+            logger.info("Evicted model %s version %s (%d bytes)", *evicted_key, evicted.nbytes)
+        if self.memory_usage > self.memory_budget:
+            logger.warning("Model %s version %s alone exceeds the memory budget", *key)
+
+    def __contains__(self, key: Key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+def _check_min_threshold(min_threshold: float) -> None:
+    """Validate a query the way ThresholdOptimizer.find_best_threshold does."""
+    if not 0 <= min_threshold <= 1:
+        logger.error("Invalid min_threshold value: %s", min_threshold)
+        raise ValueError("min_threshold must be between 0 and 1")
+
+def _entry_nbytes(optimizer: ThresholdOptimizer, accumulator: Optional[ConfusionAccumulator]) -> int:
+    """Bytes held by an entry's arrays: table columns, metric columns, index and counts."""
+    arrays = [getattr(optimizer.table, name) for name in ("threshold",) + ThresholdTable.COUNT_COLUMNS]
+    arrays += list(optimizer._metric_columns.values())
+    arrays += [optimizer.index.thresholds, optimizer.index._negated_suffix_max]
+    if accumulator is not None:
+        arrays += [accumulator.thresholds, accumulator.false_negatives, accumulator.true_negatives]
+    return int(sum(np.asarray(array).nbytes for array in arrays))
@@ -0,0 +1,103 @@
+from utils.data_types import ThresholdTable
+
+import numpy as np
+import logging
+import os
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Header: magic, version, flags, row count, CRC32 of the column data; padded
+# to 64 bytes so every column starts 8-byte aligned
+MAGIC = b"THSW"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQI")
+HEADER_SIZE = 64
+FLAG_FLOAT_COUNTS = 1
+
+_COLUMNS = ("threshold",) + ThresholdTable.COUNT_COLUMNS
+
+def save_table(table: ThresholdTable, path) -> None:
+    """
+    Write a ThresholdTable to the binary sweep format.
+
+    Layout: 64-byte header, then the threshold column (little-endian float64)
+    followed by the four count columns (little-endian int64, or float64 for
+    weighted counts), each stored contiguously.
+
+    Args:
+        table: Table to persist
+        path: Destination file path
+    """
+    float_counts = any(getattr(table, name).dtype.kind == "f" for name in ThresholdTable.COUNT_COLUMNS)
+    count_dtype = np.dtype("<f8") if float_counts else np.dtype("<i8")
+    rows = len(table)
+    logger.info(f"Saving {rows} rows to {path}")
+
+    columns = [np.ascontiguousarray(table.threshold, dtype="<f8")]
+    columns += [np.ascontiguousarray(getattr(table, name), dtype=count_dtype) for name in ThresholdTable.COUNT_COLUMNS]
+
+    checksum = 0
+    for column in columns:
+        checksum = zlib.crc32(memoryview(column).cast("B"), checksum)
+
+    flags = FLAG_FLOAT_COUNTS if float_counts else 0
+    header = HEADER.pack(MAGIC, VERSION, flags, rows, checksum).ljust(HEADER_SIZE, b"\0")
+
+    with open(path, "wb") as file:
+        file.write(header)
+        for column in columns:
+            file.write(memoryview(column).cast("B"))
+
+def load_table(path, verify: bool = False, validate: bool = False) -> ThresholdTable:
+    """
+    Memory-map a sweep file and return a ThresholdTable of zero-copy, read-only views.
+
+    Only the header is read eagerly; column pages are loaded by the OS when
+    queries touch them.
+
+    Args:
+        path: File written by save_table
+        verify: Check the CRC32 checksum, which reads every page (default: False)
+        validate: Check the InputDataType bounds, which reads every page (default: False)
+
+    Raises:
+        ValueError: If the file is not a valid sweep file
+    """
+    with open(path, "rb") as file:
+        raw_header = file.read(HEADER_SIZE)
+
+    if len(raw_header) < HEADER_SIZE:
+        logger.error(f"File {path} is too short to hold a sweep header")
+        raise ValueError("Invalid sweep file: truncated header")
+
+    magic, version, flags, rows, checksum = HEADER.unpack_from(raw_header)
+    if magic != MAGIC:
+        logger.error(f"File {path} has magic {magic!r}, expected {MAGIC!r}")
+        raise ValueError("Invalid sweep file: bad magic number")
+    if version != VERSION:
+        logger.error(f"File {path} has unsupported version {version}")
+        raise ValueError(f"Unsupported sweep file version: {version}")
+
+    expected_size = HEADER_SIZE + len(_COLUMNS) * rows * 8
+    if os.path.getsize(path) != expected_size:
+        logger.error(f"File {path} should be {expected_size} bytes")
+        raise ValueError("Invalid sweep file: size does not match the header")
+
+    if rows == 0:
+        return ThresholdTable([], [], [], [], [], validate=False)
+
+    count_dtype = np.dtype("<f8") if flags & FLAG_FLOAT_COUNTS else np.dtype("<i8")
+    threshold = np.memmap(path, dtype="<f8", mode="r", offset=HEADER_SIZE, shape=(rows,))
+    counts = np.memmap(path, dtype=count_dtype, mode="r", offset=HEADER_SIZE + rows * 8, shape=(4, rows))
+
+    if verify:
+        actual = zlib.crc32(memoryview(threshold).cast("B"))
+        actual = zlib.crc32(memoryview(counts).cast("B"), actual)
+        if actual != checksum:
+            logger.error(f"Checksum mismatch in {path}: {actual:#010x} != {checksum:#010x}")
+            raise ValueError("Invalid sweep file: checksum mismatch")
+
+    logger.debug(f"Memory-mapped {rows} rows from {path}")
+    return ThresholdTable(threshold, *counts, validate=validate)
@@ -0,0 +1,144 @@
+from src.sweep import validate_scores
+from utils.data_types import InputDataType, ThresholdTable
+
+from typing import Iterable, List, Union
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ConfusionAccumulator:
+    """Running, mergeable per-threshold confusion matrix over a fixed threshold grid."""
+
+    def __init__(self, thresholds):
+        """
+        Initialize an empty accumulator.
+
+        Memory use depends only on the number of thresholds, never on the
+        number of samples consumed.
+
+        Args:
+            thresholds: Thresholds to track, each between 0 and 1
+
+        Raises:
+            ValueError: If thresholds is empty or out of bounds
+        """
+        thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+        if thresholds.size == 0:
+            raise ValueError("thresholds cannot be empty")
+        if not np.all((thresholds >= 0.0) & (thresholds <= 1.0)):
+            raise ValueError("Threshold values must be between 0 and 1")
+
+        self.thresholds = thresholds
+        # Samples below each threshold are the negatives/false negatives there;
+        # the totals give the positive side by subtraction
+        self.false_negatives = np.zeros(thresholds.size, dtype=np.int64)
+        self.true_negatives = np.zeros(thresholds.size, dtype=np.int64)
+        self.positives = 0
+        self.negatives = 0
+        self.samples = 0
+
+    def update(self, scores, labels, sample_weight=None) -> "ConfusionAccumulator":
+        """
+        Add a chunk of raw scores and labels.
+
+        Args:
+            scores: Predicted scores, one per sample
+            labels: Binary ground truth labels (0/1 or bool), one per sample
+            sample_weight: Optional non-negative weight per sample
+        """
+        scores, positive_weight, negative_weight = validate_scores(scores, labels, sample_weight)
+
+        # Bin b holds the samples scoring at or above exactly b thresholds
+        bins = np.searchsorted(self.thresholds, scores, side="right")
+        size = self.thresholds.size + 1
+        if sample_weight is None:
+            positive_hist = np.bincount(bins[positive_weight > 0], minlength=size)
+            negative_hist = np.bincount(bins[negative_weight > 0], minlength=size)
+        else:
+            positive_hist = np.bincount(bins, weights=positive_weight, minlength=size)
+            negative_hist = np.bincount(bins, weights=negative_weight, minlength=size)
+
+        self.false_negatives = self.false_negatives + np.cumsum(positive_hist)[:-1]
+        self.true_negatives = self.true_negatives + np.cumsum(negative_hist)[:-1]
+        self.positives = self.positives + positive_hist.sum()
+        self.negatives = self.negatives + negative_hist.sum()
+        self.samples += scores.size
+
+        return self
+
+    def update_table(self, table: Union[ThresholdTable, List[InputDataType]]) -> "ConfusionAccumulator":
+        """
+        Add precomputed counts evaluated at exactly this accumulator's thresholds.
+
+        Args:
+            table: ThresholdTable or list of InputDataType for one batch of samples
+
+        Raises:
+            ValueError: If the batch was evaluated at different thresholds
+        """
+        if not isinstance(table, ThresholdTable):
+            table = ThresholdTable.from_records(table)
+        if len(table) == 0:
+            return self
+
+        order = np.argsort(table.threshold, kind="stable")
+        if not np.array_equal(table.threshold[order], self.thresholds):
+            logger.error("Batch thresholds do not match the accumulator thresholds")
+            raise ValueError("Batch must be evaluated at the accumulator thresholds")
+
+        positives = table.true_positives + table.false_negatives
+        negatives = table.true_negatives + table.false_positives
+        self.false_negatives = self.false_negatives + table.false_negatives[order]
+        self.true_negatives = self.true_negatives + table.true_negatives[order]
+        self.positives = self.positives + positives[0]
+        self.negatives = self.negatives + negatives[0]
+        self.samples += positives[0] + negatives[0]
+
+        return self
+
+    def merge(self, other: "ConfusionAccumulator") -> "ConfusionAccumulator":
+        """
+        Combine with the partial result of another shard, in place.
+
+        Raises:
+            ValueError: If the accumulators track different thresholds
+        """
+        if not np.array_equal(self.thresholds, other.thresholds):
+            raise ValueError("Cannot merge accumulators with different thresholds")
+
+        self.false_negatives = self.false_negatives + other.false_negatives
+        self.true_negatives = self.true_negatives + other.true_negatives
+        self.positives = self.positives + other.positives
+        self.negatives = self.negatives + other.negatives
+        self.samples += other.samples
+
+        return self
+
+    def consume(self, chunks: Iterable) -> "ConfusionAccumulator":
+        """
+        Add every chunk of an iterator or generator.
+
+        Args:
+            chunks: Iterable of (scores, labels), (scores, labels, sample_weight),
+                ThresholdTable or List[InputDataType] batches
+        """
+        for number, chunk in enumerate(chunks):
+            if isinstance(chunk, tuple):
+                self.update(*chunk)
+            else:
+                self.update_table(chunk)
+            logger.debug(f"Consumed chunk {number}, {self.samples} samples so far")
+
+        return self
+
+    def to_table(self) -> ThresholdTable:
+        """Return the accumulated confusion matrix at every threshold."""
+        return ThresholdTable(
+            self.thresholds.copy(),
+            self.positives - self.false_negatives,
+            self.true_negatives.copy(),
+            self.negatives - self.true_negatives,
+            self.false_negatives.copy(),
+            validate=False
+        )
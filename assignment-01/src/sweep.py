@@ -0,0 +1,97 @@
+from utils.data_types import ThresholdTable
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+def validate_scores(scores, labels, sample_weight=None):
+    """
+    Validate raw prediction scores and binary labels.
+
+    Args:
+        scores: Predicted scores, one per sample
+        labels: Binary ground truth labels (0/1 or bool), one per sample
+        sample_weight: Optional non-negative weight per sample
+
+    Returns:
+        Tuple of (scores, positive weights, negative weights) as arrays. The
+        weights are int64 when no sample_weight is given, float64 otherwise.
+
+    Raises:
+        ValueError: If the inputs are malformed
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels)
+
+    if scores.ndim != 1 or labels.shape != scores.shape:
+        logger.error(f"Shape mismatch: scores {scores.shape}, labels {labels.shape}")
+        raise ValueError("scores and labels must be one-dimensional and of equal length")
+
+    if np.isnan(scores).any():
+        logger.error("NaN found in scores")
+        raise ValueError("scores must not contain NaN")
+
+    positives = labels == 1
+    if not np.all(positives | (labels == 0)):
+        logger.error("Non-binary values found in labels")
+        raise ValueError("labels must only contain 0 and 1")
+
+    if sample_weight is None:
+        weight = np.ones(scores.shape, dtype=np.int64)
+    else:
+        weight = np.asarray(sample_weight, dtype=np.float64)
+        if weight.shape != scores.shape:
+            raise ValueError("sample_weight must have the same length as scores")
+        if not np.all(weight >= 0):
+            raise ValueError("sample_weight must be greater than or equal to 0")
+
+    return scores, np.where(positives, weight, 0), np.where(positives, 0, weight)
+
+def build_threshold_table(scores, labels, thresholds=None, sample_weight=None) -> ThresholdTable:
+    """
+    Build the confusion matrix at every threshold in a single sorted pass.
+
+    A sample is predicted positive when its score is >= the threshold.
+
+    Args:
+        scores: Predicted scores between 0 and 1, one per sample
+        labels: Binary ground truth labels (0/1 or bool), one per sample
+        thresholds: Thresholds to evaluate (default: every distinct score)
+        sample_weight: Optional non-negative weight per sample
+
+    Returns:
+        ThresholdTable sorted by threshold in ascending order.
+
+    Raises:
+        ValueError: If the inputs are malformed
+    """
+    scores, positive_weight, negative_weight = validate_scores(scores, labels, sample_weight)
+    logger.info(f"Building threshold table from {scores.size} scores")
+
+    order = np.argsort(scores, kind="stable")
+    sorted_scores = scores[order]
+
+    # Cumulative weight of the samples strictly below each cut point
+    positives_below = np.concatenate(([0], np.cumsum(positive_weight[order])))
+    negatives_below = np.concatenate(([0], np.cumsum(negative_weight[order])))
+
+    if thresholds is None:
+        thresholds = np.unique(sorted_scores)
+    else:
+        thresholds = np.sort(np.asarray(thresholds, dtype=np.float64))
+
+    cut = np.searchsorted(sorted_scores, thresholds, side="left")
+    false_negatives = positives_below[cut]
+    true_negatives = negatives_below[cut]
+
+    table = ThresholdTable(
+        thresholds,
+        positives_below[-1] - false_negatives,
+        true_negatives,
+        negatives_below[-1] - true_negatives,
+        false_negatives
+    )
+    logger.debug(f"Built threshold table with {len(table)} thresholds")
+
+    return table
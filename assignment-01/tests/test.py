@@ -1,8 +1,23 @@
 import pytest
+import asyncio
+import json
+import time
+import threading
+import numpy as np
 from unittest.mock import patch
-from utils.data_types import InputDataType, MetricType
+from concurrent.futures import ThreadPoolExecutor
+from utils.data_types import InputDataType, MetricType, ThresholdTable
 from src.evaluator import MetricsCalculator
 from src.optimizer import ThresholdOptimizer
+from src.index import ThresholdIndex
+from src.sweep import build_threshold_table
+from src.streaming import ConfusionAccumulator
+from src.parallel import _group_bounds, optimize_many
+from src.storage import load_table, save_table
+from src.bootstrap import bootstrap_threshold
+from src.registry import ThresholdRegistry
+from benchmarks.harness import compare, main
+from benchmarks.suite import cases
 
 @pytest.fixture
 def metrics_list():
@@ -12,6 +27,37 @@ def metrics_list():
         InputDataType(threshold=0.7, true_positives=70, true_negatives=90, false_positives=10, false_negatives=30)
     ]
 
+@pytest.fixture
+def metrics_table(metrics_list):
+    return ThresholdTable.from_records(metrics_list)
+
+# ThresholdTable Tests
+class TestThresholdTable:
+    def test_from_records_roundtrip(self, metrics_list):
+        """Test converting rows to columns and back"""
+        table = ThresholdTable.from_records(metrics_list)
+        assert len(table) == 3
+        assert table.threshold.tolist() == [0.3, 0.5, 0.7]
+        assert table.true_positives.tolist() == [90, 80, 70]
+        assert table.to_records() == metrics_list
+
+    def test_invalid_threshold(self):
+        """Test column validation of threshold bounds"""
+        with pytest.raises(ValueError, match="Threshold values must be between 0 and 1"):
+            ThresholdTable([0.5, 1.5], [1, 1], [1, 1], [1, 1], [1, 1])
+        with pytest.raises(ValueError, match="Threshold values must be between 0 and 1"):
+            ThresholdTable([float("nan")], [1], [1], [1], [1])
+
+    def test_negative_counts(self):
+        """Test column validation of count bounds"""
+        with pytest.raises(ValueError, match="false_negatives must be greater than or equal to 0"):
+            ThresholdTable([0.5], [1], [1], [1], [-1])
+
+    def test_mismatched_lengths(self):
+        """Test columns of different lengths"""
+        with pytest.raises(ValueError, match="same length"):
+            ThresholdTable([0.5, 0.6], [1], [1, 1], [1, 1], [1, 1])
+
 # MetricsCalculator Tests
 class TestMetricsCalculator:
     def test_calculate_recall_normal(self):
@@ -46,6 +92,47 @@ class TestMetricsCalculator:
         with pytest.raises(ValueError, match="Invalid metric type"):
             MetricsCalculator.calculate_metric(metrics, "invalid_metric")
 
+    @pytest.mark.parametrize("metric_type,expected", [
+        (MetricType.RECALL, 0.8),
+        (MetricType.PRECISION, 0.8),
+        (MetricType.SPECIFICITY, 0.8),
+        (MetricType.ACCURACY, 0.8),
+        (MetricType.F1, 0.8),
+        (MetricType.F_BETA, 0.8),
+        (MetricType.BALANCED_ACCURACY, 0.8),
+        (MetricType.MCC, 0.6),
+    ])
+    def test_calculate_metrics_batch(self, metrics_table, metric_type, expected):
+        """Test batch metrics against single-row calculation"""
+        values = MetricsCalculator.calculate_metric_batch(metrics_table, metric_type)
+        assert values.shape == (3,)
+        assert values[1] == pytest.approx(expected)
+        for i, row in enumerate(metrics_table.to_records()):
+            assert values[i] == MetricsCalculator.calculate_metric(row, metric_type)
+
+    def test_calculate_metrics_known_values(self):
+        """Test batch metrics on an asymmetric confusion matrix"""
+        tp, tn, fp, fn = [90], [70], [30], [10]
+        calc = MetricsCalculator.calculate_metrics
+        assert calc(tp, tn, fp, fn, MetricType.PRECISION)[0] == pytest.approx(0.75)
+        assert calc(tp, tn, fp, fn, MetricType.SPECIFICITY)[0] == pytest.approx(0.7)
+        assert calc(tp, tn, fp, fn, MetricType.F1)[0] == pytest.approx(180 / 220)
+        assert calc(tp, tn, fp, fn, MetricType.F_BETA, beta=2.0)[0] == pytest.approx(450 / 520)
+        assert calc(tp, tn, fp, fn, MetricType.BALANCED_ACCURACY)[0] == pytest.approx(0.8)
+        assert calc(tp, tn, fp, fn, MetricType.MCC)[0] == pytest.approx(6000 / (120 * 100 * 100 * 80) ** 0.5)
+
+    @pytest.mark.parametrize("metric_type", list(MetricType))
+    def test_calculate_metrics_zero_denominator(self, metric_type):
+        """Test batch metrics return 0.0 instead of raising on empty denominators"""
+        values = MetricsCalculator.calculate_metrics([0, 0], [0, 5], [0, 0], [0, 0], metric_type)
+        assert values[0] == 0.0
+        assert np.all(np.isfinite(values))
+
+    def test_calculate_metrics_invalid(self):
+        """Test invalid metric type in batch mode"""
+        with pytest.raises(ValueError, match="Invalid metric type"):
+            MetricsCalculator.calculate_metrics([1], [1], [1], [1], "invalid_metric")
+
 # ThresholdOptimizer Tests
 class TestThresholdOptimizer:
     def test_init_empty_list(self):
@@ -92,6 +179,595 @@ class TestThresholdOptimizer:
             result = optimizer.find_best_threshold(min_threshold=1)
             assert result == 0.7  # Should return highest threshold meeting criteria
 
+    def test_quiet_mode_skips_row_calculation(self, metrics_list):
+        """Test quiet mode never calls the per-row calculator"""
+        optimizer = ThresholdOptimizer(metrics_list, MetricType.RECALL, quiet=True)
+        with patch.object(MetricsCalculator, 'calculate_metric') as mock_calc:
+            assert optimizer.find_best_threshold(min_threshold=0.8) == 0.5
+            mock_calc.assert_not_called()
+
+    def test_search_summary(self, metrics_list):
+        """Test the instrumentation record of a search"""
+        optimizer = ThresholdOptimizer(metrics_list, MetricType.RECALL)
+        assert optimizer.last_search is None
+        optimizer.find_best_threshold(min_threshold=0.8)
+        summary = optimizer.last_search
+        assert summary.rows_scanned == 3
+        assert summary.rows_passing == 2
+        assert summary.best_threshold == 0.5
+        assert summary.elapsed_seconds >= 0
+
+        quiet = ThresholdOptimizer(metrics_list, MetricType.RECALL, quiet=True)
+        quiet.find_best_threshold(min_threshold=0.95)
+        assert quiet.last_search.rows_passing == 0
+        assert quiet.last_search.best_threshold is None
+
+    @pytest.mark.parametrize("metric_type", list(MetricType))
+    def test_find_best_threshold_table(self, metrics_list, metrics_table, metric_type):
+        """Test columnar input gives the same result as the list form"""
+        for min_threshold in (0.0, 0.5, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0):
+            expected = ThresholdOptimizer(metrics_list, metric_type).find_best_threshold(min_threshold)
+            result = ThresholdOptimizer(metrics_table, metric_type).find_best_threshold(min_threshold)
+            assert result == expected
+
+    def test_init_empty_table(self):
+        """Test initialization with an empty table"""
+        with pytest.raises(ValueError, match="Metrics list cannot be empty"):
+            ThresholdOptimizer(ThresholdTable([], [], [], [], []))
+
+# ThresholdIndex Tests
+class TestThresholdIndex:
+    def test_matches_scan_random(self):
+        """Test indexed queries give the same answers as a full scan"""
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            thresholds = rng.choice(np.linspace(0, 1, 11), size=40)
+            metrics = rng.random(40)
+            index = ThresholdIndex(thresholds, metrics)
+            for min_threshold in np.linspace(0, 1, 23):
+                valid = thresholds[metrics >= min_threshold]
+                expected = float(valid.max()) if valid.size else None
+                assert index.query(min_threshold) == expected
+
+    def test_monotone_fast_path(self):
+        """Test non-increasing metrics are detected and queried correctly"""
+        index = ThresholdIndex(np.array([0.7, 0.3, 0.5]), np.array([0.7, 0.9, 0.8]))
+        assert index.monotone
+        assert index.query(0.8) == 0.5
+        assert index.query(0.95) is None
+        assert not ThresholdIndex(np.array([0.3, 0.5]), np.array([0.1, 0.9])).monotone
+
+    @pytest.mark.parametrize("metric_type", [MetricType.RECALL, MetricType.F1, MetricType.MCC])
+    def test_optimizer_with_index(self, metrics_list, metric_type):
+        """Test the optimizer's index mode against its scan mode"""
+        indexed = ThresholdOptimizer(metrics_list, metric_type, index=True)
+        scanned = ThresholdOptimizer(metrics_list, metric_type)
+        assert indexed.index is not None
+        for min_threshold in (0.0, 0.5, 0.7, 0.75, 0.8, 0.9, 1.0):
+            assert indexed.find_best_threshold(min_threshold) == scanned.find_best_threshold(min_threshold)
+
+# Score Sweep Tests
+class TestBuildThresholdTable:
+    @staticmethod
+    def naive_counts(scores, labels, threshold, weights):
+        predicted = scores >= threshold
+        return (
+            weights[predicted & (labels == 1)].sum(),
+            weights[~predicted & (labels == 0)].sum(),
+            weights[predicted & (labels == 0)].sum(),
+            weights[~predicted & (labels == 1)].sum(),
+        )
+
+    def test_matches_naive_counts(self):
+        """Test the sorted cumulative pass against per-threshold counting"""
+        rng = np.random.default_rng(1)
+        scores = rng.choice(np.linspace(0, 1, 21), size=200)
+        labels = rng.integers(0, 2, size=200)
+        table = build_threshold_table(scores, labels)
+        assert table.threshold.tolist() == sorted(set(scores.tolist()))
+        assert table.true_positives.dtype == np.int64
+        for i, threshold in enumerate(table.threshold):
+            expected = self.naive_counts(scores, labels, threshold, np.ones(200))
+            assert (table.true_positives[i], table.true_negatives[i],
+                    table.false_positives[i], table.false_negatives[i]) == expected
+
+    def test_requested_thresholds_and_weights(self):
+        """Test evaluation at given thresholds with sample weights"""
+        rng = np.random.default_rng(2)
+        scores = rng.random(100)
+        labels = rng.integers(0, 2, size=100)
+        weights = rng.random(100) * 3
+        thresholds = [0.9, 0.0, 0.25, 0.5, 1.0]
+        table = build_threshold_table(scores, labels, thresholds, sample_weight=weights)
+        assert table.threshold.tolist() == sorted(thresholds)
+        for i, threshold in enumerate(table.threshold):
+            expected = self.naive_counts(scores, labels, threshold, weights)
+            assert table.true_positives[i] == pytest.approx(expected[0])
+            assert table.true_negatives[i] == pytest.approx(expected[1])
+            assert table.false_positives[i] == pytest.approx(expected[2])
+            assert table.false_negatives[i] == pytest.approx(expected[3])
+
+    def test_invalid_inputs(self):
+        """Test validation of raw scores and labels"""
+        with pytest.raises(ValueError, match="equal length"):
+            build_threshold_table([0.1, 0.2], [1])
+        with pytest.raises(ValueError, match="labels must only contain 0 and 1"):
+            build_threshold_table([0.1, 0.2], [1, 2])
+        with pytest.raises(ValueError, match="Threshold values must be between 0 and 1"):
+            build_threshold_table([0.1, 1.2], [1, 0])
+
+    def test_optimizer_from_scores(self):
+        """Test the optimizer built from scores finds the expected threshold"""
+        scores = [0.1, 0.4, 0.35, 0.8, 0.7, 0.2]
+        labels = [0, 0, 1, 1, 1, 0]
+        optimizer = ThresholdOptimizer.from_scores(scores, labels, metric_type=MetricType.RECALL)
+        assert optimizer.find_best_threshold(min_threshold=1.0) == 0.35
+        assert optimizer.find_best_threshold(min_threshold=0.6) == 0.7
+
+# Streaming Tests
+class TestConfusionAccumulator:
+    @pytest.fixture
+    def samples(self):
+        rng = np.random.default_rng(3)
+        return rng.random(1000), rng.integers(0, 2, size=1000)
+
+    def test_chunks_match_single_pass(self, samples):
+        """Test chunked accumulation equals the in-memory sweep"""
+        scores, labels = samples
+        thresholds = np.linspace(0, 1, 21)
+        chunks = ((scores[i:i + 128], labels[i:i + 128]) for i in range(0, 1000, 128))
+        streamed = ConfusionAccumulator(thresholds).consume(chunks).to_table()
+        expected = build_threshold_table(scores, labels, thresholds)
+        for name in ("threshold",) + ThresholdTable.COUNT_COLUMNS:
+            assert getattr(streamed, name).tolist() == getattr(expected, name).tolist()
+
+    def test_merge_shards(self, samples):
+        """Test merging partial accumulators from different shards"""
+        scores, labels = samples
+        thresholds = np.linspace(0, 1, 11)
+        left = ConfusionAccumulator(thresholds).update(scores[:400], labels[:400])
+        right = ConfusionAccumulator(thresholds).update(scores[400:], labels[400:])
+        merged = left.merge(right).to_table()
+        expected = build_threshold_table(scores, labels, thresholds)
+        assert merged.true_positives.tolist() == expected.true_positives.tolist()
+        assert merged.false_positives.tolist() == expected.false_positives.tolist()
+        assert left.samples == 1000
+        with pytest.raises(ValueError, match="different thresholds"):
+            left.merge(ConfusionAccumulator([0.5]))
+
+    def test_table_batches(self, metrics_list):
+        """Test accumulating precomputed InputDataType batches"""
+        accumulator = ConfusionAccumulator([0.3, 0.5, 0.7])
+        accumulator.consume([metrics_list, ThresholdTable.from_records(metrics_list)])
+        table = accumulator.to_table()
+        assert table.true_positives.tolist() == [180, 160, 140]
+        assert table.false_positives.tolist() == [60, 40, 20]
+        with pytest.raises(ValueError, match="accumulator thresholds"):
+            accumulator.update_table(metrics_list[:2])
+
+    def test_optimizer_from_stream(self, samples):
+        """Test the optimizer built from a stream matches the in-memory one"""
+        scores, labels = samples
+        thresholds = np.linspace(0, 1, 101)
+        chunks = ((scores[i:i + 100], labels[i:i + 100]) for i in range(0, 1000, 100))
+        streamed = ThresholdOptimizer.from_stream(chunks, thresholds)
+        in_memory = ThresholdOptimizer.from_scores(scores, labels, thresholds)
+        for min_threshold in (0.5, 0.8, 0.95):
+            assert streamed.find_best_threshold(min_threshold) == in_memory.find_best_threshold(min_threshold)
+
+# Parallel Tests
+class TestOptimizeMany:
+    @pytest.fixture
+    def jobs(self, metrics_list):
+        rng = np.random.default_rng(4)
+        jobs = {"list": metrics_list}
+        for i in range(5):
+            jobs[f"class_{i}"] = build_threshold_table(rng.random(300), rng.integers(0, 2, size=300))
+        return jobs
+
+    @pytest.fixture(autouse=True)
+    def use_pool(self, monkeypatch):
+        # The test jobs are far below the serial cut-off
+        monkeypatch.setattr("src.parallel.PARALLEL_MIN_ROWS", 0)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_matches_serial_optimizer(self, jobs, workers):
+        """Test each job's result equals a standalone ThresholdOptimizer"""
+        results = optimize_many(jobs, MetricType.RECALL, min_threshold=0.8, workers=workers)
+        assert [result.job for result in results] == list(jobs)
+        for result in results:
+            optimizer = ThresholdOptimizer(jobs[result.job], MetricType.RECALL)
+            assert result.rows == len(jobs[result.job])
+            assert result.best_threshold == optimizer.find_best_threshold(min_threshold=0.8)
+            assert result.metric_value >= 0.8
+
+    def test_no_valid_threshold(self, metrics_list):
+        """Test jobs without a qualifying threshold"""
+        results = optimize_many({"a": metrics_list, "b": metrics_list}, min_threshold=1.0, workers=2)
+        assert all(result.best_threshold is None and result.metric_value is None for result in results)
+
+    def test_invalid_inputs(self, metrics_list):
+        """Test validation of the batch entry point"""
+        with pytest.raises(ValueError, match="min_threshold must be between 0 and 1"):
+            optimize_many({"a": metrics_list}, min_threshold=2)
+        with pytest.raises(ValueError, match="cannot be empty"):
+            optimize_many({"a": []})
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_file_backed_jobs(self, jobs, workers, tmp_path):
+        """Test sweep file paths give the same results as the in-memory tables"""
+        mixed = dict(jobs)
+        for name in ("class_0", "class_3"):
+            path = tmp_path / f"{name}.bin"
+            save_table(jobs[name], path)
+            mixed[name] = str(path) if name == "class_0" else path
+        expected = optimize_many(jobs, MetricType.F1, min_threshold=0.5, workers=1)
+        assert optimize_many(mixed, MetricType.F1, min_threshold=0.5, workers=workers) == expected
+
+    def test_serial_below_min_rows(self, jobs, monkeypatch):
+        """Test small batches never start a process pool"""
+        monkeypatch.setattr("src.parallel.PARALLEL_MIN_ROWS", 10**6)
+        with patch("src.parallel.ProcessPoolExecutor") as executor:
+            results = optimize_many(jobs, min_threshold=0.8, workers=4)
+        executor.assert_not_called()
+        assert [result.job for result in results] == list(jobs)
+
+    def test_group_bounds(self):
+        """Test jobs are split into contiguous groups of similar row count"""
+        assert _group_bounds([10, 10, 10, 10], 2) == [0, 2, 4]
+        assert _group_bounds([100, 1, 1, 1], 4) == [0, 1, 4]
+        assert _group_bounds([5, 5], 8) == [0, 1, 2]
+
+# Multi-constraint and Pareto Tests
+class TestMultiMetricQueries:
+    @pytest.fixture
+    def optimizer(self):
+        rng = np.random.default_rng(5)
+        scores = rng.random(400)
+        labels = (rng.random(400) < scores).astype(int)
+        return ThresholdOptimizer.from_scores(scores, labels, np.linspace(0, 1, 41))
+
+    def test_constraints_match_manual_filter(self, optimizer):
+        """Test constraint sets and objectives against a manual filter"""
+        recall = optimizer.metric_column(MetricType.RECALL)
+        precision = optimizer.metric_column(MetricType.PRECISION)
+        f1 = optimizer.metric_column(MetricType.F1)
+        thresholds = optimizer.table.threshold
+        valid = (recall >= 0.7) & (precision >= 0.6)
+
+        constraints = {MetricType.RECALL: 0.7, MetricType.PRECISION: 0.6}
+        assert optimizer.find_best_threshold_multi(constraints) == thresholds[valid].max()
+        best_f1 = optimizer.find_best_threshold_multi(constraints, objective=MetricType.F1)
+        assert f1[thresholds == best_f1][0] == f1[valid].max()
+
+    def test_single_constraint_matches_find_best_threshold(self, optimizer):
+        """Test a single constraint reduces to find_best_threshold"""
+        for min_threshold in (0.3, 0.6, 0.9):
+            assert (optimizer.find_best_threshold_multi({MetricType.RECALL: min_threshold})
+                    == optimizer.find_best_threshold(min_threshold))
+        assert optimizer.find_best_threshold_multi({MetricType.RECALL: 1.0, MetricType.PRECISION: 1.0}) is None
+
+    def test_invalid_constraint(self, optimizer):
+        """Test out-of-range constraint values"""
+        with pytest.raises(ValueError, match="between -1 and 1"):
+            optimizer.find_best_threshold_multi({MetricType.RECALL: 2})
+
+    @pytest.mark.parametrize("metrics", [
+        (MetricType.PRECISION, MetricType.RECALL),
+        (MetricType.PRECISION, MetricType.RECALL, MetricType.SPECIFICITY),
+        (MetricType.PRECISION, MetricType.RECALL, MetricType.SPECIFICITY, MetricType.F1),
+    ])
+    def test_pareto_front(self, optimizer, metrics):
+        """Test the Pareto front against a brute-force dominance check"""
+        values = np.column_stack([optimizer.metric_column(m) for m in metrics])
+        front = optimizer.pareto_front(metrics)
+        front_thresholds = [point.threshold for point in front]
+        assert front_thresholds == sorted(front_thresholds)
+
+        for i, threshold in enumerate(optimizer.table.threshold):
+            dominated = np.any(np.all(values >= values[i], axis=1) & np.any(values > values[i], axis=1))
+            duplicate_above = np.any(np.all(values == values[i], axis=1) & (optimizer.table.threshold > threshold))
+            assert (threshold in front_thresholds) == (not dominated and not duplicate_above)
+
+        for point in front:
+            row = int(np.flatnonzero(optimizer.table.threshold == point.threshold)[0])
+            assert point.metrics == {m: values[row, j] for j, m in enumerate(metrics)}
+
+    def test_pareto_front_large_sweep(self):
+        """Test a three-metric front over a 200k-row sweep against a brute-force check of sampled rows"""
+        rng = np.random.default_rng(6)
+        scores = rng.random(200_000)
+        optimizer = ThresholdOptimizer.from_scores(scores, rng.random(200_000) < scores)
+        metrics = (MetricType.PRECISION, MetricType.RECALL, MetricType.SPECIFICITY)
+        front = {point.threshold for point in optimizer.pareto_front(metrics)}
+
+        values = np.column_stack([optimizer.metric_column(m) for m in metrics])
+        thresholds = optimizer.table.threshold
+        for i in rng.choice(len(thresholds), 40, replace=False):
+            dominated = np.any(np.all(values >= values[i], axis=1) & np.any(values > values[i], axis=1))
+            duplicate_above = np.any(np.all(values == values[i], axis=1) & (thresholds > thresholds[i]))
+            assert (thresholds[i] in front) == (not dominated and not duplicate_above)
+
+# Bootstrap Tests
+class TestBootstrapThreshold:
+    @pytest.fixture
+    def samples(self):
+        rng = np.random.default_rng(6)
+        scores = np.round(rng.random(500), 2)
+        labels = (rng.random(500) < scores).astype(int)
+        return scores, labels
+
+    def test_point_estimate_matches_optimizer(self, samples):
+        """Test the point estimate equals the optimizer's choice"""
+        scores, labels = samples
+        result = bootstrap_threshold(scores, labels, MetricType.RECALL, 0.8, n_replicates=200, seed=0)
+        optimizer = ThresholdOptimizer.from_scores(scores, labels)
+        assert result.threshold == optimizer.find_best_threshold(0.8)
+        assert result.metric_value >= 0.8
+        assert result.n_valid == 200
+        low, high = result.threshold_interval
+        assert low <= result.threshold <= high
+        assert result.metric_interval[0] >= 0.8
+
+    def test_replicates_match_explicit_resampling(self, samples):
+        """Test the multinomial shortcut against a slow explicit bootstrap"""
+        scores, labels = samples
+        fast = bootstrap_threshold(scores, labels, MetricType.F1, 0.6, n_replicates=400, seed=1)
+        rng = np.random.default_rng(2)
+        slow = []
+        for _ in range(400):
+            picked = rng.integers(0, scores.size, size=scores.size)
+            slow.append(ThresholdOptimizer.from_scores(
+                scores[picked], labels[picked], np.unique(scores), metric_type=MetricType.F1
+            ).find_best_threshold(0.6))
+        assert np.median(slow) == pytest.approx(np.mean(fast.threshold_interval), abs=0.1)
+
+    def test_seed_independent_of_workers(self, samples, monkeypatch):
+        """Test results are reproducible and do not depend on the worker count"""
+        scores, labels = samples
+        monkeypatch.setattr("src.bootstrap._BATCH_CELLS", 60)  # Ten replicates per batch
+        kwargs = dict(n_replicates=50, thresholds=np.linspace(0, 1, 5), seed=3)
+        serial = bootstrap_threshold(scores, labels, **kwargs)
+        assert serial == bootstrap_threshold(scores, labels, **kwargs)
+        assert serial == bootstrap_threshold(scores, labels, workers=2, **kwargs)
+
+    def test_no_valid_threshold(self):
+        """Test a requirement nothing can meet"""
+        result = bootstrap_threshold([0.2, 0.8], [0, 0], MetricType.RECALL, 0.5, n_replicates=10, seed=0)
+        assert result.threshold is None and result.threshold_interval is None
+        assert result.n_valid == 0
+
+    def test_invalid_parameters(self, samples):
+        """Test parameter validation"""
+        scores, labels = samples
+        with pytest.raises(ValueError, match="confidence"):
+            bootstrap_threshold(scores, labels, confidence=1.5)
+        with pytest.raises(ValueError, match="min_threshold"):
+            bootstrap_threshold(scores, labels, min_threshold=-1)
+
+# Storage Tests
+class TestSweepStorage:
+    def test_roundtrip_zero_copy(self, tmp_path, metrics_table):
+        """Test saving and memory-mapping a table"""
+        path = tmp_path / "sweep.bin"
+        save_table(metrics_table, path)
+        loaded = load_table(path, verify=True, validate=True)
+        for name in ("threshold",) + ThresholdTable.COUNT_COLUMNS:
+            column = getattr(loaded, name)
+            assert column.tolist() == getattr(metrics_table, name).tolist()
+            assert isinstance(column.base, np.memmap) or isinstance(column, np.memmap)
+            assert not column.flags.writeable
+        assert loaded.true_positives.dtype == np.int64
+
+    def test_weighted_counts(self, tmp_path):
+        """Test float counts keep their type"""
+        path = tmp_path / "weighted.bin"
+        save_table(ThresholdTable([0.2, 0.8], [1.5, 0.5], [0, 2], [0.5, 0], [0, 1.0]), path)
+        loaded = load_table(path, verify=True)
+        assert loaded.true_positives.dtype == np.float64
+        assert loaded.true_positives.tolist() == [1.5, 0.5]
+
+    def test_corrupted_files(self, tmp_path, metrics_table):
+        """Test header, size and checksum checks"""
+        path = tmp_path / "sweep.bin"
+        save_table(metrics_table, path)
+        data = bytearray(path.read_bytes())
+
+        data[-1] ^= 0xFF
+        path.write_bytes(data)
+        load_table(path)  # Checksum is only read on request
+        with pytest.raises(ValueError, match="checksum mismatch"):
+            load_table(path, verify=True)
+
+        path.write_bytes(data[:-8])
+        with pytest.raises(ValueError, match="size does not match"):
+            load_table(path)
+
+        path.write_bytes(b"XXXX" + data[4:])
+        with pytest.raises(ValueError, match="bad magic number"):
+            load_table(path)
+
+    def test_optimizer_from_file(self, tmp_path, metrics_list, metrics_table):
+        """Test the optimizer runs on memory-mapped columns"""
+        path = tmp_path / "sweep.bin"
+        save_table(metrics_table, path)
+        optimizer = ThresholdOptimizer.from_file(path, MetricType.RECALL, index=True)
+        expected = ThresholdOptimizer(metrics_list, MetricType.RECALL)
+        for min_threshold in (0.7, 0.8, 0.9, 0.95):
+            assert optimizer.find_best_threshold(min_threshold) == expected.find_best_threshold(min_threshold)
+
+# Benchmark Tests
+class TestBenchmarkSuite:
+    def test_compare_flags_regressions(self):
+        """Test only cases slower than the tolerance allows are reported"""
+        baseline = {"scan/10/disabled": {"throughput": 100.0}, "gone/10/disabled": {"throughput": 1.0}}
+        results = {"scan/10/disabled": {"throughput": 70.0}, "new/10/disabled": {"throughput": 1.0}}
+        assert compare(results, baseline, 0.4) == []
+        regressions = compare(results, baseline, 0.2)
+        assert len(regressions) == 1 and regressions[0].startswith("scan/10/disabled")
+
+    def test_suite_writes_json_and_gates(self, tmp_path):
+        """Test the suite writes JSON results and fails against a faster baseline"""
+        output = tmp_path / "results.json"
+        assert main(cases, "test", ["--sizes", "100", "--levels", "disabled", "--repeat", "1",
+                                    "--output", str(output)]) == 0
+
+        baseline = json.loads(output.read_text())
+        assert set(baseline["results"]) == {
+            "table_scan/100/disabled", "index_query/100/disabled", "sweep/100/disabled", "row_scan/100/disabled",
+            "optimize_many_serial/100/disabled", "optimize_many_pool/100/disabled", "optimize_many_files/100/disabled"
+        }
+        assert {"throughput", "p50_ms", "p99_ms", "peak_memory_bytes"} <= set(baseline["results"]["sweep/100/disabled"])
+
+        for metrics in baseline["results"].values():
+            metrics["throughput"] *= 1000
+        output.write_text(json.dumps(baseline))
+        assert main(cases, "test", ["--sizes", "100", "--levels", "disabled", "--repeat", "1",
+                                    "--baseline", str(output)]) == 1
+
+# Registry Tests
+class TestThresholdRegistry:
+    def test_query_matches_optimizer(self, metrics_list, metrics_table):
+        """Test cached entries answer single and batched queries like the optimizer"""
+        registry = ThresholdRegistry()
+        registry.register("a", 1, metrics_list)
+        registry.register("b", 1, metrics_table)
+        expected = ThresholdOptimizer(metrics_list, MetricType.RECALL)
+        queries = [(model, 1, q) for model in ("a", "b") for q in (0.7, 0.8, 0.9, 0.95)]
+        answers = [expected.find_best_threshold(q) for _, _, q in queries]
+        assert [registry.query(*query) for query in queries] == answers
+        assert registry.query_many(queries) == answers
+        assert ("a", 1) in registry and len(registry) == 2
+        # Rows are converted to columns, so only arrays are cached
+        assert isinstance(registry.get("a", 1).data, ThresholdTable)
+
+    def test_invalid_queries(self, metrics_table):
+        """Test unknown entries and invalid min_threshold values are rejected"""
+        registry = ThresholdRegistry()
+        registry.register("a", 1, metrics_table)
+        with pytest.raises(ValueError, match="No cached entry"):
+            registry.query("a", 2, 0.5)
+        with pytest.raises(ValueError, match="min_threshold must be between 0 and 1"):
+            registry.query_many([("a", 1, 0.5), ("a", 1, 1.5)])
+
+    def test_lru_eviction(self, metrics_table):
+        """Test least recently used entries are evicted past the memory budget"""
+        probe = ThresholdRegistry()
+        probe.register("a", 1, metrics_table)
+        registry = ThresholdRegistry(memory_budget=2 * probe.memory_usage)
+        registry.register("a", 1, metrics_table)
+        registry.register("b", 1, metrics_table)
+        registry.get("a", 1)
+        registry.register("c", 1, metrics_table)
+        assert ("a", 1) in registry and ("c", 1) in registry and ("b", 1) not in registry
+        assert registry.memory_usage == 2 * probe.memory_usage
+        assert registry.evict("a", 1) and not registry.evict("a", 1)
+
+    def test_update_matches_rebuild(self):
+        """Test incremental updates give the same table as accumulating all samples"""
+        rng = np.random.default_rng(0)
+        scores, labels = rng.random(1000), rng.random(1000) < 0.4
+        thresholds = np.linspace(0, 1, 21)
+        registry = ThresholdRegistry()
+        registry.register("a", 1, ConfusionAccumulator(thresholds).update(scores[:600], labels[:600]))
+        optimizer = registry.update("a", 1, scores[600:], labels[600:])
+
+        full = ConfusionAccumulator(thresholds).update(scores, labels).to_table()
+        assert np.array_equal(optimizer.table.true_positives, full.true_positives)
+        assert np.array_equal(optimizer.table.false_positives, full.false_positives)
+        assert registry.get("a", 1) is optimizer
+        assert registry.query("a", 1, 0.8) == ThresholdOptimizer(full).find_best_threshold(0.8)
+
+    def test_concurrent_updates(self):
+        """Test concurrent updates of one entry are all kept, even when merging is slow"""
+        registry = ThresholdRegistry()
+        registry.register("a", 1, ConfusionAccumulator(np.linspace(0, 1, 11)))
+        merge = ConfusionAccumulator.merge
+
+        def slow_merge(accumulator, other):
+            time.sleep(0.01)
+            return merge(accumulator, other)
+
+        with patch.object(ConfusionAccumulator, "merge", slow_merge), ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda score: registry.update("a", 1, [score], [1]), np.linspace(0.05, 0.95, 8)))
+
+        table = registry.get("a", 1).table
+        assert table.true_positives[0] + table.false_negatives[0] == 8
+
+    def test_update_table_entry(self, metrics_table):
+        """Test an entry registered from a table can be updated with another table"""
+        registry = ThresholdRegistry()
+        registry.register("a", 1, metrics_table)
+        optimizer = registry.update("a", 1, metrics_table)
+        assert np.array_equal(optimizer.table.true_positives, 2 * metrics_table.true_positives)
+
+    def test_query_async_batches(self, metrics_list):
+        """Test concurrent asynchronous queries are answered together"""
+        registry = ThresholdRegistry()
+        registry.register("a", 1, metrics_list)
+        expected = ThresholdOptimizer(metrics_list, MetricType.RECALL)
+
+        async def handler():
+            with patch.object(registry, "_answer", wraps=registry._answer) as answer:
+                results = await asyncio.gather(
+                    *(registry.query_async("a", 1, q) for q in (0.7, 0.8, 0.9, 0.95)),
+                    registry.query_async("b", 1, 0.5),
+                    return_exceptions=True
+                )
+                return results, answer.call_count
+
+        results, batches = asyncio.run(handler())
+        assert results[:4] == [expected.find_best_threshold(q) for q in (0.7, 0.8, 0.9, 0.95)]
+        assert isinstance(results[4], ValueError)
+        assert batches == 1
+
+    def test_query_async_errors(self, metrics_list):
+        """Test a failing query never keeps the rest of its batch waiting"""
+        registry = ThresholdRegistry()
+        registry.register("a", 1, metrics_list)
+        expected = ThresholdOptimizer(metrics_list, MetricType.RECALL).find_best_threshold(0.8)
+
+        async def handler():
+            return await asyncio.wait_for(asyncio.gather(
+                registry.query_async("a", 1, 0.8), registry.query_async("a", 1, "0.5"), return_exceptions=True
+            ), 5)
+
+        valid, invalid = asyncio.run(handler())
+        assert valid == expected and isinstance(invalid, TypeError)
+        with pytest.raises(TypeError):
+            registry.query_many([("a", 1, 0.8), ("a", 1, "0.5")])
+
+        with patch.object(registry, "_answer", side_effect=RuntimeError("boom")):
+            results = asyncio.run(handler())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_query_async_two_loops(self, metrics_list):
+        """Test event loops in two threads never share a batch"""
+        registry = ThresholdRegistry()
+        registry.register("a", 1, metrics_list)
+        results = {}
+
+        async def busy_loop():
+            task = asyncio.create_task(registry.query_async("a", 1, 0.8))
+            await asyncio.sleep(0)
+            # Block this loop while its flush is due and the other loop queries
+            time.sleep(0.3)
+            results["busy"] = await task
+
+        async def other_loop():
+            results["other"] = await registry.query_async("a", 1, 0.8)
+
+        busy = threading.Thread(target=asyncio.run, args=(busy_loop(),), daemon=True)
+        busy.start()
+        time.sleep(0.1)
+        other = threading.Thread(target=asyncio.run, args=(other_loop(),), daemon=True)
+        other.start()
+        busy.join(5)
+        other.join(5)
+
+        expected = ThresholdOptimizer(metrics_list, MetricType.RECALL).find_best_threshold(0.8)
+        assert results == {"busy": expected, "other": expected}
+
 # Integration Tests
 def test_end_to_end_optimization(metrics_list):
     """Test the complete workflow of threshold optimization"""
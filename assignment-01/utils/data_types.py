@@ -1,12 +1,19 @@
 from pydantic import BaseModel, Field
 from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
 
 class MetricType(str, Enum):
     """Supported metric types for threshold optimization."""
     RECALL = "recall"
-    # PRECISION = "precision"
-    # F1 = "f1"
-    # ACCURACY = "accuracy"
+    PRECISION = "precision"
+    F1 = "f1"
+    ACCURACY = "accuracy"
+    SPECIFICITY = "specificity"
+    F_BETA = "f_beta"
+    MCC = "mcc"
+    BALANCED_ACCURACY = "balanced_accuracy"
 
 class InputDataType(BaseModel):
     """Data model for storing classification metrics at a specific threshold."""
@@ -14,4 +21,142 @@ class InputDataType(BaseModel):
     true_positives: int = Field(ge=0)
     true_negatives: int = Field(ge=0)
     false_positives: int = Field(ge=0)
-    false_negatives: int = Field(ge=0)
\ No newline at end of file
+    false_negatives: int = Field(ge=0)
+
+class ThresholdTable:
+    """Columnar storage of classification metrics for many thresholds at once."""
+
+    COUNT_COLUMNS = ("true_positives", "true_negatives", "false_positives", "false_negatives")
+
+    def __init__(
+        self,
+        threshold,
+        true_positives,
+        true_negatives,
+        false_positives,
+        false_negatives,
+        validate: bool = True
+    ):
+        """
+        Initialize the table from one array-like per column.
+
+        Args:
+            threshold: Threshold values, each between 0 and 1
+            true_positives: True positive counts per threshold
+            true_negatives: True negative counts per threshold
+            false_positives: False positive counts per threshold
+            false_negatives: False negative counts per threshold
+            validate: Check the same bounds as InputDataType (default: True)
+
+        Raises:
+            ValueError: If the columns are malformed or out of bounds
+        """
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.true_positives = self._as_count_column(true_positives)
+        self.true_negatives = self._as_count_column(true_negatives)
+        self.false_positives = self._as_count_column(false_positives)
+        self.false_negatives = self._as_count_column(false_negatives)
+
+        if validate:
+            self.validate()
+
+    @staticmethod
+    def _as_count_column(values) -> np.ndarray:
+        """Convert a count column to int64, or float64 for non-integer (weighted) counts."""
+        column = np.asarray(values)
+        if column.dtype.kind in "biu":
+            return column.astype(np.int64, copy=False)
+        return column.astype(np.float64, copy=False)
+
+    def validate(self) -> None:
+        """
+        Validate every column at once.
+
+        Raises:
+            ValueError: If the columns are malformed or out of bounds
+        """
+        if self.threshold.ndim != 1:
+            raise ValueError("Threshold column must be one-dimensional")
+
+        for name in self.COUNT_COLUMNS:
+            if getattr(self, name).shape != self.threshold.shape:
+                raise ValueError(f"Column {name} must have the same length as threshold")
+
+        # Written as negations so that NaN values are rejected as well
+        if not np.all((self.threshold >= 0.0) & (self.threshold <= 1.0)):
+            raise ValueError("Threshold values must be between 0 and 1")
+
+        for name in self.COUNT_COLUMNS:
+            if not np.all(getattr(self, name) >= 0):
+                raise ValueError(f"Column {name} must be greater than or equal to 0")
+
+    @classmethod
+    def from_records(cls, records: Iterable[InputDataType]) -> "ThresholdTable":
+        """
+        Build a table from InputDataType rows.
+
+        Args:
+            records: Iterable of already validated InputDataType objects
+        """
+        records = list(records)
+        return cls(
+            [r.threshold for r in records],
+            np.array([r.true_positives for r in records], dtype=np.int64),
+            np.array([r.true_negatives for r in records], dtype=np.int64),
+            np.array([r.false_positives for r in records], dtype=np.int64),
+            np.array([r.false_negatives for r in records], dtype=np.int64),
+            validate=False
+        )
+
+    def to_records(self) -> List[InputDataType]:
+        """Convert the table back to a list of InputDataType rows."""
+        return [self.row(i) for i in range(len(self))]
+
+    def row(self, index: int) -> InputDataType:
+        """Return a single row as an InputDataType."""
+        return InputDataType(
+            threshold=float(self.threshold[index]),
+            true_positives=int(self.true_positives[index]),
+            true_negatives=int(self.true_negatives[index]),
+            false_positives=int(self.false_positives[index]),
+            false_negatives=int(self.false_negatives[index])
+        )
+
+    def __len__(self) -> int:
+        return int(self.threshold.shape[0])
+
+    def __repr__(self) -> str:
+        return f"ThresholdTable(rows={len(self)})"
+
+class OptimizationResult(BaseModel):
+    """Data model for the outcome of one threshold optimization job."""
+    job: str
+    rows: int = Field(ge=0)
+    best_threshold: Optional[float] = None
+    metric_value: Optional[float] = None
+
+class SearchSummary(BaseModel):
+    """Instrumentation record of a single find_best_threshold call."""
+    metric_type: MetricType
+    min_threshold: float
+    rows_scanned: int = Field(ge=0)
+    rows_passing: Optional[int] = None  # Unknown (None) for indexed searches
+    elapsed_seconds: float = Field(ge=0.0)
+    best_threshold: Optional[float] = None
+
+class ParetoPoint(BaseModel):
+    """Data model for one Pareto-optimal threshold and its metric values."""
+    threshold: float = Field(ge=0.0, le=1.0)
+    metrics: Dict[MetricType, float]
+
+class BootstrapResult(BaseModel):
+    """Data model for the bootstrap distribution of a chosen threshold."""
+    metric_type: MetricType
+    min_threshold: float
+    confidence: float = Field(gt=0.0, lt=1.0)
+    n_replicates: int = Field(ge=1)
+    n_valid: int = Field(ge=0)  # Replicates in which some threshold qualified
+    threshold: Optional[float] = None
+    metric_value: Optional[float] = None
+    threshold_interval: Optional[Tuple[float, float]] = None
+    metric_interval: Optional[Tuple[float, float]] = None
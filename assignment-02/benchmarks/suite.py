@@ -0,0 +1,55 @@
+"""
+Throughput, latency and peak memory of the FSM and remainder hot paths.
+
+Run from the assignment-02 directory:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json --tolerance 0.2
+
+Sizes are numbers of input symbols and go up to 1e8 with --sizes; the exit
+code is 1 when a case regresses past the tolerance.
+"""
+from benchmarks.harness import Case, main
+from src.remainder import RemainderFiniteStateMachine
+
+from typing import Iterator
+import sys
+
+import numpy as np
+
+# Digits per string in the short-string remainder batch
+SHORT_LENGTH = 32
+
+# Strings in the long-string remainder batch
+LONG_STRINGS = 8
+
+def random_bits(size: int, seed: int) -> bytes:
+    """Random binary digits as ASCII bytes."""
+    return (np.random.default_rng(seed).integers(0, 2, size, dtype=np.uint8) + ord("0")).tobytes()
+
+def cases(size: int) -> Iterator[Case]:
+    """Workloads of the given size."""
+    machine = RemainderFiniteStateMachine()
+    fsm = machine.fsm
+    data = random_bits(size, size)
+    text = data.decode("ascii")
+
+    def from_initial(process, *args):
+        fsm.current_state = fsm.initial_state
+        return process(*args)
+
+    yield "process_input_str", size, lambda: from_initial(fsm.process_input, text)
+    yield "process_input_bytes", size, lambda: from_initial(fsm.process_input, data)
+
+    packed = np.packbits(np.frombuffer(data, dtype=np.uint8) - ord("0")).tobytes()
+    yield "packed_bits", size, lambda: from_initial(fsm.process_packed_bits, packed, size)
+
+    short = [text[start:start + SHORT_LENGTH] for start in range(0, size, SHORT_LENGTH)]
+    yield "remainders_short_batch", size, lambda: machine.compute_remainders(short)
+
+    step = -(-size // LONG_STRINGS)
+    long = [text[start:start + step] for start in range(0, size, step)]
+    yield "remainders_long_batch", size, lambda: machine.compute_remainders(long)
+
+if __name__ == "__main__":
+    sys.exit(main(cases, "Benchmark FiniteStateMachine and remainder hot paths"))
@@ -1,11 +1,148 @@
-from typing import Dict
+from src.compiled import CompiledFiniteStateMachine, as_symbols
+from src.instrumentation import Instrumentation
+from src.minimize import MinimizationReport, minimize_states
+from src import parallel
+
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
 import logging
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Bytes requested per read() when consuming an asynchronous reader
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Components the compiled table is built from; assigning one drops the table
+_DEFINITION = frozenset(("states", "input_options", "initial_state", "final_states", "transition_function"))
+
+class FiniteStateMachineRun:
+    """
+    Cursor holding the state of one run over a shared compiled machine.
+
+    The compiled machine is never modified by a run, so any number of runs,
+    in any threads or tasks, can share one definition without locking.
+    """
+
+    __slots__ = ("machine", "state_id", "instrumentation")
+
+    def __init__(self, machine: CompiledFiniteStateMachine, state_id: int,
+                 instrumentation: Optional[Instrumentation] = None):
+        """
+        Args:
+            machine: Compiled machine to run
+            state_id: Id of the state to start from
+            instrumentation: Instrumentation recording every feed() (default: None)
+        """
+        self.machine = machine
+        self.state_id = state_id
+        self.instrumentation = instrumentation
+
+    @property
+    def state(self) -> str:
+        """Current state of this run."""
+        return self.machine.states[self.state_id]
+
+    def transition(self, symbol: str) -> str:
+        """
+        Perform a single transition, with the same checks and logs as FiniteStateMachine.transition.
+
+        Args:
+            symbol: Input symbol from the input_options
+        """
+        machine = self.machine
+        logger.debug("Attempting transition with symbol: %s", symbol)
+        logger.debug("Current state: %s", self.state)
+
+        symbol_id = machine.symbol_ids.get(symbol)
+        if symbol_id is None:
+            logger.error("Invalid symbol: %s not in inputOptions %s", symbol, list(machine.symbols))
+            raise ValueError(f"Symbol {symbol} not in input_options")
+
+        next_id = machine.table[self.state_id * len(machine.symbols) + symbol_id]
+        if next_id == machine.dead:
+            logger.error("No transition defined for state %s and symbol %s", self.state, symbol)
+            raise ValueError(f"No transition defined for state {self.state} and symbol {symbol}")
+
+        logger.info("Transition: %s --%s--> %s", self.state, symbol, machine.states[next_id])
+        self.state_id = next_id
+        return self.state
+
+    def feed(self, input_sequence) -> str:
+        """
+        Advance the run over a sequence of input symbols and return the new state.
+
+        Like FiniteStateMachine.process_input, the compiled table is used
+        unless INFO logs are enabled, and errors are raised after advancing
+        up to the offending symbol.
+
+        Args:
+            input_sequence: String of input symbols, or a bytes-like object
+        """
+        if self.instrumentation is not None:
+            return self.instrumentation.observe(
+                self.machine, input_sequence, self.state_id, lambda: self._feed(input_sequence)
+            )
+        return self._feed(input_sequence)
+
+    def _feed(self, input_sequence) -> str:
+        """feed() without instrumentation."""
+        if not logger.isEnabledFor(logging.INFO):
+            final = self.machine.run(input_sequence, self.state_id)
+            if final is not None and final != self.machine.dead:
+                self.state_id = final
+                return self.state
+
+        for symbol in as_symbols(input_sequence):
+            self.transition(symbol)
+        return self.state
+
+    def result(self) -> str:
+        """Return the state reached by everything fed so far."""
+        return self.state
+
+    def feed_chunks(self, chunks: Iterable) -> Iterator[str]:
+        """
+        Feed an input that arrives in chunks, yielding the state after each one.
+
+        Only one chunk is held at a time, so memory stays constant however
+        long the stream is.
+
+        Args:
+            chunks: Iterable of strings of input symbols or bytes-like objects
+        """
+        for chunk in chunks:
+            yield self.feed(chunk)
+
+    async def feed_stream(self, stream, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[str]:
+        """
+        Feed an asynchronous byte stream, yielding the state after each chunk.
+
+        Args:
+            stream: Async iterable of chunks, or a reader with a coroutine
+                read(n) such as asyncio.StreamReader
+            chunk_size: Bytes requested per read() call (default: STREAM_CHUNK_SIZE)
+        """
+        if hasattr(stream, "read"):
+            while True:
+                chunk = await stream.read(chunk_size)
+                if not chunk:
+                    return
+                yield self.feed(chunk)
+        else:
+            async for chunk in stream:
+                yield self.feed(chunk)
+
 class FiniteStateMachine:
-    """A generic Finite State Machine implementation."""
+    """
+    A generic Finite State Machine implementation.
+
+    The components are stored as read-only copies (tuples and a read-only
+    mapping), so the compiled table used by process_input always matches
+    transition(): edit a machine by assigning a new component, which drops
+    the table.
+    """
     
     def __init__(
         self,
@@ -28,12 +165,15 @@ class FiniteStateMachine:
         logger.info(f"Initializing FSM with states={states}, inputOptions={input_options}")
         logger.debug(f"Initial state: {initial_state}, Final states: {final_states}")
 
+        self._compiled = None
+        self._accepting = None
         self.states = states
         self.input_options = input_options
         self.initial_state = initial_state
         self.final_states = final_states
         self.transition_function = transition_function
         self.current_state = initial_state
+        self.instrumentation: Optional[Instrumentation] = None
         
         """Validate input_options."""
         # Check if initial state is valid
@@ -42,13 +182,148 @@ class FiniteStateMachine:
             raise ValueError("Initial state must be in states list")
         
         # Check if final states are valid
+        valid_states = set(self.states)
         for state in self.final_states:
-            if state not in self.states:
+            if state not in valid_states:
                 logger.error(f"Invalid final state: {state} not in states list")
                 raise ValueError("Final states must be in states list")
 
         logger.info("FSM initialized successfully")
+
+    def __setattr__(self, name, value):
+        """Store components as read-only copies and drop the compiled table when one is replaced."""
+        if name in _DEFINITION:
+            if name == "transition_function":
+                value = MappingProxyType(dict(value))
+            elif name != "initial_state":
+                value = tuple(value)
+            object.__setattr__(self, "_compiled", None)
+            object.__setattr__(self, "_accepting", None)
+        object.__setattr__(self, name, value)
     
+    def compile(self) -> CompiledFiniteStateMachine:
+        """
+        Compile the machine to an integer transition table, once per definition.
+
+        Assigning a new component drops the table, and the components
+        themselves are read-only. The table is never modified afterwards, so
+        it can be shared by concurrent runs (see start()).
+        """
+        if self._compiled is None:
+            self._compiled = CompiledFiniteStateMachine(self.states, self.input_options, self.transition_function)
+        return self._compiled
+
+    def accepts(self, input_sequence) -> bool:
+        """
+        Check whether an input, run from the initial state, ends in a final state.
+
+        Invalid symbols and missing transitions reject the input instead of
+        raising, and nothing is logged per symbol, which suits high-volume
+        validation. current_state is left untouched.
+
+        Args:
+            input_sequence: String of input symbols, or a bytes-like object
+        """
+        compiled = self.compile()
+        if self._accepting is None:
+            self._accepting = frozenset(compiled.state_ids[state] for state in self.final_states)
+
+        state = compiled.state_ids[self.initial_state]
+        final = compiled.run(input_sequence, state)
+        if final is None:
+            # Not byte based: walk the table symbol by symbol
+            n_symbols = len(compiled.symbols)
+            for symbol in as_symbols(input_sequence):
+                symbol_id = compiled.symbol_ids.get(symbol)
+                if symbol_id is None:
+                    return False
+                state = compiled.table[state * n_symbols + symbol_id]
+                if state == compiled.dead:
+                    return False
+            final = state
+        return final in self._accepting
+
+    def instrument(self, instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+        """
+        Attach counters and timings to process_input and to the runs started afterwards.
+
+        Set the instrumentation attribute back to None to detach it.
+
+        Args:
+            instrumentation: Instrumentation to attach (default: a new one with
+                transition counting and no trace hook)
+        """
+        self.instrumentation = instrumentation or Instrumentation()
+        return self.instrumentation
+
+    def minimize(self, labels: Optional[Dict] = None) -> Tuple["FiniteStateMachine", MinimizationReport]:
+        """
+        Build an equivalent machine without unreachable or redundant states.
+
+        Every reachable state is replaced by the first state of its
+        equivalence class, so a final state maps to the same label as before;
+        missing-transition errors name that representative.
+
+        Args:
+            labels: Observable value of every state that must be kept, for
+                example remainder_map (default: final-state membership only)
+
+        Returns:
+            Tuple of the minimized machine and a MinimizationReport with the
+            before/after state counts and the state mapping.
+        """
+        report = minimize_states(self.compile(), self.initial_state, self.final_states, labels)
+        state_map = report.state_map
+        states = [state for state in self.states if state_map.get(state) == state]
+        transition_function = {
+            (state, symbol): state_map[self.transition_function[(state, symbol)]]
+            for state in states
+            for symbol in self.input_options
+            if self.transition_function.get((state, symbol)) in state_map
+        }
+        final_set = set(self.final_states)
+        final_states = [state for state in states if state in final_set]
+
+        fsm = FiniteStateMachine(
+            states, self.input_options, state_map[self.initial_state], final_states, transition_function
+        )
+        return fsm, report
+
+    def start(self, state: Optional[str] = None) -> FiniteStateMachineRun:
+        """
+        Start an independent run that keeps its own state.
+
+        Unlike process_input, runs never touch current_state, so one machine
+        can serve many threads or tasks at once.
+
+        Args:
+            state: State to start from (default: the initial state)
+
+        Raises:
+            ValueError: If state is not in the states list
+        """
+        compiled = self.compile()
+        state = self.initial_state if state is None else state
+        if state not in compiled.state_ids:
+            logger.error("Invalid start state: %s not in states list", state)
+            raise ValueError("Start state must be in states list")
+        return FiniteStateMachineRun(compiled, compiled.state_ids[state], self.instrumentation)
+
+    def run(self, input_sequence, state: Optional[str] = None) -> str:
+        """
+        Process an input in a fresh run and return the final state, leaving current_state untouched.
+
+        Safe to call concurrently on a shared machine.
+
+        Args:
+            input_sequence: String of input symbols, or a bytes-like object
+            state: State to start from (default: the initial state)
+        """
+        logger.info("Running input sequence: %s", input_sequence)
+        final_state = self.start(state).feed(input_sequence)
+        logger.info("Input sequence run. Final state: %s", final_state)
+        return final_state
+
     def transition(self, symbol: str) -> str:
         """
         Perform a single transition based on the input symbol.
@@ -56,36 +331,193 @@ class FiniteStateMachine:
         Args:
             symbol: Input symbol from the input_options
         """
-        logger.debug(f"Attempting transition with symbol: {symbol}")
-        logger.debug(f"Current state: {self.current_state}")
+        logger.debug("Attempting transition with symbol: %s", symbol)
+        logger.debug("Current state: %s", self.current_state)
 
         if symbol not in self.input_options:
-            logger.error(f"Invalid symbol: {symbol} not in inputOptions {self.input_options}")
+            logger.error("Invalid symbol: %s not in inputOptions %s", symbol, self.input_options)
             raise ValueError(f"Symbol {symbol} not in input_options")
         
         try:
             next_state = self.transition_function[(self.current_state, symbol)]
-            logger.info(f"Transition: {self.current_state} --{symbol}--> {next_state}")
+            logger.info("Transition: %s --%s--> %s", self.current_state, symbol, next_state)
             self.current_state = next_state
             return self.current_state
         except KeyError:
-            logger.error(f"No transition defined for state {self.current_state} and symbol {symbol}")
+            logger.error("No transition defined for state %s and symbol %s", self.current_state, symbol)
             raise ValueError(f"No transition defined for state {self.current_state} and symbol {symbol}")
 
 
     def process_input(self, input_sequence: str) -> str:
         """
         Process a sequence of input symbols and return the final state.
+
+        Unless per-transition INFO logs are enabled, the input runs through the
+        compiled transition table; errors are then reproduced by replaying the
+        input through transition(), so results and exceptions are identical.
+        bytes, bytearray and memoryview inputs are read without decoding, each
+        byte being the symbol with that latin-1 code.
         
         Args:
-            input_sequence: String of input symbols
+            input_sequence: String of input symbols, or a bytes-like object
         """
-        logger.info(f"Processing input sequence: {input_sequence}")
-        logger.debug(f"Starting state: {self.current_state}")
+        if self.instrumentation is not None:
+            compiled = self.compile()
+            start = compiled.state_ids.get(self.current_state)
+            if start is not None:
+                return self.instrumentation.observe(
+                    compiled, input_sequence, start, lambda: self._process_input(input_sequence)
+                )
+        return self._process_input(input_sequence)
+
+    def _process_input(self, input_sequence) -> str:
+        """process_input() without instrumentation."""
+        logger.info("Processing input sequence: %s", input_sequence)
+        logger.debug("Starting state: %s", self.current_state)
+
+        if not logger.isEnabledFor(logging.INFO):
+            compiled = self.compile()
+            start = compiled.state_ids.get(self.current_state)
+            final = None if start is None else compiled.run(input_sequence, start)
+            if final is not None and final != compiled.dead:
+                self.current_state = compiled.states[final]
+                return self.current_state
 
-        for symbol in input_sequence:
+        for symbol in as_symbols(input_sequence):
             self.transition(symbol)
         
-        logger.info(f"Input sequence processed. Final state: {self.current_state}")
+        logger.info("Input sequence processed. Final state: %s", self.current_state)
         
-        return self.current_state
\ No newline at end of file
+        return self.current_state
+
+    def process_many(
+        self,
+        sequences: Iterable,
+        return_errors: bool = False
+    ) -> Union[List[Optional[str]], Tuple[List[Optional[str]], Dict[int, str]]]:
+        """
+        Process many independent input sequences, each from the initial state.
+
+        Runs are batched column-wise through the compiled table; current_state
+        is left untouched.
+
+        Args:
+            sequences: Iterable of strings of input symbols or bytes-like objects
+            return_errors: Report failures per item instead of raising (default: False)
+
+        Returns:
+            Final state of every sequence. With return_errors, a tuple of that
+            list (None for failed items) and a dict of item index to error message.
+
+        Raises:
+            ValueError: On the first failing item, unless return_errors is set
+        """
+        sequences = list(sequences)
+        logger.info("Processing %d input sequences", len(sequences))
+
+        compiled = self.compile()
+        start = compiled.state_ids[self.initial_state]
+        if compiled.byte_symbols:
+            final_ids = compiled.run_many(sequences, start).tolist()
+        else:
+            final_ids = [compiled.dead] * len(sequences)
+
+        results = []
+        errors = {}
+        for index, final in enumerate(final_ids):
+            if final != compiled.dead:
+                results.append(compiled.states[final])
+                continue
+            # Rerun the failed item symbol by symbol for its exact outcome
+            try:
+                results.append(self.start().feed(sequences[index]))
+            except ValueError as error:
+                if not return_errors:
+                    raise
+                results.append(None)
+                errors[index] = str(error)
+
+        if return_errors:
+            return results, errors
+        return results
+
+    def process_packed_bits(self, data, bit_length: Optional[int] = None) -> str:
+        """
+        Process bit-packed input of a two-symbol machine, a whole byte per table lookup.
+
+        Bits are read most significant first; bit value b stands for the
+        symbol input_options[b].
+
+        Args:
+            data: bytes-like object holding the packed bits
+            bit_length: Number of bits to read (default: all bits of data)
+        """
+        compiled = self.compile()
+        start = compiled.state_ids.get(self.current_state)
+        final = compiled.dead if start is None else compiled.run_packed_bits(data, start, bit_length)
+
+        if final == compiled.dead:
+            # Unpack and replay to raise the reference error
+            bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))[:bit_length]
+            return self.process_input([self.input_options[bit] for bit in bits.tolist()])
+
+        self.current_state = compiled.states[final]
+        logger.info("Packed input processed. Final state: %s", self.current_state)
+        return self.current_state
+
+    def process_input_parallel(
+        self,
+        input_sequence: str,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> str:
+        """
+        Process a large input by summarizing chunks concurrently, then composing them.
+
+        Each chunk is reduced to a state -> state mapping in a process pool and
+        the mappings are applied left to right. Errors are reported exactly as
+        process_input does.
+
+        Args:
+            input_sequence: String of input symbols, or a bytes-like object
+            workers: Number of worker processes (default: os.cpu_count())
+            chunk_size: Bytes per chunk (default: enough chunks to balance the workers)
+        """
+        compiled = self.compile()
+        start = compiled.state_ids.get(self.current_state)
+        final = None if start is None else parallel.run_parallel(compiled, input_sequence, start, workers, chunk_size)
+        return self._finish_parallel(final, lambda: input_sequence)
+
+    def process_file(
+        self,
+        path,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> str:
+        """
+        Process the bytes of a file in parallel chunks, each worker memory-mapping its range.
+
+        Args:
+            path: File whose bytes are the input symbols
+            workers: Number of worker processes (default: os.cpu_count())
+            chunk_size: Bytes per chunk (default: enough chunks to balance the workers)
+        """
+        compiled = self.compile()
+        start = compiled.state_ids.get(self.current_state)
+        final = None if start is None else parallel.run_file_parallel(compiled, path, start, workers, chunk_size)
+
+        def read():
+            with open(path, "rb") as file:
+                return file.read()
+
+        return self._finish_parallel(final, read)
+
+    def _finish_parallel(self, final: Optional[int], load_input) -> str:
+        """Commit a parallel run's final state, or rerun serially to raise the reference error."""
+        compiled = self.compile()
+        if final is None or final == compiled.dead:
+            return self.process_input(load_input())
+
+        self.current_state = compiled.states[final]
+        logger.info("Input sequence processed in parallel. Final state: %s", self.current_state)
+        return self.current_state
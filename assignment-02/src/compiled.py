@@ -0,0 +1,396 @@
+from typing import Dict, Iterable, Optional, Sequence
+import numpy as np
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Machines whose raw byte table would exceed this many entries translate their
+# input to dense symbol ids first instead
+BYTE_TABLE_LIMIT = 1 << 20
+
+# Upper bound on the entries of a multi-symbol (k-gram) table, which decides k
+KGRAM_TABLE_LIMIT = 1 << 16
+
+# Inputs shorter than this are not worth the k-gram setup cost
+KGRAM_MIN_LENGTH = 1 << 12
+
+# Batch groups with fewer inputs than this run one by one, since a vectorized
+# step per column only pays off across many rows
+BATCH_MIN_ROWS = 64
+
+class CompiledFiniteStateMachine:
+    """Dense, integer-indexed transition table compiled from an FSM definition."""
+
+    def __init__(self, states: Sequence, input_options: Sequence, transition_function: Dict):
+        """
+        Compile states and symbols to integer ids and build the transition table.
+
+        Missing transitions lead to an extra dead state that never leaves
+        itself, so the execution loop needs no checks; callers detect the dead
+        state after the run.
+
+        Args:
+            states: List of possible states
+            input_options: List of input symbols
+            transition_function: Dictionary of state transitions
+        """
+        self.states = tuple(states)
+        self.symbols = tuple(input_options)
+        self.state_ids = {state: i for i, state in enumerate(self.states)}
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.dead = len(self.states)
+
+        # table[state * len(symbols) + symbol] -> next state id
+        self.table = tuple(
+            self.state_ids.get(transition_function.get((state, symbol)), self.dead)
+            for state in self.states + (None,)
+            for symbol in self.symbols
+        )
+
+        # The byte engine reads raw 8-bit codes, so every symbol must be one
+        # latin-1 character
+        self.byte_symbols = all(
+            isinstance(symbol, str) and len(symbol) == 1 and ord(symbol) < 256
+            for symbol in self.symbols
+        )
+        self._translation = None
+        self._offsets = None
+        self._byte_functions = None
+        self._kgram_offsets = {}
+        self._code_ids = None
+        self._table_array = None
+        if self.byte_symbols:
+            self._build_byte_engine()
+
+        logger.debug(
+            "Compiled FSM with %d states and %d symbols (byte engine: %s)",
+            len(self.states), len(self.symbols), self.byte_symbols
+        )
+
+    def _build_byte_engine(self) -> None:
+        """Build the offset table driven directly by 8-bit symbol codes."""
+        n_symbols = len(self.symbols)
+        rows = len(self.states) + 1
+
+        if rows * 256 <= BYTE_TABLE_LIMIT:
+            # One column per byte value; invalid bytes lead to the dead state
+            self._width = 256
+            columns = [(symbol_id, ord(symbol)) for symbol, symbol_id in self.symbol_ids.items()]
+        else:
+            # Translate bytes to symbol ids, with id n_symbols for invalid bytes
+            self._width = n_symbols + 1
+            codes = [n_symbols] * 256
+            for symbol, symbol_id in self.symbol_ids.items():
+                codes[ord(symbol)] = symbol_id
+            self._translation = bytes(codes)
+            columns = [(symbol_id, symbol_id) for symbol_id in range(n_symbols)]
+
+        # Entries hold the next state's row offset, saving a multiply per step;
+        # they reference one int object per row, so the table costs a pointer
+        # per entry. Rows start all dead and only symbol columns are filled in.
+        row_offsets = [state * self._width for state in range(rows)]
+        dead_row = [row_offsets[self.dead]] * self._width
+        offsets = []
+        for state in range(rows):
+            row = dead_row.copy()
+            for symbol_id, column in columns:
+                row[column] = row_offsets[self.table[state * n_symbols + symbol_id]]
+            offsets.extend(row)
+        self._offsets = tuple(offsets)
+
+    def run(self, input_sequence, start_state: int) -> Optional[int]:
+        """
+        Run the machine over an input without any per-symbol checks or logging.
+
+        Validation is fused into the same scan: invalid symbols lead to the
+        dead state. bytes, bytearray and memoryview inputs are read in place,
+        each byte being the symbol with that latin-1 code.
+
+        Args:
+            input_sequence: String of input symbols, or a bytes-like object
+            start_state: Id of the state to start from
+
+        Returns:
+            Id of the final state (self.dead if an invalid symbol or a missing
+            transition was hit), or None if the input cannot be handled by the
+            byte engine.
+        """
+        if not self.byte_symbols:
+            return None
+
+        try:
+            data = as_bytes(input_sequence)
+        except UnicodeEncodeError:
+            # A character above 255 can never be a valid symbol here
+            return self.dead
+        if data is None:
+            return None
+
+        if len(data) >= KGRAM_MIN_LENGTH and self.kgram_size() > 1:
+            return self._run_kgram(data, start_state, self.kgram_size())
+
+        if self._translation is not None:
+            if isinstance(data, memoryview):
+                # memoryview has no translate(); large machines pay for one copy
+                data = data.tobytes()
+            data = data.translate(self._translation)
+
+        table = self._offsets
+        offset = start_state * self._width
+        for code in data:
+            offset = table[offset + code]
+
+        return offset // self._width
+
+    def kgram_size(self) -> int:
+        """Largest k whose k-gram table stays within KGRAM_TABLE_LIMIT entries."""
+        n_symbols = len(self.symbols)
+        rows = len(self.states) + 1
+        if n_symbols < 2:
+            return 1
+
+        k = 1
+        while rows * n_symbols ** (k + 1) <= KGRAM_TABLE_LIMIT:
+            k += 1
+        return k
+
+    def kgram_table(self, k: int) -> np.ndarray:
+        """
+        Return the transition table for k symbols at a time.
+
+        Entry [state, gram] is the state reached after reading the k symbols
+        whose ids are the base-len(symbols) digits of gram, most significant
+        first.
+        """
+        single = self.table_array().reshape(len(self.states) + 1, len(self.symbols))
+        table = single
+        for _ in range(k - 1):
+            # Append one more symbol: table[s, g * n + c] = single[table[s, g], c]
+            table = single[table].reshape(len(self.states) + 1, -1)
+        return table
+
+    def kgram_offsets(self, k: int) -> tuple:
+        """
+        Cached flat k-gram table holding next row offsets, in the layout used by the byte engine.
+
+        Entry [state * len(symbols) ** k + gram] is the offset of the row
+        reached, that is next_state * len(symbols) ** k.
+        """
+        offsets = self._kgram_offsets.get(k)
+        if offsets is None:
+            width = len(self.symbols) ** k
+            offsets = tuple((self.kgram_table(k) * width).ravel().tolist())
+            self._kgram_offsets[k] = offsets
+        return offsets
+
+    def table_array(self) -> np.ndarray:
+        """Read-only int64 copy of table, built once."""
+        if self._table_array is None:
+            table_array = np.array(self.table, dtype=np.int64)
+            table_array.flags.writeable = False
+            self._table_array = table_array
+        return self._table_array
+
+    def code_ids(self) -> np.ndarray:
+        """Symbol id of every byte value, len(symbols) marking bytes that are not symbols."""
+        if self._code_ids is None:
+            code_ids = np.full(256, len(self.symbols), dtype=np.uint16)
+            for symbol, symbol_id in self.symbol_ids.items():
+                code_ids[ord(symbol)] = symbol_id
+            code_ids.flags.writeable = False
+            self._code_ids = code_ids
+        return self._code_ids
+
+    def _run_kgram(self, data, start_state: int, k: int) -> int:
+        """Run over byte input k symbols per table lookup, in bounded-size blocks."""
+        n_symbols = len(self.symbols)
+        code_ids = self.code_ids()
+        codes = np.frombuffer(data, dtype=np.uint8)
+        weights = n_symbols ** np.arange(k - 1, -1, -1)
+        full = len(codes) // k * k
+        block = max(k, KGRAM_TABLE_LIMIT // k * k)
+
+        table = self.kgram_offsets(k)
+        width = n_symbols ** k
+        offset = start_state * width
+        for begin in range(0, full, block):
+            ids = code_ids[codes[begin:min(begin + block, full)]]
+            if (ids == n_symbols).any():
+                return self.dead
+            for gram in (ids.reshape(-1, k) @ weights).tolist():
+                offset = table[offset + gram]
+
+        state = offset // width
+        for symbol_id in code_ids[codes[full:]].tolist():
+            if symbol_id == n_symbols:
+                return self.dead
+            state = self.table[state * n_symbols + symbol_id]
+        return state
+
+    def run_packed_bits(self, data, start_state: int, bit_length: Optional[int] = None) -> int:
+        """
+        Run a two-symbol machine over bit-packed input, a whole byte per lookup.
+
+        Bits are read most significant first; bit value b stands for the
+        symbol input_options[b].
+
+        Args:
+            data: bytes-like object holding the packed bits
+            start_state: Id of the state to start from
+            bit_length: Number of bits to read (default: 8 * len(data))
+
+        Returns:
+            Id of the final state (self.dead on a missing transition).
+
+        Raises:
+            ValueError: If the machine does not have exactly two symbols, or
+                bit_length does not fit in data
+        """
+        if len(self.symbols) != 2:
+            raise ValueError("Packed bit input needs exactly two input symbols")
+
+        data = memoryview(data).cast("B")
+        if bit_length is None:
+            bit_length = 8 * len(data)
+        if not 0 <= bit_length <= 8 * len(data):
+            raise ValueError("bit_length does not fit in the packed data")
+
+        if (len(self.states) + 1) * 256 > KGRAM_TABLE_LIMIT:
+            return self._run_bits(data, start_state, bit_length)
+
+        full_bytes, tail_bits = divmod(bit_length, 8)
+        table = self.kgram_offsets(8)
+        offset = start_state * 256
+        for byte in data[:full_bytes]:
+            offset = table[offset + byte]
+
+        state = offset // 256
+        if tail_bits:
+            last = data[full_bytes]
+            for shift in range(7, 7 - tail_bits, -1):
+                state = self.table[state * 2 + ((last >> shift) & 1)]
+        return state
+
+    def _run_bits(self, data: memoryview, start_state: int, bit_length: int) -> int:
+        """run_packed_bits() for machines too large for a byte-wide table: unpack blocks, then k bits per lookup."""
+        k = self.kgram_size()
+        table = self.kgram_offsets(k)
+        width = 2 ** k
+        weights = 2 ** np.arange(k - 1, -1, -1)
+        # Whole bytes per block, holding a whole number of k-bit grams
+        block = k * max(1, KGRAM_TABLE_LIMIT // (8 * k))
+
+        codes = np.frombuffer(data, dtype=np.uint8)
+        offset = start_state * width
+        bits, full = codes[:0], 0
+        for begin in range(0, -(-bit_length // 8), block):
+            bits = np.unpackbits(codes[begin:begin + block])[:bit_length - 8 * begin]
+            full = len(bits) // k * k
+            for gram in (bits[:full].reshape(-1, k) @ weights).tolist():
+                offset = table[offset + gram]
+
+        # Only the last block can end with less than a whole gram
+        state = offset // width
+        for bit in bits[full:].tolist():
+            state = self.table[state * 2 + bit]
+        return state
+
+    def run_many(self, sequences: Iterable, start_state: int) -> np.ndarray:
+        """
+        Run many independent inputs at once, column by column.
+
+        Inputs are grouped by length; each group is stacked into a 2-D array
+        and all of its runs advance together, one vectorized step per column.
+        Groups smaller than BATCH_MIN_ROWS run one input at a time instead.
+
+        Args:
+            sequences: Iterable of strings of input symbols or bytes-like objects
+            start_state: Id of the state every run starts from
+
+        Returns:
+            Array with the final state id of every input, self.dead where an
+            invalid symbol or a missing transition was hit.
+
+        Raises:
+            ValueError: If the machine is not byte based
+        """
+        if not self.byte_symbols:
+            raise ValueError("Batch runs need single-character latin-1 symbols")
+
+        n_symbols = len(self.symbols)
+        # One extra column for invalid bytes, leading to the dead state
+        table = np.full((self.dead + 1, n_symbols + 1), self.dead, dtype=np.int64)
+        table[:, :n_symbols] = np.array(self.table, dtype=np.int64).reshape(self.dead + 1, n_symbols)
+        code_ids = self.code_ids()
+
+        groups = {}
+        results = []
+        for index, sequence in enumerate(sequences):
+            results.append(start_state)
+            try:
+                data = as_bytes(sequence)
+            except UnicodeEncodeError:
+                data = None
+            if data is None:
+                results[index] = self.dead
+            elif len(data):
+                groups.setdefault(len(data), ([], []))
+                groups[len(data)][0].append(index)
+                groups[len(data)][1].append(data)
+
+        results = np.array(results, dtype=np.int64)
+        for length, (indices, items) in groups.items():
+            if len(items) < BATCH_MIN_ROWS:
+                results[indices] = [self.run(item, start_state) for item in items]
+                continue
+            ids = code_ids[np.frombuffer(b"".join(items), dtype=np.uint8).reshape(len(items), length)]
+            states = np.full(len(items), start_state, dtype=np.int64)
+            for column in ids.T:
+                states = table[states, column]
+            results[indices] = states
+
+        return results
+
+    def byte_functions(self) -> np.ndarray:
+        """
+        Return the transition function of every byte value as one array.
+
+        Row c maps each state id (including the dead state) to the next state
+        id after reading the byte c, so a chunk of input can be summarized by
+        composing rows. Only available when byte_symbols is True.
+        """
+        if self._byte_functions is None:
+            dtype = np.uint8 if self.dead < 256 else np.uint32
+            n_symbols = len(self.symbols)
+            table = np.array(self.table, dtype=dtype).reshape(len(self.states) + 1, n_symbols)
+            functions = np.full((256, self.dead + 1), self.dead, dtype=dtype)
+            for symbol, symbol_id in self.symbol_ids.items():
+                functions[ord(symbol)] = table[:, symbol_id]
+            functions.flags.writeable = False
+            self._byte_functions = functions
+        return self._byte_functions
+
+def as_bytes(input_sequence):
+    """
+    Return the input as a bytes-like object of 8-bit symbol codes, without copying bytes-like input.
+
+    Returns:
+        bytes, bytearray or a byte memoryview, or None for other input types.
+
+    Raises:
+        UnicodeEncodeError: If a str contains a character above 255
+    """
+    if isinstance(input_sequence, str):
+        return input_sequence.encode("latin-1")
+    if isinstance(input_sequence, (bytes, bytearray)):
+        return input_sequence
+    if isinstance(input_sequence, memoryview) and input_sequence.c_contiguous:
+        return input_sequence if input_sequence.format == "B" else input_sequence.cast("B")
+    return None
+
+def as_symbols(input_sequence):
+    """Decode bytes-like input to a str of latin-1 symbols; other input is returned as is."""
+    if isinstance(input_sequence, (bytes, bytearray, memoryview)):
+        return bytes(input_sequence).decode("latin-1")
+    return input_sequence
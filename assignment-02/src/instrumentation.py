@@ -0,0 +1,303 @@
+from src.compiled import CompiledFiniteStateMachine, as_bytes, as_symbols
+
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+import threading
+import logging
+import time
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Inputs at least this long are replayed with NumPy when counting transitions
+VECTOR_REPLAY_MIN_LENGTH = 1 << 10
+
+# Upper bounds, in seconds, of the process_input latency histogram buckets
+DEFAULT_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+class Instrumentation:
+    """
+    Counters, timings and sampled state traces for the runs of one machine.
+
+    Attach with FiniteStateMachine.instrument(); machines without
+    instrumentation skip all of this after a single attribute check. Safe to
+    share between threads.
+    """
+
+    def __init__(
+        self,
+        count_transitions: bool = True,
+        trace_hook: Optional[Callable[[object, List], None]] = None,
+        trace_every: int = 100,
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        """
+        Args:
+            count_transitions: Count transitions per (state, symbol), which
+                costs one extra pass over every input, k symbols per table
+                lookup on long inputs; the fastest byte runs take about three
+                times as long, so disable it when only timings are needed
+                (default: True)
+            trace_hook: Called as trace_hook(input_sequence, states) with the
+                states visited by every trace_every-th call (default: None)
+            trace_every: Sampling interval of trace_hook, in calls (default: 100)
+            buckets: Upper bounds of the latency histogram buckets, in seconds
+
+        Raises:
+            ValueError: If trace_every is not positive
+        """
+        if trace_every < 1:
+            raise ValueError("trace_every must be at least 1")
+
+        self.count_transitions = count_transitions
+        self.trace_hook = trace_hook
+        self.trace_every = trace_every
+        self.buckets = tuple(sorted(buckets))
+
+        self._lock = threading.Lock()
+        self._machine: Optional[CompiledFiniteStateMachine] = None
+        self._transitions: Optional[List[int]] = None
+        self.calls = 0
+        self.errors = 0
+        self.symbols = 0
+        self.seconds = 0.0
+        self._bucket_counts = [0] * len(self.buckets)
+
+    def observe(self, machine: CompiledFiniteStateMachine, input_sequence, start_state: int,
+                process: Callable[[], str]) -> str:
+        """
+        Time one call of process(), the uninstrumented run, and record it.
+
+        Args:
+            machine: Compiled machine being run
+            input_sequence: Input of the run
+            start_state: Id of the state the run starts from
+            process: Callable performing the run and returning the final state
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            final_state = process()
+            failed = False
+            return final_state
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(machine, input_sequence, start_state, elapsed, failed)
+
+    def _record(self, machine, input_sequence, start_state, elapsed, failed) -> None:
+        """Update the counters for one call; counting and tracing happen outside the lock."""
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        sampled = self.trace_hook is not None and call % self.trace_every == 0
+
+        counts = trace = None
+        if self.count_transitions or sampled:
+            counts, trace = _replay(machine, input_sequence, start_state, sampled)
+
+        with self._lock:
+            if self._machine is None:
+                self._machine = machine
+                self._transitions = [0] * ((machine.dead + 1) * len(machine.symbols))
+            self.errors += failed
+            self.symbols += len(input_sequence)
+            self.seconds += elapsed
+            for index, bound in enumerate(self.buckets):
+                if elapsed <= bound:
+                    self._bucket_counts[index] += 1
+                    break
+            if self.count_transitions and machine is self._machine:
+                transitions = self._transitions
+                for index, count in counts.items():
+                    transitions[index] += count
+
+        if sampled:
+            self.trace_hook(input_sequence, [machine.states[state] for state in trace])
+
+    def transition_counts(self) -> Dict[str, Dict[str, int]]:
+        """Number of transitions taken from every state on every symbol, zeros omitted."""
+        with self._lock:
+            if self._transitions is None:
+                return {}
+            counts = list(self._transitions)
+            machine = self._machine
+
+        n_symbols = len(machine.symbols)
+        result = {}
+        for index, count in enumerate(counts):
+            if count:
+                state, symbol = divmod(index, n_symbols)
+                result.setdefault(machine.states[state], {})[machine.symbols[symbol]] = count
+        return result
+
+    def snapshot(self) -> Dict:
+        """
+        Export every counter as a plain dictionary.
+
+        Returns:
+            Dictionary with calls, errors, symbols, seconds, symbols_per_second,
+            latency_buckets (cumulative count per upper bound, as in Prometheus)
+            and transitions (state -> symbol -> count).
+        """
+        with self._lock:
+            calls, errors, symbols, seconds = self.calls, self.errors, self.symbols, self.seconds
+            bucket_counts = list(self._bucket_counts)
+
+        cumulative = np.cumsum(bucket_counts).tolist() if bucket_counts else []
+        return {
+            "calls": calls,
+            "errors": errors,
+            "symbols": symbols,
+            "seconds": seconds,
+            "symbols_per_second": symbols / seconds if seconds > 0 else 0.0,
+            "latency_buckets": dict(zip(self.buckets, cumulative)),
+            "transitions": self.transition_counts(),
+        }
+
+    def to_prometheus(self, prefix: str = "fsm") -> str:
+        """Export every counter in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_process_input_calls_total Number of processed inputs.",
+            f"# TYPE {prefix}_process_input_calls_total counter",
+            f"{prefix}_process_input_calls_total {snapshot['calls']}",
+            f"# HELP {prefix}_process_input_errors_total Number of inputs that raised an error.",
+            f"# TYPE {prefix}_process_input_errors_total counter",
+            f"{prefix}_process_input_errors_total {snapshot['errors']}",
+            f"# HELP {prefix}_symbols_total Number of input symbols processed.",
+            f"# TYPE {prefix}_symbols_total counter",
+            f"{prefix}_symbols_total {snapshot['symbols']}",
+            f"# HELP {prefix}_process_input_seconds Time spent per processed input.",
+            f"# TYPE {prefix}_process_input_seconds histogram",
+        ]
+        for bound, count in snapshot["latency_buckets"].items():
+            lines.append(f'{prefix}_process_input_seconds_bucket{{le="{bound:g}"}} {count}')
+        lines += [
+            f'{prefix}_process_input_seconds_bucket{{le="+Inf"}} {snapshot["calls"]}',
+            f"{prefix}_process_input_seconds_sum {snapshot['seconds']!r}",
+            f"{prefix}_process_input_seconds_count {snapshot['calls']}",
+            f"# HELP {prefix}_transitions_total Number of transitions per state and symbol.",
+            f"# TYPE {prefix}_transitions_total counter",
+        ]
+        for state, symbols in snapshot["transitions"].items():
+            for symbol, count in symbols.items():
+                lines.append(
+                    f'{prefix}_transitions_total{{state="{_escape(state)}",symbol="{_escape(symbol)}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+def _replay(machine: CompiledFiniteStateMachine, input_sequence, start_state: int, trace: bool):
+    """
+    Walk the compiled table, stopping at an invalid symbol or missing transition.
+
+    Long inputs are walked on the machine's k-gram table, one lookup per k
+    symbols, tallying the (state, gram) pairs visited; each distinct pair is
+    then expanded into its k single-symbol transitions in vectorized form.
+    Short inputs, and sampled traces which need every state, stay in plain
+    Python, where NumPy's call overhead would dominate.
+
+    Returns:
+        Tuple of a dict of transition counts, keyed by
+        state * len(symbols) + symbol, and the list of visited state ids if
+        trace is set (otherwise None).
+    """
+    if trace or len(input_sequence) < VECTOR_REPLAY_MIN_LENGTH:
+        return _replay_short(machine, input_sequence, start_state, trace)
+
+    n_symbols = len(machine.symbols)
+    symbol_ids = _symbol_ids(machine, input_sequence)
+    invalid = np.flatnonzero(symbol_ids == n_symbols)
+    if invalid.size:
+        symbol_ids = symbol_ids[:invalid[0]]
+
+    k = machine.kgram_size()
+    width = n_symbols ** k
+    full = len(symbol_ids) // k * k
+    grams = symbol_ids[:full].reshape(-1, k) @ (n_symbols ** np.arange(k - 1, -1, -1))
+
+    # Row offset reached after every gram; the loop does nothing but chain lookups
+    offsets = machine.kgram_offsets(k)
+    offset = start_state * width
+    after = [offset := offsets[offset + gram] for gram in grams.tolist()]
+
+    # Flat k-gram table index of every visited (state, gram) pair
+    pairs = grams.astype(np.int64)
+    if after:
+        pairs[0] += start_state * width
+        pairs[1:] += np.fromiter(after[:-1], dtype=np.int64, count=len(after) - 1)
+    pair_counts = np.bincount(pairs, minlength=(machine.dead + 1) * width)
+    keys = np.flatnonzero(pair_counts)
+    key_counts = pair_counts[keys]
+    states, grams = np.divmod(keys, width)
+
+    # Expand every distinct pair into its k transitions, most significant digit first
+    table, dead = machine.table_array(), machine.dead
+    indices, counts = [], []
+    for position in range(k - 1, -1, -1):
+        index = states * n_symbols + grams // n_symbols ** position % n_symbols
+        next_states = table[index]
+        taken = (states != dead) & (next_states != dead)
+        indices.append(index[taken])
+        counts.append(key_counts[taken])
+        states = np.where(taken, next_states, dead)
+
+    totals = np.bincount(
+        np.concatenate(indices), weights=np.concatenate(counts), minlength=(dead + 1) * n_symbols
+    ).astype(np.int64)
+    nonzero = np.flatnonzero(totals)
+    result = dict(zip(nonzero.tolist(), totals[nonzero].tolist()))
+
+    # The symbols left over after the last whole gram
+    state = offset // width
+    for symbol_id in symbol_ids[full:].tolist():
+        index = state * n_symbols + symbol_id
+        state = machine.table[index]
+        if state == dead:
+            break
+        result[index] = result.get(index, 0) + 1
+    return result, None
+
+def _replay_short(machine: CompiledFiniteStateMachine, input_sequence, start_state: int, trace: bool):
+    """_replay() for short inputs, one dictionary lookup per symbol."""
+    n_symbols = len(machine.symbols)
+    table, symbol_ids, dead = machine.table, machine.symbol_ids, machine.dead
+    visited = [start_state] if trace else None
+    counts = {}
+    state = start_state
+    for symbol in as_symbols(input_sequence):
+        symbol_id = symbol_ids.get(symbol)
+        if symbol_id is None:
+            break
+        index = state * n_symbols + symbol_id
+        state = table[index]
+        if state == dead:
+            break
+        counts[index] = counts.get(index, 0) + 1
+        if trace:
+            visited.append(state)
+    return counts, visited
+
+def _symbol_ids(machine: CompiledFiniteStateMachine, input_sequence) -> np.ndarray:
+    """Symbol id of every input symbol, len(symbols) marking invalid ones."""
+    if machine.byte_symbols:
+        try:
+            data = as_bytes(input_sequence)
+        except UnicodeEncodeError:
+            data = None
+        if data is not None and len(machine.symbols) < 256:
+            # One byte per id, so the lookup is a bytes.translate
+            translation = machine.code_ids().astype(np.uint8).tobytes()
+            if isinstance(data, memoryview):
+                data = data.tobytes()
+            return np.frombuffer(data.translate(translation), dtype=np.uint8)
+        if data is not None:
+            return machine.code_ids()[np.frombuffer(data, dtype=np.uint8)].astype(np.int64)
+
+    invalid = len(machine.symbols)
+    return np.array(
+        [machine.symbol_ids.get(symbol, invalid) for symbol in as_symbols(input_sequence)], dtype=np.int64
+    )
+
+def _escape(value) -> str:
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
@@ -0,0 +1,135 @@
+from src.compiled import CompiledFiniteStateMachine
+
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class MinimizationReport:
+    """Outcome of a minimization pass."""
+
+    original_states: int
+    reachable_states: int
+    minimized_states: int
+    # Representative of every reachable state, in the original state order
+    state_map: Dict[Hashable, Hashable]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.original_states} states -> {self.reachable_states} reachable "
+            f"-> {self.minimized_states} after merging equivalent states"
+        )
+
+def reachable_ids(compiled: CompiledFiniteStateMachine, start: int) -> List[int]:
+    """Ids of the states reachable from start, in state order (the dead state excluded)."""
+    n_symbols = len(compiled.symbols)
+    seen = {start}
+    stack = [start]
+    while stack:
+        state = stack.pop()
+        for next_id in compiled.table[state * n_symbols:(state + 1) * n_symbols]:
+            if next_id not in seen and next_id != compiled.dead:
+                seen.add(next_id)
+                stack.append(next_id)
+    return sorted(seen)
+
+def minimize_states(
+    compiled: CompiledFiniteStateMachine,
+    initial_state,
+    final_states: Sequence,
+    labels: Optional[Dict] = None
+) -> MinimizationReport:
+    """
+    Prune unreachable states and merge equivalent ones with Hopcroft's algorithm.
+
+    Two states are equivalent when every input leads them to states with the
+    same observable outcome: the same final-state membership, the same label,
+    and a missing transition at the same point. The dead state is its own
+    class, so inputs that fail keep failing. Runs in O(n * s * log n) for n
+    states and s symbols.
+
+    Args:
+        compiled: Compiled machine to minimize
+        initial_state: Starting state
+        final_states: List of final states
+        labels: Observable value of every state that must be kept, for
+            example remainder_map (default: final-state membership only)
+
+    Returns:
+        MinimizationReport whose state_map sends every reachable state to the
+        first state, in the original order, of its equivalence class.
+    """
+    n_symbols = len(compiled.symbols)
+    reachable = reachable_ids(compiled, compiled.state_ids[initial_state])
+    # Dense ids over the reachable states, with the dead state last
+    dense = {state: i for i, state in enumerate(reachable)}
+    dead = len(reachable)
+    dense[compiled.dead] = dead
+    rows = [
+        [dense[next_id] for next_id in compiled.table[state * n_symbols:(state + 1) * n_symbols]]
+        for state in reachable
+    ]
+    rows.append([dead] * n_symbols)
+
+    # inverse[symbol][target] lists the states moving to target on symbol
+    inverse = [[[] for _ in range(dead + 1)] for _ in range(n_symbols)]
+    for state, row in enumerate(rows):
+        for symbol, target in enumerate(row):
+            inverse[symbol][target].append(state)
+
+    # Initial partition by observable outcome
+    final_set = set(final_states)
+    classes = {}
+    for state in reachable:
+        name = compiled.states[state]
+        key = (name in final_set, labels.get(name) if labels is not None else None)
+        classes.setdefault(key, []).append(dense[state])
+    blocks = [set(members) for members in classes.values()] + [{dead}]
+    block_of = [0] * (dead + 1)
+    for index, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = index
+
+    pending = set(range(len(blocks)))
+    while pending:
+        splitter = list(blocks[pending.pop()])
+        for symbol in range(n_symbols):
+            # Group the predecessors of the splitter on symbol by their block
+            touched = {}
+            for target in splitter:
+                for state in inverse[symbol][target]:
+                    touched.setdefault(block_of[state], set()).add(state)
+
+            for index, moving in touched.items():
+                if len(moving) == len(blocks[index]):
+                    continue
+                blocks[index] -= moving
+                blocks.append(moving)
+                new_index = len(blocks) - 1
+                for state in moving:
+                    block_of[state] = new_index
+                if index in pending or len(moving) <= len(blocks[index]):
+                    pending.add(new_index)
+                else:
+                    pending.add(index)
+
+    # The lowest original id of every block is its representative
+    representative = {}
+    for state in reachable:
+        representative.setdefault(block_of[dense[state]], state)
+    state_map = {
+        compiled.states[state]: compiled.states[representative[block_of[dense[state]]]]
+        for state in reachable
+    }
+
+    report = MinimizationReport(
+        original_states=len(compiled.states),
+        reachable_states=len(reachable),
+        minimized_states=len(representative),
+        state_map=state_map
+    )
+    logger.info("Minimized FSM: %s", report)
+    return report
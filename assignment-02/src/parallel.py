@@ -0,0 +1,221 @@
+from src.compiled import as_bytes
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+import numpy as np
+import logging
+import os
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Upper bound on the cells (symbols x states) expanded at once while composing
+_BLOCK_CELLS = 1 << 22
+
+# Composer for the machine's byte transition functions, built once per pool worker
+# process; in-process runs use a local composer instead
+_worker_composer = None
+
+# Machines with at most this many distinct state -> state functions compose
+# chunks through a precomputed function composition table
+_MAX_FUNCTIONS = 256
+
+class TransitionComposer:
+    """Summarizes chunks of input as state -> state mappings by pairwise composition."""
+
+    def __init__(self, functions: np.ndarray):
+        """
+        Args:
+            functions: Array from CompiledFiniteStateMachine.byte_functions()
+        """
+        self.functions = functions
+        self.n_states = functions.shape[1]
+        self._compose = None
+
+        if self.n_states ** self.n_states <= _MAX_FUNCTIONS:
+            # Number every possible function as a base-n_states integer, so a
+            # composition step becomes a lookup in an n_functions^2 table
+            n_functions = self.n_states ** self.n_states
+            digits = self.n_states ** np.arange(self.n_states)
+            all_functions = (np.arange(n_functions)[:, None] // digits) % self.n_states
+            # composed[f, g, s] = g[f[s]]: apply f first, then g
+            composed = all_functions[np.arange(n_functions)[None, :, None], all_functions[:, None, :]]
+            self._compose = (composed @ digits).astype(np.uint8)
+            self._byte_ids = (functions.astype(np.int64) @ digits).astype(np.uint8)
+            self._all_functions = all_functions
+
+    def vector(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Summarize a chunk of input as a state -> state mapping.
+
+        Each byte is replaced by its transition function and neighbouring
+        functions are composed pairwise until one remains, which is
+        O(len * states) vectorized work instead of a Python loop per symbol.
+
+        Args:
+            codes: uint8 array of input bytes
+
+        Returns:
+            Array mapping every start state id to the state id after the chunk.
+        """
+        result = np.arange(self.n_states, dtype=self.functions.dtype)
+        if self._compose is not None:
+            return self._vector_by_id(codes, result)
+
+        block = max(1, _BLOCK_CELLS // self.n_states)
+        for start in range(0, len(codes), block):
+            steps = self.functions[codes[start:start + block]]
+            while len(steps) > 1:
+                pairs = len(steps) // 2
+                # Applying f then g is g[f[s]]; the odd step out stays last
+                merged = np.take_along_axis(steps[1:2 * pairs:2], steps[0:2 * pairs:2], axis=1)
+                if len(steps) % 2:
+                    merged = np.concatenate((merged, steps[-1:]))
+                steps = merged
+            result = steps[0][result]
+
+        return result
+
+    def _vector_by_id(self, codes: np.ndarray, result: np.ndarray) -> np.ndarray:
+        """vector() for small machines, composing function ids through the lookup table."""
+        compose = self._compose
+        for start in range(0, len(codes), _BLOCK_CELLS):
+            ids = self._byte_ids[codes[start:start + _BLOCK_CELLS]]
+            while len(ids) > 1:
+                pairs = len(ids) // 2
+                merged = compose[ids[0:2 * pairs:2], ids[1:2 * pairs:2]]
+                if len(ids) % 2:
+                    merged = np.concatenate((merged, ids[-1:]))
+                ids = merged
+            result = self._all_functions[ids[0]][result].astype(self.functions.dtype)
+
+        return result
+
+def transition_vector(functions: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Summarize one chunk of input bytes as a state -> state mapping (see TransitionComposer)."""
+    return TransitionComposer(functions).vector(codes)
+
+def _init_worker(functions: np.ndarray) -> None:
+    """Process pool initializer: build the composer once for every task."""
+    global _worker_composer
+    _worker_composer = TransitionComposer(functions)
+
+def _chunk_vector(task: Tuple) -> np.ndarray:
+    """Pool worker entry point: summarize one chunk with the process's composer."""
+    return _summarize_chunk(_worker_composer, task)
+
+def _summarize_chunk(composer: TransitionComposer, task: Tuple) -> np.ndarray:
+    """Map one chunk of shared memory or a file and summarize it."""
+    kind, source, start, stop = task
+
+    if kind == "file":
+        codes = np.memmap(source, dtype=np.uint8, mode="r", offset=start, shape=(stop - start,))
+        return composer.vector(codes)
+
+    block = shared_memory.SharedMemory(name=source)
+    try:
+        codes = np.ndarray((stop - start,), dtype=np.uint8, buffer=block.buf, offset=start)
+        result = composer.vector(codes)
+        # Drop the view before closing, otherwise the buffer is still exported
+        del codes
+        return result
+    finally:
+        block.close()
+
+def _chunks(size: int, workers: int, chunk_size: Optional[int]) -> List[Tuple[int, int]]:
+    """Split [0, size) into contiguous (start, stop) ranges."""
+    chunk_size = chunk_size or max(1 << 20, -(-size // (workers * 4)))
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+def _run_chunks(functions, kind, source, size, workers, chunk_size) -> List[np.ndarray]:
+    """Summarize every chunk, over a process pool when that is worth it."""
+    chunks = _chunks(size, workers, chunk_size)
+    if workers == 1 or len(chunks) == 1:
+        # A local composer: the module global is shared by every thread of this process
+        composer = TransitionComposer(functions)
+        return [_summarize_chunk(composer, (kind, source, start, stop)) for start, stop in chunks]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(functions,)) as executor:
+        return list(executor.map(_chunk_vector, [(kind, source, start, stop) for start, stop in chunks]))
+
+def compose(vectors: List[np.ndarray], start_state: int) -> int:
+    """Apply chunk summaries left to right from start_state."""
+    state = start_state
+    for vector in vectors:
+        state = int(vector[state])
+    return state
+
+def run_parallel(compiled, input_sequence, start_state: int, workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None) -> Optional[int]:
+    """
+    Run a compiled machine over an in-memory input split into concurrent chunks.
+
+    The input is copied once into shared memory; workers only receive its
+    name and their byte range.
+
+    Args:
+        compiled: CompiledFiniteStateMachine to run
+        input_sequence: String of input symbols, or a bytes-like object
+        start_state: Id of the state to start from
+        workers: Number of worker processes (default: os.cpu_count())
+        chunk_size: Bytes per chunk (default: enough chunks to balance the workers)
+
+    Returns:
+        Id of the final state (compiled.dead on an invalid symbol or missing
+        transition), or None if the machine or input is not byte based.
+    """
+    if not compiled.byte_symbols:
+        return None
+    try:
+        data = as_bytes(input_sequence)
+    except UnicodeEncodeError:
+        return compiled.dead
+    if data is None:
+        return None
+
+    data = memoryview(data)
+    if len(data) == 0:
+        return start_state
+
+    workers = workers or os.cpu_count() or 1
+    logger.debug("Running %d bytes over up to %d workers", len(data), workers)
+
+    block = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        block.buf[:len(data)] = data
+        vectors = _run_chunks(compiled.byte_functions(), "shm", block.name, len(data), workers, chunk_size)
+    finally:
+        block.close()
+        block.unlink()
+
+    return compose(vectors, start_state)
+
+def run_file_parallel(compiled, path, start_state: int, workers: Optional[int] = None,
+                      chunk_size: Optional[int] = None) -> Optional[int]:
+    """
+    Run a compiled machine over a file of input bytes, memory-mapped by each worker.
+
+    Args:
+        compiled: CompiledFiniteStateMachine to run
+        path: File whose bytes are the input symbols
+        start_state: Id of the state to start from
+        workers: Number of worker processes (default: os.cpu_count())
+        chunk_size: Bytes per chunk (default: enough chunks to balance the workers)
+
+    Returns:
+        Id of the final state (compiled.dead on an invalid symbol or missing
+        transition), or None if the machine is not byte based.
+    """
+    if not compiled.byte_symbols:
+        return None
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return start_state
+
+    workers = workers or os.cpu_count() or 1
+    logger.debug("Running %d bytes from %s over up to %d workers", size, path, workers)
+
+    vectors = _run_chunks(compiled.byte_functions(), "file", os.fspath(path), size, workers, chunk_size)
+    return compose(vectors, start_state)
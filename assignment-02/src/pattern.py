@@ -0,0 +1,393 @@
+from src.FSD import FiniteStateMachine
+
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import hashlib
+import logging
+import json
+import os
+import tempfile
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the construction or the cache file layout changes
+PATTERN_CACHE_VERSION = 1
+
+# Symbols of the \d, \w and \s escapes
+ESCAPE_CLASSES = {
+    "d": frozenset("0123456789"),
+    "w": frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"),
+    "s": frozenset(" \t\n\r\f\v"),
+}
+
+_SPECIAL = set("()[]{}|*+?.\\")
+
+class _Parser:
+    """
+    Recursive descent parser of the restricted pattern syntax into a small AST.
+
+    Nodes are tuples: ("symbols", frozenset or None for "any"), ("concat", [nodes]),
+    ("alternate", [nodes]) and ("repeat", node, minimum, maximum or None).
+    Negated classes are ("symbols", ("not", frozenset)) until the alphabet is known.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.position = 0
+        self.needs_alphabet = False
+        self.literals = set()
+
+    def error(self, reason: str) -> ValueError:
+        logger.error("Invalid pattern %r at position %d: %s", self.pattern, self.position, reason)
+        return ValueError(f"Invalid pattern at position {self.position}: {reason}")
+
+    def peek(self) -> Optional[str]:
+        return self.pattern[self.position] if self.position < len(self.pattern) else None
+
+    def take(self) -> str:
+        char = self.peek()
+        if char is None:
+            raise self.error("unexpected end of pattern")
+        self.position += 1
+        return char
+
+    def parse(self):
+        node = self.alternation()
+        if self.peek() is not None:
+            raise self.error(f"unexpected {self.peek()!r}")
+        return node
+
+    def alternation(self):
+        branches = [self.concatenation()]
+        while self.peek() == "|":
+            self.position += 1
+            branches.append(self.concatenation())
+        return branches[0] if len(branches) == 1 else ("alternate", branches)
+
+    def concatenation(self):
+        items = []
+        while self.peek() not in (None, "|", ")"):
+            items.append(self.repetition())
+        return ("concat", items)
+
+    def repetition(self):
+        node = self.atom()
+        while self.peek() in ("*", "+", "?", "{"):
+            quantifier = self.take()
+            if quantifier == "*":
+                node = ("repeat", node, 0, None)
+            elif quantifier == "+":
+                node = ("repeat", node, 1, None)
+            elif quantifier == "?":
+                node = ("repeat", node, 0, 1)
+            else:
+                minimum, maximum = self.bounds()
+                node = ("repeat", node, minimum, maximum)
+        return node
+
+    def bounds(self) -> Tuple[int, Optional[int]]:
+        """Parse the inside of {m}, {m,} or {m,n}, the opening brace already taken."""
+        end = self.pattern.find("}", self.position)
+        if end < 0:
+            raise self.error("unterminated {")
+        text = self.pattern[self.position:end]
+        low, comma, high = text.partition(",")
+        if not low.isdigit() or (high and not high.isdigit()):
+            raise self.error(f"invalid repetition {{{text}}}")
+        minimum = int(low)
+        maximum = minimum if not comma else (int(high) if high else None)
+        if maximum is not None and maximum < minimum:
+            raise self.error(f"invalid repetition {{{text}}}")
+        self.position = end + 1
+        return minimum, maximum
+
+    def atom(self):
+        char = self.take()
+        if char == "(":
+            node = self.alternation()
+            if self.peek() != ")":
+                raise self.error("missing )")
+            self.position += 1
+            return node
+        if char == "[":
+            return ("symbols", self.character_class())
+        if char == ".":
+            self.needs_alphabet = True
+            return ("symbols", None)
+        if char == "\\":
+            return ("symbols", self.escape())
+        if char in _SPECIAL:
+            self.position -= 1
+            raise self.error(f"unexpected {char!r}")
+        self.literals.add(char)
+        return ("symbols", frozenset(char))
+
+    def escape(self) -> FrozenSet[str]:
+        char = self.take()
+        symbols = ESCAPE_CLASSES.get(char, frozenset(char))
+        self.literals.update(symbols)
+        return symbols
+
+    def character_class(self):
+        negated = self.peek() == "^"
+        if negated:
+            self.position += 1
+            self.needs_alphabet = True
+
+        symbols = set()
+        first = True
+        while first or self.peek() != "]":
+            first = False
+            char = self.take()
+            if char == "\\":
+                start = self.escape()
+                if len(start) > 1:
+                    symbols.update(start)
+                    continue
+                (char,) = start
+            if self.peek() == "-" and self.position + 1 < len(self.pattern) and self.pattern[self.position + 1] != "]":
+                self.position += 1
+                end = self.take()
+                if end == "\\":
+                    (end,) = self.escape()
+                if ord(end) < ord(char):
+                    raise self.error(f"invalid range {char}-{end}")
+                symbols.update(chr(code) for code in range(ord(char), ord(end) + 1))
+            else:
+                symbols.add(char)
+        self.position += 1
+
+        self.literals.update(symbols)
+        return ("not", frozenset(symbols)) if negated else frozenset(symbols)
+
+class _NFA:
+    """Thompson NFA: per state, a list of epsilon targets and a list of (symbols, target) edges."""
+
+    def __init__(self, alphabet: FrozenSet[str]):
+        self.alphabet = alphabet
+        self.epsilon: List[List[int]] = []
+        self.edges: List[List[Tuple[FrozenSet[str], int]]] = []
+
+    def state(self) -> int:
+        self.epsilon.append([])
+        self.edges.append([])
+        return len(self.epsilon) - 1
+
+    def build(self, node) -> Tuple[int, int]:
+        """Add the fragment of an AST node; returns its (start, accept) states."""
+        kind = node[0]
+        start = self.state()
+        if kind == "symbols":
+            symbols = node[1]
+            if symbols is None:
+                symbols = self.alphabet
+            elif isinstance(symbols, tuple):
+                symbols = self.alphabet - symbols[1]
+            accept = self.state()
+            self.edges[start].append((symbols & self.alphabet, accept))
+            return start, accept
+
+        if kind == "concat":
+            current = start
+            for item in node[1]:
+                item_start, item_accept = self.build(item)
+                self.epsilon[current].append(item_start)
+                current = item_accept
+            return start, current
+
+        if kind == "alternate":
+            accept = self.state()
+            for branch in node[1]:
+                branch_start, branch_accept = self.build(branch)
+                self.epsilon[start].append(branch_start)
+                self.epsilon[branch_accept].append(accept)
+            return start, accept
+
+        # Repetition: the required copies in sequence, then optional ones or a loop
+        _, item, minimum, maximum = node
+        current = start
+        for _ in range(minimum):
+            item_start, item_accept = self.build(item)
+            self.epsilon[current].append(item_start)
+            current = item_accept
+        accept = self.state()
+        self.epsilon[current].append(accept)
+        if maximum is None:
+            item_start, item_accept = self.build(item)
+            self.epsilon[current].append(item_start)
+            self.epsilon[item_accept].append(current)
+        else:
+            for _ in range(maximum - minimum):
+                item_start, item_accept = self.build(item)
+                self.epsilon[current].append(item_start)
+                self.epsilon[item_accept].append(accept)
+                current = item_accept
+        return start, accept
+
+    def closure(self, states: Iterable[int]) -> FrozenSet[int]:
+        """States reachable through epsilon moves."""
+        seen = set(states)
+        stack = list(seen)
+        while stack:
+            for target in self.epsilon[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return frozenset(seen)
+
+def _determinize(nfa: _NFA, start: int, accept: int, symbols: List[str]):
+    """
+    Subset construction; the empty set is left out, so it becomes missing transitions.
+
+    Returns:
+        Tuple of (state count, accepting state ids, transitions as
+        {(state id, symbol): state id}), state 0 being the start.
+    """
+    initial = nfa.closure([start])
+    ids: Dict[FrozenSet[int], int] = {initial: 0}
+    queue = deque([initial])
+    accepting = []
+    transitions = {}
+    while queue:
+        subset = queue.popleft()
+        subset_id = ids[subset]
+        if accept in subset:
+            accepting.append(subset_id)
+
+        moves: Dict[str, set] = {}
+        for state in subset:
+            for edge_symbols, target in nfa.edges[state]:
+                for symbol in edge_symbols:
+                    moves.setdefault(symbol, set()).add(target)
+
+        for symbol in symbols:
+            if symbol not in moves:
+                continue
+            target = nfa.closure(moves[symbol])
+            if target not in ids:
+                ids[target] = len(ids)
+                queue.append(target)
+            transitions[(subset_id, symbol)] = ids[target]
+
+    return len(ids), accepting, transitions
+
+def _cache_path(cache_dir, pattern: str, symbols: List[str], minimize: bool) -> str:
+    """Cache file of one (pattern, alphabet, minimize) combination."""
+    key = json.dumps([PATTERN_CACHE_VERSION, pattern, symbols, minimize])
+    return os.path.join(cache_dir, f"pattern-{hashlib.sha256(key.encode()).hexdigest()[:32]}.json")
+
+def _load_cached(path: str) -> Optional[FiniteStateMachine]:
+    """Machine stored at path, or None if it is missing or unreadable."""
+    try:
+        with open(path) as file:
+            spec = json.load(file)
+        return FiniteStateMachine(
+            spec["states"],
+            spec["input_options"],
+            spec["initial_state"],
+            spec["final_states"],
+            {(state, symbol): next_state for state, symbol, next_state in spec["transitions"]}
+        )
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        logger.warning("Ignoring unreadable pattern cache file %s: %s", path, error)
+        return None
+
+def _store_cached(path: str, fsm: FiniteStateMachine) -> None:
+    """Write a machine to the cache, atomically so concurrent readers never see a partial file."""
+    spec = {
+        "states": fsm.states,
+        "input_options": fsm.input_options,
+        "initial_state": fsm.initial_state,
+        "final_states": fsm.final_states,
+        "transitions": [[state, symbol, next_state] for (state, symbol), next_state in fsm.transition_function.items()],
+    }
+    # A unique name per writer, so concurrent threads never replace each other's file
+    descriptor, temporary = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path)
+    )
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(spec, file)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+def compile_pattern(
+    pattern: str,
+    alphabet: Optional[Iterable[str]] = None,
+    minimize: bool = True,
+    cache_dir=None
+) -> FiniteStateMachine:
+    """
+    Compile a restricted regular expression into a FiniteStateMachine.
+
+    The pattern must match the whole input. Supported syntax: literals,
+    '.', classes such as [a-z0-9_] and [^,], the escapes \\d, \\w and \\s (a
+    backslash before any other character makes it literal), groups,
+    alternation with '|', and the quantifiers *, +, ?, {m}, {m,} and {m,n}.
+
+    The pattern becomes a Thompson NFA, which is determinized by subset
+    construction and optionally minimized. Accepting states are the
+    machine's final_states. Inputs that cannot match anymore run into a
+    missing transition; FiniteStateMachine.accepts() reports them as rejected.
+
+    Args:
+        pattern: Pattern to compile
+        alphabet: Input symbols of the machine (default: the symbols the
+            pattern mentions; required with '.' or negated classes)
+        minimize: Merge equivalent states (default: True)
+        cache_dir: Directory caching compiled machines across processes
+            (default: None, no caching)
+
+    Returns:
+        FiniteStateMachine with states q0, q1, ... starting at q0.
+
+    Raises:
+        ValueError: If the pattern is invalid or needs an explicit alphabet
+    """
+    parser = _Parser(pattern)
+    tree = parser.parse()
+    if alphabet is None:
+        if parser.needs_alphabet:
+            logger.error("Pattern %r uses '.' or a negated class without an alphabet", pattern)
+            raise ValueError("Patterns with '.' or negated classes need an explicit alphabet")
+        alphabet = parser.literals
+    symbols = sorted(set(alphabet))
+    if not symbols:
+        raise ValueError("Alphabet cannot be empty")
+
+    path = None
+    if cache_dir is not None:
+        path = _cache_path(cache_dir, pattern, symbols, minimize)
+        fsm = _load_cached(path)
+        if fsm is not None:
+            logger.info("Loaded pattern machine from %s", path)
+            return fsm
+
+    nfa = _NFA(frozenset(symbols))
+    start, accept = nfa.build(tree)
+    n_states, accepting, transitions = _determinize(nfa, start, accept, symbols)
+    logger.info("Compiled pattern %r: %d NFA states, %d DFA states", pattern, len(nfa.epsilon), n_states)
+
+    states = [f"q{state}" for state in range(n_states)]
+    fsm = FiniteStateMachine(
+        states,
+        symbols,
+        states[0],
+        [states[state] for state in sorted(accepting)],
+        {(states[state], symbol): states[target] for (state, symbol), target in transitions.items()}
+    )
+    if minimize:
+        fsm, report = fsm.minimize()
+        logger.info("Minimized pattern machine: %s", report)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _store_cached(path, fsm)
+        logger.info("Cached pattern machine at %s", path)
+
+    return fsm
@@ -1,84 +1,429 @@
-from src.FSD import FiniteStateMachine
+from src.FSD import STREAM_CHUNK_SIZE, FiniteStateMachine, FiniteStateMachineRun
+from src.compiled import as_bytes, as_symbols
+
+from types import MappingProxyType
+from typing import AsyncIterator, Iterable, Iterator, Mapping, Optional, Tuple
+import numpy as np
+import functools
 import logging
+import random
+import copy
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Per-transition logs come from the FSM module; "auto" keeps them when enabled
+_fsm_logger = logging.getLogger(FiniteStateMachine.__module__)
+
+class RemainderRun:
+    """Running remainder of a number whose digits arrive in chunks."""
+
+    __slots__ = ("machine", "run", "length")
+
+    def __init__(self, machine: "RemainderFiniteStateMachine", run: FiniteStateMachineRun):
+        """
+        Args:
+            machine: Machine the run belongs to
+            run: Fresh FSM run from the initial state
+        """
+        self.machine = machine
+        self.run = run
+        self.length = 0
+
+    @property
+    def remainder(self) -> int:
+        """Remainder of the digits fed so far (0 before any digit)."""
+        return self.machine.remainder_map[self.run.state]
+
+    def feed(self, chunk) -> int:
+        """
+        Append a chunk of digits and return the running remainder.
+
+        An invalid chunk raises and leaves the run as it was before the chunk.
+
+        Args:
+            chunk: String of 1's and 0's, or the equivalent bytes-like object
+        """
+        state_id = self.run.state_id
+        try:
+            self.run.feed(chunk)
+        except ValueError:
+            self.run.state_id = state_id
+            self.machine.validate_input_string(chunk)
+            raise
+        self.length += len(chunk)
+        logger.debug("Fed %d digits, running remainder %s", self.length, self.remainder)
+        return self.remainder
+
+    def result(self) -> int:
+        """
+        Return the remainder of the whole number fed so far.
+
+        Raises:
+            ValueError: If no digit has been fed
+        """
+        if not self.length:
+            logger.error("Empty input string provided")
+            raise ValueError("Input string cannot be empty")
+        return self.remainder
+
+    def feed_chunks(self, chunks: Iterable) -> Iterator[int]:
+        """Feed chunks of digits in turn, yielding the running remainder after each one."""
+        for chunk in chunks:
+            yield self.feed(chunk)
+
+    async def feed_stream(self, stream, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[int]:
+        """
+        Feed an asynchronous byte stream, yielding the running remainder after each chunk.
+
+        Args:
+            stream: Async iterable of chunks, or a reader with a coroutine
+                read(n) such as asyncio.StreamReader
+            chunk_size: Bytes requested per read() call (default: STREAM_CHUNK_SIZE)
+        """
+        if hasattr(stream, "read"):
+            while True:
+                chunk = await stream.read(chunk_size)
+                if not chunk:
+                    return
+                yield self.feed(chunk)
+        else:
+            async for chunk in stream:
+                yield self.feed(chunk)
+
+# Digit symbols in order of value, as accepted by int(text, base)
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Number of distinct (modulus, base) machines kept compiled
+MACHINE_CACHE_SIZE = 32
+
+# Evaluation strategies of compute_remainder
+STRATEGIES = ("auto", "fsm", "int", "vector")
+
+# Longest input evaluated with int(); longer ones use vectorized blocks, which
+# are faster there and not subject to int()'s quadratic cost and digit limit
+INT_MAX_LENGTH = 4096
+
+# Digits per block of the vectorized evaluation (smaller if int64 could overflow)
+VECTOR_BLOCK_LENGTH = 1 << 16
+
+@functools.lru_cache(maxsize=MACHINE_CACHE_SIZE)
+def _build_machine(modulus: int, base: int) -> Tuple[FiniteStateMachine, Mapping[str, int]]:
+    """
+    Build and compile the remainder machine for one (modulus, base), memoized.
+
+    Every instance for the (modulus, base) shares the result, so its states,
+    symbols, transition function and remainder map are read-only views.
+
+    State Sr means "the digits read so far are congruent to r", so reading
+    digit d moves Sr to S((r * base + d) mod modulus). The table has
+    modulus x (number of digit symbols) entries.
+    """
+    logger.info("Building remainder FSM for modulus %d, base %d", modulus, base)
+
+    states = tuple(f'S{remainder}' for remainder in range(modulus))
+    digits = [(symbol, value) for value, symbol in enumerate(DIGITS[:base])]
+    # Letter digits are accepted in either case, as int() does
+    digits += [(symbol.upper(), value) for symbol, value in digits if symbol.isalpha()]
+    input_options = tuple(symbol for symbol, _ in digits)
+
+    transition_function = {
+        (state, symbol): states[(remainder * base + value) % modulus]
+        for remainder, state in enumerate(states)
+        for symbol, value in digits
+    }
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Creating FSM instance with transition function:")
+        for (state, symbol), next_state in transition_function.items():
+            logger.debug("  %s --%s--> %s", state, symbol, next_state)
+
+    fsm = FiniteStateMachine(states, input_options, states[0], states, MappingProxyType(transition_function))
+    # Compile now so every instance sharing this machine shares the table
+    fsm.compile()
+
+    # Map final states to remainder values
+    remainder_map = MappingProxyType({state: remainder for remainder, state in enumerate(states)})
+    return fsm, remainder_map
+
+@functools.lru_cache(maxsize=MACHINE_CACHE_SIZE)
+def _block_weights(modulus: int, base: int) -> np.ndarray:
+    """
+    Weights base^(L-1-j) mod modulus of the digits of an L-digit block.
+
+    L is VECTOR_BLOCK_LENGTH, shrunk so that a block's weighted digit sum
+    stays below 2^53: the weights are float64, which makes the dot products
+    BLAS calls while every partial sum is still an exact integer.
+    """
+    length = VECTOR_BLOCK_LENGTH
+    while length > 1 and length * (base - 1) * (modulus - 1) >= 1 << 53:
+        length //= 2
+
+    weights = np.empty(length, dtype=np.float64)
+    weight = 1 % modulus
+    for position in range(length - 1, -1, -1):
+        weights[position] = weight
+        weight = weight * base % modulus
+    weights.flags.writeable = False
+    return weights
+
 class RemainderFiniteStateMachine:
-    """Implementation of the mod-three problem using the generic FSM."""
+    """Remainder of a number written in some base, divided by some modulus, using the generic FSM."""
     
-    def __init__(self):
-        """Initialize the mod-three FSM with its specific configuration."""
+    def __init__(self, modulus: int = 3, base: int = 2, strategy: str = "auto", cross_check: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Initialize the remainder FSM for a modulus and base (mod three in binary by default).
+
+        Machines are built once per (modulus, base) and kept in an LRU cache of
+        MACHINE_CACHE_SIZE entries; each instance gets its own lightweight copy
+        sharing the cached, read-only definition and compiled table.
+
+        Args:
+            modulus: Divisor, a positive integer (default: 3)
+            base: Base of the input digits, between 2 and 36 (default: 2)
+            strategy: How compute_remainder evaluates an input: "fsm" runs
+                the state machine, "int" uses int() arithmetic (vector blocks
+                past INT_MAX_LENGTH digits of a non power-of-two base),
+                "vector" weighted digit sums in NumPy blocks, and "auto" picks
+                by input length, running the FSM whenever its INFO logs or
+                instrumentation are on (default: "auto")
+            cross_check: Fraction of arithmetic results verified against the
+                FSM; on a mismatch the FSM result is logged and returned
+                (default: 0.0)
+            seed: Seed of the cross-check sampling (default: None)
+
+        Raises:
+            ValueError: If modulus, base, strategy or cross_check is out of range
+        """
         logger.info("Initializing RemainderFiniteStateMachine")
 
-        states = ['S0', 'S1', 'S2']
-        input_options = ['0', '1']
-        initial_state = 'S0'
-        final_states = ['S0', 'S1', 'S2']
-        
-        transition_function = {
-            ('S0', '0'): 'S0',
-            ('S0', '1'): 'S1',
-            ('S1', '0'): 'S2',
-            ('S1', '1'): 'S0',
-            ('S2', '0'): 'S1',
-            ('S2', '1'): 'S2'
-        }
+        if not isinstance(modulus, int) or modulus < 1:
+            logger.error(f"Invalid modulus: {modulus}")
+            raise ValueError("Modulus must be a positive integer")
+        if not isinstance(base, int) or not 2 <= base <= len(DIGITS):
+            logger.error(f"Invalid base: {base}")
+            raise ValueError("Base must be an integer between 2 and 36")
 
-        logger.debug("Creating FSM instance with transition function:")
-        for (state, symbol), next_state in transition_function.items():
-            logger.debug(f"  {state} --{symbol}--> {next_state}")
+        if strategy not in STRATEGIES:
+            logger.error(f"Invalid strategy: {strategy}")
+            raise ValueError(f"Strategy must be one of {', '.join(STRATEGIES)}")
+        if not 0 <= cross_check <= 1:
+            logger.error(f"Invalid cross_check fraction: {cross_check}")
+            raise ValueError("cross_check must be between 0 and 1")
 
-        
-        # Create the FSM instance
-        self.fsm = FiniteStateMachine(states, input_options, initial_state, final_states, transition_function)
-        
-        # Map final states to remainder values
-        self.remainder_map = {
-            'S0': 0,
-            'S1': 1,
-            'S2': 2
-        }
+        self.modulus = modulus
+        self.base = base
+        self.strategy = strategy
+        self.cross_check = cross_check
+        self.cross_checks = 0
+        self.cross_check_mismatches = 0
+        self._random = random.Random(seed)
+
+        fsm, self.remainder_map = _build_machine(modulus, base)
+        # Copy without re-running validation; current_state is per instance
+        self.fsm = copy.copy(fsm)
+        self.fsm.current_state = self.fsm.initial_state
+
+        self._digits = frozenset(self.fsm.input_options)
+        self._digit_bytes = ''.join(self.fsm.input_options).encode('latin-1')
+        # Translation of every byte to its digit value, 255 for non-digits
+        digit_values = bytearray([255]) * 256
+        for symbol in self.fsm.input_options:
+            digit_values[ord(symbol)] = int(symbol, base)
+        self._digit_values = bytes(digit_values)
+        self._invalid_message = (
+            "Invalid character in input. Only '0' and '1' are allowed" if base == 2
+            else f"Invalid character in input. Only base {base} digits are allowed"
+        )
         logger.info("RemainderFiniteStateMachine initialized successfully")
     
     def validate_input_string(self, binary_string: str) -> bool:
         """
-        Validate the input string to ensure it only contains 1's and 0's.
+        Validate the input string to ensure it only contains digits of the base.
         
         Args:
-            binary_string: String of 1's and 0's representing a binary number
+            binary_string: String of digits representing a number (1's and
+                0's by default), or the equivalent bytes, bytearray or memoryview
         """
-        logger.debug(f"Validating input string: {binary_string}")
+        logger.debug("Validating input string: %s", binary_string)
 
-        # Check if string only contains 0s and 1s
-        for char in binary_string:
-            if char not in ['0', '1']:
-                logger.error(f"Invalid character '{char}' in input string")
-                raise ValueError(f"Invalid character in input. Only '0' and '1' are allowed")
+        # Check if string only contains digits of the base
+        for char in as_symbols(binary_string):
+            if char not in self._digits:
+                logger.error("Invalid character '%s' in input string", char)
+                raise ValueError(self._invalid_message)
 
         logger.debug("Input string validation successful")
 
+    def start(self) -> RemainderRun:
+        """Start a streaming computation; feed() it chunks of digits and read result()."""
+        return RemainderRun(self, self.fsm.start())
+
     def compute_remainder(self, binary_string: str) -> int:
         """
-        Compute the remainder when the binary number is divided by 3.
+        Compute the remainder when the number is divided by the modulus (3 by default).
+
+        The input is evaluated with the instance's strategy. Every strategy
+        validates the input in the same pass; invalid input is handed to the
+        FSM, which reports the error.
         
         Args:
-            binary_string: String of 1's and 0's representing a binary number
+            binary_string: String of digits representing a number (1's and
+                0's by default), or the equivalent bytes, bytearray or
+                memoryview (read without decoding or copying)
         """
-        logger.info(f"Computing remainder for binary string: {binary_string}")
+        logger.info("Computing remainder for binary string: %s", binary_string)
 
         if not binary_string:
             logger.error("Empty input string provided")
             raise ValueError("Input string cannot be empty")
 
-        self.fsm.current_state = self.fsm.initial_state
-        logger.debug("FSM reset to initial state")
+        strategy = self._choose_strategy(binary_string)
+        remainder = None
+        if strategy == "int":
+            remainder = self._remainder_int(binary_string)
+        elif strategy == "vector":
+            remainder = self._remainder_vector(binary_string)
+
+        if remainder is None:
+            # The FSM path, also taken to report invalid input
+            remainder = self._remainder_fsm(binary_string)
+        elif self.cross_check and self._random.random() < self.cross_check:
+            remainder = self._cross_check(binary_string, remainder, strategy)
+
+        logger.info("Computation complete. Input: %s ≡ %s (mod %d)", binary_string, remainder, self.modulus)
+
+        return remainder
+
+    def _choose_strategy(self, binary_string) -> str:
+        """Resolve the "auto" strategy for one input."""
+        if self.strategy != "auto":
+            return self.strategy
+        if self.fsm.instrumentation is not None or _fsm_logger.isEnabledFor(logging.INFO):
+            return "fsm"
+        return "int" if len(binary_string) <= INT_MAX_LENGTH else "vector"
+
+    def _remainder_fsm(self, binary_string) -> int:
+        """Remainder from a run of the state machine."""
+        try:
+            # A fresh run per call keeps the shared FSM free of per-call state
+            final_state = self.fsm.run(binary_string)
+        except ValueError:
+            # Report invalid characters as before; anything else is re-raised
+            self.validate_input_string(binary_string)
+            raise
+        return self.remainder_map[final_state]
+
+    def _remainder_int(self, binary_string) -> Optional[int]:
+        """Remainder by int() arithmetic, or None if the input has non-digit symbols."""
+        if self.base & (self.base - 1) and len(binary_string) > INT_MAX_LENGTH:
+            # int() limits the digits of non power-of-two bases (and is quadratic there)
+            return self._remainder_vector(binary_string)
+        try:
+            data = as_bytes(binary_string)
+        except UnicodeEncodeError:
+            return None
+        if data is None:
+            return None
+        # int() also accepts signs, spaces and underscores, so check the digits first
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        if data.translate(None, self._digit_bytes):
+            return None
+        return int(data, self.base) % self.modulus
+
+    def _remainder_vector(self, binary_string) -> Optional[int]:
+        """
+        Remainder by weighted digit sums over fixed-size blocks, or None if the input has non-digit symbols.
+
+        Each block's value modulo the modulus is a dot product with the
+        weights base^k mod modulus; blocks are then combined by Horner's rule.
+        """
+        try:
+            data = as_bytes(binary_string)
+        except UnicodeEncodeError:
+            return None
+        if data is None:
+            return None
+
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        # bytes.translate maps digits to their values (255 for anything else)
+        # far faster than a NumPy gather
+        values = np.frombuffer(data.translate(self._digit_values), dtype=np.uint8)
+        if values.max() >= self.base:
+            return None
+
+        weights = _block_weights(self.modulus, self.base)
+        length = len(weights)
+        # The leading partial block uses the last weights, as if zero padded
+        head = len(values) % length
+        remainder = int(values[:head] @ weights[length - head:]) % self.modulus
+        block_factor = pow(self.base, length, self.modulus)
+        for block in (values[head:].reshape(-1, length) @ weights).tolist():
+            remainder = (remainder * block_factor + int(block)) % self.modulus
+        return remainder
+
+    def _cross_check(self, binary_string, remainder: int, strategy: str) -> int:
+        """Verify an arithmetic result against the FSM, which wins on a mismatch."""
+        self.cross_checks += 1
+        expected = self._remainder_fsm(binary_string)
+        if expected != remainder:
+            self.cross_check_mismatches += 1
+            logger.error(
+                "Cross-check mismatch for %s: %s strategy gave %s, FSM gave %s",
+                binary_string, strategy, remainder, expected
+            )
+        return expected
+
+    def compute_remainders(self, binary_strings: Iterable, return_errors: bool = False):
+        """
+        Compute the remainders of many numbers in one batch.
+
+        Inputs are grouped by length and advanced column by column through the
+        compiled FSM, with a single log line for the whole batch.
+
+        Args:
+            binary_strings: Iterable of strings of digits (1's and 0's by
+                default), or the equivalent bytes-like objects
+            return_errors: Report invalid items instead of raising (default: False)
+
+        Returns:
+            Integer array of remainders (int8 for moduli up to 128). With
+            return_errors, a tuple of that array (-1 for invalid items) and a
+            dict of item index to error message.
+
+        Raises:
+            ValueError: On the first invalid item, unless return_errors is set
+        """
+        binary_strings = list(binary_strings)
+        logger.info("Computing remainders for %d binary strings", len(binary_strings))
+
+        compiled = self.fsm.compile()
+        final_ids = compiled.run_many(binary_strings, compiled.state_ids[self.fsm.initial_state])
 
-        self.validate_input_string(binary_string)
+        # Remainder of every state id; the dead state maps to -1
+        dtype = np.int8 if self.modulus <= 128 else np.int32
+        remainders = np.array(
+            [self.remainder_map[state] for state in compiled.states] + [-1], dtype=dtype
+        )[final_ids]
 
-        final_state = self.fsm.process_input(binary_string)
-        remainder = self.remainder_map[final_state]
+        # Empty strings never leave the initial state, so flag them alongside
+        # dead runs; compute_remainder then raises the exact error for each
+        lengths = np.array([len(binary_string) for binary_string in binary_strings], dtype=np.int64)
+        failed = np.flatnonzero((final_ids == compiled.dead) | (lengths == 0)).tolist()
 
-        logger.info(f"Computation complete. Binary: {binary_string} ≡ {remainder} (mod 3)")
+        errors = {}
+        for index in failed:
+            try:
+                remainders[index] = self.compute_remainder(binary_strings[index])
+            except ValueError as error:
+                if not return_errors:
+                    raise
+                remainders[index] = -1
+                errors[index] = str(error)
 
-        return remainder
\ No newline at end of file
+        if return_errors:
+            return remainders, errors
+        return remainders
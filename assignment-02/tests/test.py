@@ -1,6 +1,20 @@
 import pytest
+import asyncio
+import json
+import time
+import re
+import logging
+import random
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from src.FSD import FiniteStateMachine
 from src.remainder import RemainderFiniteStateMachine
+from src.compiled import KGRAM_TABLE_LIMIT
+from src.parallel import transition_vector
+from src.instrumentation import Instrumentation
+from src.pattern import compile_pattern
+from benchmarks.harness import compare, main
+from benchmarks.suite import cases
 
 @pytest.fixture
 def basic_fsm():
@@ -32,8 +46,8 @@ def remainder_fsm():
 def test_fsm_initialization(basic_fsm):
     """Test proper initialization of FSM."""
     assert basic_fsm.current_state == 'S0'
-    assert basic_fsm.states == ['S0', 'S1']
-    assert basic_fsm.input_options == ['a', 'b']
+    assert basic_fsm.states == ('S0', 'S1')
+    assert basic_fsm.input_options == ('a', 'b')
 
 def test_invalid_initial_state():
     """Test initialization with invalid initial state."""
@@ -75,6 +89,77 @@ def test_process_input_sequence(basic_fsm):
     assert basic_fsm.current_state == 'S1'
 
 
+def reference_run(fsm, input_sequence):
+    """Run through transition() only, as the uncompiled machine does."""
+    for symbol in input_sequence:
+        fsm.transition(symbol)
+    return fsm.current_state
+
+def test_compile_table(basic_fsm):
+    """Test the compiled integer transition table."""
+    compiled = basic_fsm.compile()
+    assert compiled is basic_fsm.compile()
+    assert compiled.states == ('S0', 'S1')
+    assert compiled.symbol_ids == {'a': 0, 'b': 1}
+    # Last row is the dead state
+    assert compiled.table == (0, 1, 1, 0, 2, 2)
+
+def test_compiled_matches_reference(basic_fsm):
+    """Test the compiled engine against step-by-step transitions."""
+    rng = random.Random(0)
+    for length in (0, 1, 7, 100, 1000):
+        sequence = ''.join(rng.choice('ab') for _ in range(length))
+        basic_fsm.current_state = 'S1'
+        expected = reference_run(basic_fsm, sequence)
+        basic_fsm.current_state = 'S1'
+        assert basic_fsm.process_input(sequence) == expected
+
+def test_compiled_follows_definition(basic_fsm):
+    """Test components are read-only and replacing one recompiles the table."""
+    assert basic_fsm.process_input('b') == 'S1'
+    with pytest.raises(TypeError):
+        basic_fsm.transition_function[('S1', 'a')] = 'S0'
+    with pytest.raises(AttributeError):
+        basic_fsm.states.append('S2')
+
+    basic_fsm.transition_function = {**basic_fsm.transition_function, ('S1', 'a'): 'S0'}
+    basic_fsm.current_state = 'S0'
+    expected = reference_run(basic_fsm, 'ba')
+    basic_fsm.current_state = 'S0'
+    assert basic_fsm.process_input('ba') == expected == 'S0'
+
+def test_compiled_invalid_symbol_behavior(basic_fsm):
+    """Test errors match the reference path, including the state reached."""
+    with pytest.raises(ValueError, match="Symbol c not in input_options"):
+        basic_fsm.process_input('abbbc')
+    assert basic_fsm.current_state == 'S1'
+    with pytest.raises(ValueError, match="Symbol € not in input_options"):
+        basic_fsm.process_input('b€')
+    assert basic_fsm.current_state == 'S0'
+
+def test_compiled_missing_transition():
+    """Test a missing transition raises the reference error."""
+    fsm = FiniteStateMachine(['S0', 'S1'], ['a', 'b'], 'S0', ['S1'], {('S0', 'a'): 'S1', ('S1', 'a'): 'S0'})
+    assert fsm.process_input('aaa') == 'S1'
+    with pytest.raises(ValueError, match="No transition defined for state S0 and symbol b"):
+        fsm.process_input('ab')
+
+def test_compiled_translation_mode(basic_fsm, monkeypatch):
+    """Test machines too large for the raw byte table translate their input."""
+    monkeypatch.setattr("src.compiled.BYTE_TABLE_LIMIT", 0)
+    fsm = FiniteStateMachine(['S0', 'S1'], ['a', 'b'], 'S0', ['S1'], dict(basic_fsm.transition_function))
+    assert fsm.compile()._translation is not None
+    assert fsm.process_input('abba') == 'S0'
+    with pytest.raises(ValueError, match="Symbol c not in input_options"):
+        fsm.process_input('abc')
+
+def test_process_input_with_info_logging(basic_fsm, caplog):
+    """Test per-transition logs are still emitted at INFO level."""
+    with caplog.at_level(logging.INFO):
+        assert basic_fsm.process_input('ab') == 'S1'
+    assert "Transition: S0 --b--> S1" in caplog.text
+
+
 # =====================================
 # Tests for RemainderFiniteStateMachine
 # =====================================
@@ -119,4 +204,486 @@ def test_compute_remainder_basic(remainder_fsm, binary_string, expected_remainde
 ])
 def test_compute_remainder_complex(remainder_fsm, binary_string, expected_remainder):
     """Test remainder calculations with longer numbers."""
-    assert remainder_fsm.compute_remainder(binary_string) == expected_remainder
\ No newline at end of file
+    assert remainder_fsm.compute_remainder(binary_string) == expected_remainder
+
+@pytest.mark.parametrize("wrap", [str, lambda s: s.encode(), lambda s: bytearray(s.encode()), lambda s: memoryview(s.encode())])
+@pytest.mark.parametrize("binary_string,expected_remainder", [
+    ('0', 0),
+    ('10', 2),
+    ('1010', 1),
+    ('10101', 0),
+])
+def test_compute_remainder_bytes_like(remainder_fsm, wrap, binary_string, expected_remainder):
+    """Test str, bytes, bytearray and memoryview inputs give the same result."""
+    assert remainder_fsm.compute_remainder(wrap(binary_string)) == expected_remainder
+
+def test_compute_remainder_bytes_invalid(remainder_fsm):
+    """Test invalid bytes are reported like invalid characters."""
+    with pytest.raises(ValueError, match="Invalid character in input"):
+        remainder_fsm.compute_remainder(b'1021')
+    with pytest.raises(ValueError, match="Invalid character in input"):
+        remainder_fsm.compute_remainder(memoryview(b'1\xff'))
+    with pytest.raises(ValueError, match="Input string cannot be empty"):
+        remainder_fsm.compute_remainder(b'')
+
+def test_process_input_bytes_like(basic_fsm):
+    """Test the generic FSM reads bytes-like input without decoding."""
+    assert basic_fsm.process_input(b'aba') == 'S1'
+    assert basic_fsm.process_input(memoryview(bytearray(b'b'))) == 'S0'
+    with pytest.raises(ValueError, match="Symbol c not in input_options"):
+        basic_fsm.process_input(b'abc')
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_input_parallel(remainder_fsm, workers):
+    """Test chunked composition against the serial engine."""
+    rng = random.Random(1)
+    for length in (1, 2, 7, 1000, 4099):
+        binary_string = ''.join(rng.choice('01') for _ in range(length))
+        fsm = remainder_fsm.fsm
+        fsm.current_state = 'S0'
+        result = fsm.process_input_parallel(binary_string.encode(), workers=workers, chunk_size=97)
+        assert remainder_fsm.remainder_map[result] == int(binary_string, 2) % 3
+
+def test_process_input_parallel_errors(basic_fsm):
+    """Test parallel runs raise the serial errors."""
+    assert basic_fsm.process_input_parallel('abab' * 50, chunk_size=16) == 'S0'
+    with pytest.raises(ValueError, match="Symbol c not in input_options"):
+        basic_fsm.process_input_parallel('ab' * 40 + 'c' + 'ab', chunk_size=16)
+
+def test_process_input_parallel_threads():
+    """Test in-process parallel runs of different machines from several threads."""
+    rng = random.Random(2)
+    inputs = [''.join(rng.choice('01') for _ in range(500)) for _ in range(20)]
+
+    def run(modulus):
+        machine = RemainderFiniteStateMachine(modulus)
+        for binary_string in inputs:
+            machine.fsm.current_state = machine.fsm.initial_state
+            result = machine.fsm.process_input_parallel(binary_string.encode(), workers=1, chunk_size=50)
+            if machine.remainder_map[result] != int(binary_string, 2) % modulus:
+                return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(executor.map(run, [3, 7, 3, 7, 3, 7, 3, 7]))
+
+@pytest.mark.parametrize("max_functions", [0, 256])
+def test_transition_vector_composition(basic_fsm, monkeypatch, max_functions):
+    """Test a chunk summary maps every start state like running the chunk."""
+    monkeypatch.setattr("src.parallel._MAX_FUNCTIONS", max_functions)
+    compiled = basic_fsm.compile()
+    codes = np.frombuffer(b'abbab', dtype=np.uint8)
+    assert transition_vector(compiled.byte_functions(), codes).tolist() == [1, 0, compiled.dead]
+    assert transition_vector(compiled.byte_functions(), np.frombuffer(b'ac', dtype=np.uint8))[0] == compiled.dead
+
+def test_process_file(remainder_fsm, tmp_path):
+    """Test processing a memory-mapped input file."""
+    binary_string = '1011' * 1000 + '1'
+    path = tmp_path / "input.bin"
+    path.write_bytes(binary_string.encode())
+    result = remainder_fsm.fsm.process_file(path, workers=2, chunk_size=1000)
+    assert remainder_fsm.remainder_map[result] == int(binary_string, 2) % 3
+
+def test_kgram_table(basic_fsm):
+    """Test k-gram entries equal k single steps."""
+    compiled = basic_fsm.compile()
+    table = compiled.kgram_table(3)
+    assert table.shape == (3, 8)
+    for gram in range(8):
+        symbols = ''.join('ab'[(gram >> shift) & 1] for shift in (2, 1, 0))
+        basic_fsm.current_state = 'S1'
+        assert compiled.states[table[1, gram]] == reference_run(basic_fsm, symbols)
+    assert (table[compiled.dead] == compiled.dead).all()
+
+def test_kgram_size_bounded(remainder_fsm):
+    """Test k is chosen from the state and alphabet sizes within the table limit."""
+    compiled = remainder_fsm.fsm.compile()
+    k = compiled.kgram_size()
+    assert 4 * 2 ** k <= 1 << 16 < 4 * 2 ** (k + 1)
+
+@pytest.mark.parametrize("length", [4096, 5000, 70001])
+def test_kgram_long_inputs(remainder_fsm, length):
+    """Test long inputs, processed k symbols per step, against integer arithmetic."""
+    binary_string = ''.join(random.Random(length).choice('01') for _ in range(length))
+    assert remainder_fsm.compute_remainder(binary_string) == int(binary_string, 2) % 3
+    with pytest.raises(ValueError, match="Invalid character in input"):
+        remainder_fsm.compute_remainder(binary_string + '2')
+
+@pytest.mark.parametrize("bit_length", [None, 1, 8, 13, 24])
+def test_process_packed_bits(remainder_fsm, bit_length):
+    """Test bit-packed input against the unpacked binary string."""
+    data = bytes([0b10110010, 0b01111000, 0b11001101])
+    bits = ''.join(format(byte, '08b') for byte in data)[:bit_length]
+    remainder_fsm.fsm.current_state = 'S0'
+    final_state = remainder_fsm.fsm.process_packed_bits(data, bit_length)
+    assert remainder_fsm.remainder_map[final_state] == int(bits, 2) % 3
+
+@pytest.mark.parametrize("modulus", [1000, 20000])
+def test_process_packed_bits_large_machine(modulus):
+    """Test large machines stay within the k-gram table limit on packed input."""
+    machine = RemainderFiniteStateMachine(modulus)
+    data = bytes(random.Random(modulus).getrandbits(8) for _ in range(70000))
+    for bit_length in (0, 13, 8 * len(data) - 3):
+        machine.fsm.current_state = 'S0'
+        final_state = machine.fsm.process_packed_bits(data, bit_length)
+        bits = ''.join(format(byte, '08b') for byte in data)[:bit_length]
+        assert machine.remainder_map[final_state] == int(bits or '0', 2) % modulus
+
+    compiled = machine.fsm.compile()
+    assert 8 not in compiled._kgram_offsets
+    assert all(len(table) <= KGRAM_TABLE_LIMIT for table in compiled._kgram_offsets.values())
+
+def test_process_packed_bits_invalid(basic_fsm):
+    """Test packed input validation."""
+    with pytest.raises(ValueError, match="bit_length does not fit"):
+        basic_fsm.process_packed_bits(b'\x01', 9)
+    fsm = FiniteStateMachine(['S0'], ['a', 'b', 'c'], 'S0', ['S0'], {})
+    with pytest.raises(ValueError, match="exactly two input symbols"):
+        fsm.process_packed_bits(b'\x01')
+
+def test_compute_remainders_batch(remainder_fsm):
+    """Test batched remainders against integer arithmetic, across mixed lengths and types."""
+    rng = random.Random(15)
+    binary_strings = [''.join(rng.choice('01') for _ in range(rng.randint(1, 40))) for _ in range(200)]
+    binary_strings += [b'110', bytearray(b'1001'), memoryview(b'11111')]
+    remainders = remainder_fsm.compute_remainders(binary_strings)
+    expected = [int(bytes(s) if not isinstance(s, str) else s, 2) % 3 for s in binary_strings]
+    assert remainders.tolist() == expected
+
+def test_compute_remainders_errors(remainder_fsm):
+    """Test invalid items raise by default, or are reported per index."""
+    binary_strings = ['101', '', '12', '11']
+    with pytest.raises(ValueError, match="Input string cannot be empty"):
+        remainder_fsm.compute_remainders(binary_strings)
+
+    remainders, errors = remainder_fsm.compute_remainders(binary_strings, return_errors=True)
+    assert remainders.tolist() == [2, -1, -1, 0]
+    assert errors == {
+        1: "Input string cannot be empty",
+        2: "Invalid character in input. Only '0' and '1' are allowed"
+    }
+
+def test_process_many(basic_fsm):
+    """Test many sequences run independently from the initial state."""
+    basic_fsm.current_state = 'S1'
+    sequences = ['ab', 'abbbc', 'b', '', b'bb']
+    with pytest.raises(ValueError, match="Symbol c not in input_options"):
+        basic_fsm.process_many(sequences)
+
+    results, errors = basic_fsm.process_many(sequences, return_errors=True)
+    assert results == ['S1', None, 'S1', 'S0', 'S0']
+    assert list(errors) == [1]
+    assert basic_fsm.current_state == 'S1'
+
+def test_run_leaves_current_state(basic_fsm):
+    """Test runs keep their own state and report the reference errors."""
+    basic_fsm.current_state = 'S1'
+    assert basic_fsm.run('abb') == 'S0'
+    assert basic_fsm.run('b', state='S1') == 'S0'
+    assert basic_fsm.current_state == 'S1'
+
+    run = basic_fsm.start()
+    assert run.feed('ab') == 'S1'
+    assert run.transition('b') == 'S0'
+    with pytest.raises(ValueError, match="Symbol c not in input_options"):
+        run.feed('bc')
+    assert run.state == 'S1'
+    with pytest.raises(ValueError, match="Start state must be in states list"):
+        basic_fsm.start('S9')
+
+def test_concurrent_runs_share_machine(remainder_fsm):
+    """Test one machine serving many threads at once."""
+    rng = random.Random(16)
+    binary_strings = [''.join(rng.choice('01') for _ in range(rng.randint(1, 5000))) for _ in range(400)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        remainders = list(executor.map(remainder_fsm.compute_remainder, binary_strings))
+    assert remainders == [int(s, 2) % 3 for s in binary_strings]
+    assert remainder_fsm.fsm.current_state == 'S0'
+
+def test_streaming_remainder(remainder_fsm):
+    """Test chunked input against the whole number, with the running remainder."""
+    binary_string = ''.join(random.Random(17).choice('01') for _ in range(10000))
+    chunks = [binary_string[i:i + 777].encode() for i in range(0, len(binary_string), 777)]
+    run = remainder_fsm.start()
+    with pytest.raises(ValueError, match="Input string cannot be empty"):
+        run.result()
+
+    running = list(run.feed_chunks(chunks))
+    assert running[0] == int(binary_string[:777], 2) % 3
+    assert run.result() == running[-1] == int(binary_string, 2) % 3
+
+    with pytest.raises(ValueError, match="Invalid character in input"):
+        run.feed('0120')
+    assert run.result() == int(binary_string, 2) % 3
+
+def test_streaming_async(remainder_fsm, basic_fsm):
+    """Test the async variant with an asyncio reader and an async iterable."""
+    async def consume():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'1' * 100)
+        reader.feed_data(b'0' * 50)
+        reader.feed_eof()
+        run = remainder_fsm.start()
+        remainders = [remainder async for remainder in run.feed_stream(reader, chunk_size=64)]
+
+        async def chunks():
+            for chunk in ('ab', b'bb', 'b'):
+                yield chunk
+        states = [state async for state in basic_fsm.start().feed_stream(chunks())]
+        return remainders, run.result(), states
+
+    remainders, result, states = asyncio.run(consume())
+    assert len(remainders) == 3
+    assert result == int('1' * 100 + '0' * 50, 2) % 3
+    assert states == ['S1', 'S1', 'S0']
+
+@pytest.mark.parametrize("modulus,base,number", [
+    (7, 2, "1101011"),
+    (10, 10, "9876543210123"),
+    (97, 10, "31415926535897932384626"),
+    (97, 16, "DeadBeef0123"),
+    (1, 2, "101"),
+    (2999, 16, "ffffffffffffffffffff"),
+])
+def test_modulus_base_family(modulus, base, number):
+    """Test generated machines against int() for several moduli and bases."""
+    machine = RemainderFiniteStateMachine(modulus=modulus, base=base)
+    expected = int(number, base) % modulus
+    assert machine.compute_remainder(number) == expected
+    assert machine.compute_remainders([number, number[:3]]).tolist() == [expected, int(number[:3], base) % modulus]
+
+def test_modulus_base_cached_and_validated():
+    """Test machines are built once per (modulus, base) and inputs are checked against the base."""
+    first = RemainderFiniteStateMachine(modulus=11, base=10)
+    second = RemainderFiniteStateMachine(modulus=11, base=10)
+    assert first.fsm is not second.fsm
+    assert first.fsm.compile() is second.fsm.compile()
+
+    second.fsm.process_input('12')
+    assert first.fsm.current_state == 'S0'
+    # The shared definition cannot be changed through one instance
+    with pytest.raises(TypeError):
+        first.remainder_map['S0'] = 5
+    with pytest.raises(TypeError):
+        first.fsm.transition_function[('S0', '1')] = 'S0'
+    assert second.compute_remainder('12') == 1
+    with pytest.raises(ValueError, match="Only base 10 digits are allowed"):
+        first.compute_remainder('12a')
+    with pytest.raises(ValueError, match="Modulus must be a positive integer"):
+        RemainderFiniteStateMachine(modulus=0)
+    with pytest.raises(ValueError, match="Base must be an integer between 2 and 36"):
+        RemainderFiniteStateMachine(base=37)
+
+def test_minimize_machine():
+    """Test unreachable states are pruned and equivalent states merged, keeping the outcome."""
+    # A and B are equivalent, C is unreachable, E fails on 'a' like D
+    states = ['S', 'A', 'B', 'C', 'D', 'E']
+    transition_function = {
+        ('S', 'a'): 'A', ('S', 'b'): 'B',
+        ('A', 'a'): 'D', ('A', 'b'): 'S',
+        ('B', 'a'): 'E', ('B', 'b'): 'S',
+        ('C', 'a'): 'S', ('C', 'b'): 'S',
+        ('D', 'b'): 'D', ('E', 'b'): 'E',
+    }
+    fsm = FiniteStateMachine(states, ['a', 'b'], 'S', ['D', 'E'], transition_function)
+    minimized, report = fsm.minimize()
+
+    assert (report.original_states, report.reachable_states, report.minimized_states) == (6, 5, 3)
+    assert minimized.states == ('S', 'A', 'D')
+    assert report.state_map == {'S': 'S', 'A': 'A', 'B': 'A', 'D': 'D', 'E': 'D'}
+    assert "6 states -> 5 reachable -> 3" in str(report)
+
+    rng = random.Random(19)
+    for _ in range(200):
+        sequence = ''.join(rng.choice('ab') for _ in range(rng.randint(0, 12)))
+        try:
+            expected = report.state_map[fsm.run(sequence)]
+        except ValueError:
+            with pytest.raises(ValueError, match="No transition defined"):
+                minimized.run(sequence)
+        else:
+            assert minimized.run(sequence) == expected
+
+@pytest.mark.parametrize("labels", [None, "remainders"])
+def test_minimize_keeps_labels(labels):
+    """Test merging only states with the same label; remainder machines are already minimal."""
+    machine = RemainderFiniteStateMachine(modulus=6, base=10)
+    labels = machine.remainder_map if labels else None
+    minimized, report = machine.fsm.minimize(labels)
+    assert report.minimized_states == (6 if labels else 1)
+    if labels:
+        for number in ('0', '5', '123456', '99999'):
+            assert machine.remainder_map[minimized.run(number)] == int(number) % 6
+
+def test_benchmark_suite_gating(tmp_path):
+    """Test the suite writes JSON results and fails against a faster baseline."""
+    output = tmp_path / "results.json"
+    arguments = ["--sizes", "256", "--levels", "disabled", "info", "--repeat", "1"]
+    assert main(cases, "test", arguments + ["--output", str(output)]) == 0
+
+    baseline = json.loads(output.read_text())
+    assert "remainders_short_batch/256/info" in baseline["results"]
+    assert compare(baseline["results"], baseline["results"], 0.0) == []
+
+    for metrics in baseline["results"].values():
+        metrics["throughput"] *= 1000
+    output.write_text(json.dumps(baseline))
+    assert main(cases, "test", arguments + ["--baseline", str(output)]) == 1
+
+def test_instrumentation_counters(basic_fsm):
+    """Test transition counts, call timings and the dict export."""
+    instrumentation = basic_fsm.instrument()
+    basic_fsm.process_input('abba')
+    basic_fsm.run(b'bb')
+    with pytest.raises(ValueError):
+        basic_fsm.process_input('bc')
+
+    snapshot = instrumentation.snapshot()
+    assert (snapshot['calls'], snapshot['errors'], snapshot['symbols']) == (3, 1, 8)
+    assert snapshot['seconds'] > 0 and snapshot['symbols_per_second'] > 0
+    assert snapshot['transitions'] == {'S0': {'a': 2, 'b': 3}, 'S1': {'b': 2}}
+    assert list(snapshot['latency_buckets'].values())[-1] <= 3
+
+    basic_fsm.instrumentation = None
+    basic_fsm.process_input('ab')
+    assert instrumentation.snapshot()['calls'] == 3
+
+def test_instrumentation_traces_and_prometheus(remainder_fsm):
+    """Test sampled state traces and the Prometheus text export."""
+    traces = []
+    instrumentation = Instrumentation(trace_hook=lambda sequence, states: traces.append((sequence, states)),
+                                      trace_every=2)
+    remainder_fsm.fsm.instrument(instrumentation)
+    for binary_string in ('1', '11', '101', '110'):
+        remainder_fsm.compute_remainder(binary_string)
+
+    assert traces == [('11', ['S0', 'S1', 'S0']), ('110', ['S0', 'S1', 'S0', 'S0'])]
+    text = instrumentation.to_prometheus()
+    assert "fsm_process_input_calls_total 4" in text
+    assert 'fsm_process_input_seconds_bucket{le="+Inf"} 4' in text
+    assert 'fsm_transitions_total{state="S0",symbol="1"} 4' in text
+
+@pytest.mark.parametrize("build,words", [
+    (lambda: RemainderFiniteStateMachine(3, 2).fsm, ['0', '1']),
+    (lambda: RemainderFiniteStateMachine(4000, 36).fsm, list("0123456789abcdefghijklmnopqrstuvwxyz")),
+    # S1 has no transition on 'a', so a run fails at the first "ba"
+    (lambda: FiniteStateMachine(['S0', 'S1'], ['a', 'b'], 'S0', ['S0'],
+                                {('S0', 'a'): 'S0', ('S0', 'b'): 'S1', ('S1', 'b'): 'S0'}), ['a', 'bb']),
+])
+def test_instrumentation_long_inputs(monkeypatch, build, words):
+    """Test k-gram transition counting on long inputs against the per-symbol replay."""
+    rng = random.Random(len(words))
+    inputs = [''.join(rng.choice(words) for _ in range(length)) for length in (5000, 6007)]
+    inputs += [inputs[0][:3001] + '!' + inputs[1], inputs[1] + 'ba' + inputs[0]]
+
+    def counts(vector_min_length):
+        monkeypatch.setattr("src.instrumentation.VECTOR_REPLAY_MIN_LENGTH", vector_min_length)
+        fsm = build()
+        instrumentation = fsm.instrument()
+        for input_string in inputs:
+            fsm.current_state = 'S0'
+            try:
+                fsm.process_input(input_string.encode())
+            except ValueError:
+                pass
+        return instrumentation.transition_counts()
+
+    assert counts(1 << 10) == counts(1 << 30)
+
+@pytest.mark.parametrize("modulus,base", [(3, 2), (7, 10), (97, 16), (1000, 36)])
+def test_remainder_strategies_agree(modulus, base):
+    """Test the arithmetic strategies against the FSM around the length thresholds."""
+    rng = random.Random(modulus)
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"[:base]
+    machines = {strategy: RemainderFiniteStateMachine(modulus, base, strategy=strategy)
+                for strategy in ("fsm", "int", "vector", "auto")}
+    for length in (1, 5, 4096, 4097, 70000):
+        number = ''.join(rng.choice(digits) for _ in range(length))
+        expected = machines["fsm"].compute_remainder(number)
+        if length <= 4096:
+            assert expected == int(number, base) % modulus
+        for strategy, machine in machines.items():
+            assert machine.compute_remainder(number) == expected
+            assert machine.compute_remainder(memoryview(number.encode())) == expected
+
+@pytest.mark.parametrize("strategy", ["int", "vector", "auto"])
+@pytest.mark.parametrize("binary_string", ["1 0", "+1", "1_0", "12", "٣"])
+def test_remainder_strategies_reject_invalid(strategy, binary_string):
+    """Test arithmetic strategies do not accept what int() would."""
+    machine = RemainderFiniteStateMachine(strategy=strategy)
+    with pytest.raises(ValueError, match="Invalid character in input"):
+        machine.compute_remainder(binary_string)
+
+def test_remainder_cross_check(monkeypatch):
+    """Test sampled cross-checks against the FSM, which wins on a mismatch."""
+    machine = RemainderFiniteStateMachine(strategy="int", cross_check=1.0, seed=22)
+    assert machine.compute_remainder('1011') == 2
+    assert (machine.cross_checks, machine.cross_check_mismatches) == (1, 0)
+
+    monkeypatch.setattr(machine, "_remainder_int", lambda binary_string: 0)
+    assert machine.compute_remainder('1011') == 2
+    assert (machine.cross_checks, machine.cross_check_mismatches) == (2, 1)
+
+    sampled = RemainderFiniteStateMachine(strategy="vector", cross_check=0.25, seed=22)
+    for _ in range(200):
+        sampled.compute_remainder('110')
+    assert 20 < sampled.cross_checks < 80
+    with pytest.raises(ValueError, match="Strategy must be one of"):
+        RemainderFiniteStateMachine(strategy="fast")
+
+@pytest.mark.parametrize("pattern,alphabet", [
+    ("(ab|a)*b+", None),
+    ("[0-9]{2,4}(\\.[0-9]+)?", None),
+    ("a.c|[^a]{3}", "abc"),
+    ("(a|b)*a(a|b){3}", None),
+    ("\\d+(,\\d{3})*", None),
+    ("x?|y{0,2}z", None),
+])
+def test_compile_pattern_matches_re(pattern, alphabet):
+    """Test compiled patterns accept exactly what re.fullmatch does."""
+    fsm = compile_pattern(pattern, alphabet)
+    symbols = ''.join(fsm.input_options)
+    rng = random.Random(pattern)
+    for _ in range(500):
+        text = ''.join(rng.choice(symbols) for _ in range(rng.randint(0, 9)))
+        assert fsm.accepts(text) == bool(re.fullmatch(pattern, text)), text
+    assert not fsm.accepts('☃')
+
+def test_compile_pattern_minimal_and_errors():
+    """Test determinization plus minimization gives the minimal DFA, and invalid patterns raise."""
+    # The n-th symbol from the end is an 'a': 2^4 states once minimized
+    fsm = compile_pattern("(a|b)*a(a|b){3}")
+    assert len(fsm.states) == 16
+    for pattern, message in [("(ab", "missing \\)"), ("a{3,1}", "invalid repetition"), ("*a", "unexpected")]:
+        with pytest.raises(ValueError, match=message):
+            compile_pattern(pattern)
+    with pytest.raises(ValueError, match="need an explicit alphabet"):
+        compile_pattern("a.")
+
+def test_compile_pattern_disk_cache(tmp_path, monkeypatch):
+    """Test machines are cached on disk and reloaded without subset construction."""
+    first = compile_pattern("[a-f0-9]{8}-[a-f0-9]{4}", cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("pattern-*.json"))) == 1
+
+    def fail(*args):
+        raise AssertionError("subset construction should not run")
+    monkeypatch.setattr("src.pattern._determinize", fail)
+    cached = compile_pattern("[a-f0-9]{8}-[a-f0-9]{4}", cache_dir=tmp_path)
+    assert cached.states == first.states and cached.transition_function == first.transition_function
+    assert cached.accepts("deadbeef-0123") and not cached.accepts("deadbeef-012")
+
+def test_compile_pattern_disk_cache_threads(tmp_path, monkeypatch):
+    """Test threads compiling the same pattern all write the cache without clashing."""
+    dump = json.dump
+
+    def slow_dump(*args, **kwargs):
+        # Widen the window between creating the temporary file and replacing the cache file
+        time.sleep(0.01)
+        return dump(*args, **kwargs)
+    monkeypatch.setattr(json, "dump", slow_dump)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        machines = list(executor.map(lambda _: compile_pattern("(ab|cd)*e", cache_dir=tmp_path), range(32)))
+    assert all(machine.accepts("abcde") for machine in machines)
+    assert len(list(tmp_path.glob("pattern-*.json"))) == 1
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,169 @@
+"""
+Shared runner for the benchmark suites: timing, peak memory, JSON results and
+baseline comparison.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Logging configurations every case runs under
+LEVELS = {
+    "disabled": logging.CRITICAL + 1,
+    "info": logging.INFO,
+    "debug": logging.DEBUG,
+}
+
+# Sizes (thresholds or symbols) run by default; larger ones can be requested
+DEFAULT_SIZES = (10**3, 10**4, 10**5, 10**6)
+
+# Logged runs emit records per row or symbol, so they are capped at this size
+LOGGED_MAX_SIZE = 10**4
+
+# A case is a name, the number of items it processes, and the timed callable
+Case = Tuple[str, int, Callable[[], object]]
+
+def measure(function: Callable[[], object], items: int, repeat: int) -> Dict[str, float]:
+    """
+    Time repeated calls of function and measure its peak traced memory.
+
+    Returns:
+        Dictionary with items, throughput (items per second at the median
+        latency), p50/p90/p99 latencies in milliseconds and peak_memory_bytes.
+    """
+    function()  # Warm up caches and lazy compilation
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+
+    # Memory is traced in a separate call so tracing does not skew the timings
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "items": items,
+        "throughput": items / p50 if p50 > 0 else float("inf"),
+        "p50_ms": p50 * 1e3,
+        "p90_ms": p90 * 1e3,
+        "p99_ms": p99 * 1e3,
+        "peak_memory_bytes": int(peak),
+    }
+
+def run_suite(
+    cases: Callable[[int], Iterable[Case]],
+    sizes: Iterable[int],
+    levels: Iterable[str],
+    repeat: int,
+    logged_max_size: int = LOGGED_MAX_SIZE
+) -> Dict[str, Dict[str, float]]:
+    """
+    Run every case for every size and logging level.
+
+    Logs go to a NullHandler, so only record creation and formatting are
+    measured.
+
+    Returns:
+        Metrics per "case/size/level" key.
+    """
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    root.handlers[:] = [logging.NullHandler()]
+
+    results = {}
+    try:
+        for size in sizes:
+            for name, items, function in cases(size):
+                for level in levels:
+                    if level != "disabled" and size > logged_max_size:
+                        continue
+                    root.setLevel(LEVELS[level])
+                    key = f"{name}/{size}/{level}"
+                    results[key] = measure(function, items, repeat)
+                    print(
+                        f"{key:<42}{results[key]['throughput']:>14.3e}/s"
+                        f"{results[key]['p50_ms']:>12.3f}ms{results[key]['peak_memory_bytes'] / 2**20:>10.1f}MiB",
+                        file=sys.stderr
+                    )
+    finally:
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    return results
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float
+) -> List[str]:
+    """
+    List the cases whose throughput dropped more than tolerance below the baseline.
+
+    Only cases present in both runs are compared.
+
+    Args:
+        results: Metrics of the current run
+        baseline: Metrics of the reference run
+        tolerance: Allowed relative slowdown, e.g. 0.2 for 20%
+    """
+    regressions = []
+    for key, metrics in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if metrics["throughput"] < reference["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {metrics['throughput']:.3e}/s is "
+                f"{1 - metrics['throughput'] / reference['throughput']:.0%} below the baseline "
+                f"{reference['throughput']:.3e}/s"
+            )
+    return regressions
+
+def main(cases: Callable[[int], Iterable[Case]], description: str, argv: Optional[List[str]] = None) -> int:
+    """Command line entry point shared by the suites; returns the process exit code."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", type=lambda text: int(float(text)), nargs="+", default=list(DEFAULT_SIZES),
+                        help="workload sizes, e.g. 1e3 1e8")
+    parser.add_argument("--levels", nargs="+", choices=list(LEVELS), default=list(LEVELS))
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per case")
+    parser.add_argument("--logged-max-size", type=int, default=LOGGED_MAX_SIZE,
+                        help="largest size run with logging enabled")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative throughput drop against the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_suite(cases, args.sizes, args.levels, args.repeat, args.logged_max_size)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0